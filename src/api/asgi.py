@@ -0,0 +1,257 @@
+"""Asynchronous GraphQL endpoint served under ASGI.
+
+Django 3.0 has neither async views nor an async ORM: under ASGI, the
+synchronous `GraphQLView` runs in a single thread shared by every request,
+which waits while the database answers. GRAPHQL_ASYNC_PATH is served by
+`AsyncGraphQLHandler` instead:
+
+- It is the Django ASGI handler, with the same middleware (CORS, database
+  routing, metrics, slow queries) and the same `GraphQLView` pipeline
+  (persisted queries, cost limit, response cache, tracing), but requests run
+  in a pool of worker threads, so the event loop keeps serving other
+  requests meanwhile.
+- `AsyncGraphQLView` executes each root field of a query (e.g. `plans` and
+  `exercises`) in its own worker thread, with its own database connection
+  and DataLoaders, and the root fields run concurrently. Mutations run in
+  the thread of the request, their root fields one after another.
+
+Any other path is handled by Django, so the synchronous view stays
+available at /graphql.
+"""
+import asyncio
+import contextvars
+import copy
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, cast
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connections
+from django.http import HttpResponse
+from django.urls import set_script_prefix
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.utils.get_operation_ast import get_operation_ast
+
+from src.api.views import GraphQLView
+from src.plan.api.graphql.loaders import clear_loaders
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """Return a pool of GRAPHQL_ASYNC_WORKERS threads, created once.
+
+    Requests and root fields have pools of their own, so that requests
+    waiting for their root fields never hold every thread.
+    """
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=settings.GRAPHQL_ASYNC_WORKERS,
+                thread_name_prefix=f'graphql-{name}',
+            )
+        return _executors[name]
+
+
+def split_root_fields(
+    document_ast: ast.Document, operation_name: Optional[str]
+) -> List[ast.Document]:
+    """Return a document per root field of a query operation.
+
+    Mutations, and operations selecting fragments at their root, are not
+    split.
+    """
+    operation = get_operation_ast(document_ast, operation_name)
+    if operation is None:
+        # Executing the document reports the error
+        return [document_ast]
+    selections = operation.selection_set.selections
+    if (
+        operation.operation != 'query'
+        or len(selections) < 2
+        or not all(
+            isinstance(selection, ast.Field) for selection in selections
+        )
+    ):
+        return [document_ast]
+    fragments = [
+        definition
+        for definition in document_ast.definitions
+        if isinstance(definition, ast.FragmentDefinition)
+    ]
+    return [
+        ast.Document(
+            definitions=[
+                ast.OperationDefinition(
+                    operation=operation.operation,
+                    name=operation.name,
+                    variable_definitions=operation.variable_definitions,
+                    directives=operation.directives,
+                    selection_set=ast.SelectionSet(selections=[selection]),
+                ),
+                *fragments,
+            ]
+        )
+        for selection in selections
+    ]
+
+
+def merge_results(results: List[ExecutionResult]) -> ExecutionResult:
+    data: Optional[Dict[str, Any]] = {}
+    errors: List[Exception] = []
+    for result in results:
+        errors.extend(result.errors or [])
+        if result.data is None:
+            # Errors of non-null root fields null the whole response
+            data = None
+        elif data is not None:
+            data.update(result.data)
+    invalid = any(result.invalid for result in results)
+    return ExecutionResult(
+        data=None if invalid else data, errors=errors or None, invalid=invalid
+    )
+
+
+def get_execute_wrappers() -> Dict[str, List[Callable]]:
+    """Return the execution wrappers of the connections of this thread."""
+    return {
+        connection.alias: list(connection.execute_wrappers)
+        for connection in connections.all()
+    }
+
+
+@contextmanager
+def using_execute_wrappers(wrappers: Dict[str, List[Callable]]) -> Iterator:
+    """Install execution wrappers on the connections of this thread.
+
+    Tracing, metrics and the slow query log wrap the connections of the
+    thread of the request, the root fields run their statements on
+    connections of their own. Wrappers are removed by identity, as opening
+    the connection meanwhile may add others.
+    """
+    with ExitStack() as stack:
+        for alias, alias_wrappers in wrappers.items():
+            execute_wrappers = connections[alias].execute_wrappers
+            for wrapper in alias_wrappers:
+                if wrapper not in execute_wrappers:
+                    execute_wrappers.append(wrapper)
+                    stack.callback(execute_wrappers.remove, wrapper)
+        yield
+
+
+class AsyncGraphQLView(GraphQLView):
+    """GraphQL view executing the root fields of queries concurrently."""
+
+    def execute_document(
+        self, request, document, variables, operation_name, tracer=None
+    ):
+        documents = split_root_fields(document.document_ast, operation_name)
+        if len(documents) == 1:
+            return super().execute_document(
+                request, document, variables, operation_name, tracer
+            )
+        wrappers = get_execute_wrappers()
+        middleware = self.get_execution_middleware(request, tracer)
+        futures: List[Future] = [
+            get_executor('fields').submit(
+                contextvars.copy_context().run,
+                self.execute_root_field,
+                request,
+                document_ast,
+                variables,
+                operation_name,
+                middleware,
+                wrappers,
+            )
+            for document_ast in documents
+        ]
+        return merge_results([future.result() for future in futures])
+
+    def execute_root_field(
+        self,
+        request,
+        document_ast: ast.Document,
+        variables: Optional[Dict],
+        operation_name: Optional[str],
+        middleware: Optional[List],
+        wrappers: Dict[str, List[Callable]],
+    ) -> ExecutionResult:
+        # DataLoaders are not thread-safe, each root field has its own
+        context = copy.copy(self.get_context(request))
+        clear_loaders(context)
+        # Like Django does around requests, as threads are reused
+        close_old_connections()
+        try:
+            with using_execute_wrappers(wrappers):
+                # The default executor is synchronous, it returns no promise
+                return cast(
+                    ExecutionResult,
+                    execute(
+                        self.schema,
+                        document_ast,
+                        root_value=self.get_root_value(request),
+                        variable_values=variables,
+                        operation_name=operation_name,
+                        context_value=context,
+                        middleware=middleware,
+                    ),
+                )
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+        finally:
+            close_old_connections()
+
+
+class AsyncGraphQLHandler(ASGIHandler):
+    """Django ASGI handler serving requests in a pool of threads."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return None
+        set_script_prefix(self.get_script_prefix(scope))
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(error_response, send)
+            return None
+        loop = asyncio.get_event_loop()
+        response: HttpResponse = await loop.run_in_executor(
+            get_executor('requests'),
+            contextvars.copy_context().run,
+            self.get_response_in_thread,
+            scope,
+            request,
+        )
+        response._handler_class = self.__class__
+        await self.send_response(response, send)
+        return None
+
+    def get_response_in_thread(self, scope, request):
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        try:
+            return self.get_response(request)
+        finally:
+            close_old_connections()
+
+
+def get_application(django_application: Callable) -> Callable:
+    """Return an ASGI application serving the async GraphQL endpoint."""
+    graphql_application = AsyncGraphQLHandler()
+
+    async def application(scope, receive, send) -> None:
+        if (
+            scope['type'] == 'http'
+            and scope['path'].rstrip('/') == settings.GRAPHQL_ASYNC_PATH
+        ):
+            await graphql_application(scope, receive, send)
+        else:
+            await django_application(scope, receive, send)
+
+    return application
@@ -0,0 +1,99 @@
+"""GraphQL backend caching parsed and validated documents.
+
+The default graphql-core backend parses every query string and validates it
+against the schema on each request. Clients only send a few dozen distinct
+documents, so the outcome of parsing and validating each of them is kept in
+a bounded LRU cache keyed by the SHA-256 hash of the document.
+"""
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, List, Optional, Union
+
+from graphql import GraphQLSchema, parse
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.validation import validate
+from graphql.validation.rules import specified_rules
+from promise import Promise
+
+from src.api.models import get_document_hash
+from src.metrics import observe_cache
+
+
+def execute_validated(
+    schema: GraphQLSchema, document_ast: Any, errors: List, *args, **kwargs
+) -> Union[ExecutionResult, Promise[ExecutionResult]]:
+    """Execute a document whose validation errors are already known."""
+    if errors:
+        return ExecutionResult(errors=errors, invalid=True)
+    return execute(schema, document_ast, *args, **kwargs)
+
+
+class ValidatedDocument(GraphQLDocument):
+    """Document along with the errors of its validation."""
+
+    def __init__(self, schema, document_string, document_ast, errors):
+        super().__init__(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(execute_validated, schema, document_ast, errors),
+        )
+        self.errors = errors
+        # Models read by the document, found by the response cache
+        self.models: Optional[List] = None
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    def __init__(self, max_size: int, validation_rules: List = None) -> None:
+        self.max_size = max_size
+        self.validation_rules = validation_rules or specified_rules
+        self.hits = 0
+        self.misses = 0
+        self._documents: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_cached(
+        self, schema: GraphQLSchema, document_hash: str
+    ) -> Optional[GraphQLDocument]:
+        """Return the cached document with the given hash, if any."""
+        key = (schema, document_hash)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+            return document
+
+    def document_from_string(
+        self, schema: GraphQLSchema, document_string: str
+    ) -> GraphQLDocument:
+        document_hash = get_document_hash(document_string)
+        document = self.get_cached(schema, document_hash)
+        observe_cache('graphql_document', hit=document is not None)
+        with self._lock:
+            # Requests and root fields are executed by several threads
+            if document is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if document is not None:
+            return document
+
+        # Syntax errors are raised and never cached
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast, self.validation_rules)
+        document = ValidatedDocument(
+            schema, document_string, document_ast, errors
+        )
+        with self._lock:
+            self._documents[(schema, document_hash)] = document
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+        return document
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+            self.hits = 0
+            self.misses = 0
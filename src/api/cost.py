@@ -0,0 +1,218 @@
+"""Static cost analysis of GraphQL operations.
+
+The cost of an operation is computed from its document before it is
+executed, so that deep or wide queries (e.g. every goal of every loop of every
+plan, or the same field aliased many times) are rejected without touching the
+database:
+
+- Every selected field costs `GRAPHQL_FIELD_COSTS['Type.field']`, which
+  defaults to 1 for fields returning objects and to 0 for scalar fields.
+- The cost of a list field is multiplied by the amount of items it is expected
+  to return: the `first`/`last` argument of connections (capped by
+  GRAPHQL_MAX_PAGE_SIZE) or `GRAPHQL_LIST_SIZES['Type.field']`, which defaults
+  to GRAPHQL_MAX_PAGE_SIZE.
+- The depth of an operation is the deepest nesting of its fields.
+
+Aliases and fragments are expanded, so each of them adds to the cost.
+"""
+from typing import Any, Dict, NamedTuple, Optional, Set
+
+from django.conf import settings
+from graphene.relay import Connection
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull, GraphQLObjectType
+
+PAGE_SIZE_ARGUMENTS = ('first', 'last')
+
+
+class QueryCost(NamedTuple):
+    cost: int
+    depth: int
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'requestedQueryCost': self.cost,
+            'maximumAvailable': settings.GRAPHQL_MAX_QUERY_COST,
+            'depth': self.depth,
+            'maximumDepth': settings.GRAPHQL_MAX_QUERY_DEPTH,
+        }
+
+
+def _is_list(graphql_type: Any) -> bool:
+    while isinstance(graphql_type, (GraphQLList, GraphQLNonNull)):
+        if isinstance(graphql_type, GraphQLList):
+            return True
+        graphql_type = graphql_type.of_type
+    return False
+
+
+def _is_connection(graphql_type: Any) -> bool:
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(
+        graphene_type, Connection
+    )
+
+
+class _CostAnalysis:
+    def __init__(
+        self, schema: Any, fragments: Dict[str, Any], variables: Dict
+    ) -> None:
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+        self.field_costs = settings.GRAPHQL_FIELD_COSTS
+        self.list_sizes = settings.GRAPHQL_LIST_SIZES
+        self.max_page_size = settings.GRAPHQL_MAX_PAGE_SIZE
+
+    def _get_int_argument(self, field: ast.Field, name: str) -> Optional[int]:
+        for argument in field.arguments or []:
+            if argument.name.value != name:
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                value = self.variables.get(value.name.value)
+            elif isinstance(value, ast.IntValue):
+                value = int(value.value)
+            return value if isinstance(value, int) else None
+        return None
+
+    def _get_size(
+        self, parent_type: Any, field: ast.Field, definition: Any
+    ) -> int:
+        for name in PAGE_SIZE_ARGUMENTS:
+            if name in definition.args:
+                size = self._get_int_argument(field, name)
+                if size is None:
+                    return self.max_page_size
+                return max(0, min(size, self.max_page_size))
+        if not _is_list(definition.type) or _is_connection(parent_type):
+            # The edges of a connection are counted by the connection field
+            return 1
+        key = f'{parent_type.name}.{field.name.value}'
+        return self.list_sizes.get(key, self.max_page_size)
+
+    def _get_field_cost(
+        self, parent_type: Any, field: ast.Field, named_type: Any
+    ) -> int:
+        key = f'{parent_type.name}.{field.name.value}'
+        default = 1 if isinstance(named_type, GraphQLObjectType) else 0
+        return self.field_costs.get(key, default)
+
+    def selection_set(
+        self,
+        selection_set: Optional[ast.SelectionSet],
+        parent_type: Any,
+        visited_fragments: Set[str],
+    ) -> QueryCost:
+        cost = depth = 0
+        if selection_set is None:
+            return QueryCost(cost, depth)
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                selection_cost = self.field(
+                    selection, parent_type, visited_fragments
+                )
+            else:
+                selection_cost = self.fragment(
+                    selection, parent_type, visited_fragments
+                )
+            cost += selection_cost.cost
+            depth = max(depth, selection_cost.depth)
+        return QueryCost(cost, depth)
+
+    def fragment(
+        self, selection: Any, parent_type: Any, visited_fragments: Set[str]
+    ) -> QueryCost:
+        if isinstance(selection, ast.FragmentSpread):
+            name = selection.name.value
+            fragment = self.fragments.get(name)
+            if fragment is None or name in visited_fragments:
+                # Invalid documents are reported by the validation
+                return QueryCost(0, 0)
+            visited_fragments = visited_fragments | {name}
+        else:
+            fragment = selection
+        if fragment.type_condition is not None:
+            condition = self.schema.get_type(
+                fragment.type_condition.name.value
+            )
+            parent_type = condition or parent_type
+        return self.selection_set(
+            fragment.selection_set, parent_type, visited_fragments
+        )
+
+    def field(
+        self, field: ast.Field, parent_type: Any, visited_fragments: Set[str]
+    ) -> QueryCost:
+        name = field.name.value
+        fields = getattr(parent_type, 'fields', None) or {}
+        if name.startswith('__') or name not in fields:
+            # Introspection is free, unknown fields are rejected anyway
+            return QueryCost(0, 0)
+        definition = fields[name]
+        named_type = definition.type
+        while isinstance(named_type, (GraphQLList, GraphQLNonNull)):
+            named_type = named_type.of_type
+        # Fragments spread by ancestors are not expanded again, as cycles are
+        # only rejected by the validation
+        children = self.selection_set(
+            field.selection_set, named_type, visited_fragments
+        )
+        own_cost = self._get_field_cost(parent_type, field, named_type)
+        size = self._get_size(parent_type, field, definition)
+        return QueryCost(size * (own_cost + children.cost), children.depth + 1)
+
+
+def get_query_cost(
+    schema: Any,
+    document_ast: ast.Document,
+    operation_name: Optional[str] = None,
+    variables: Optional[Dict] = None,
+) -> QueryCost:
+    """Return the cost and depth of an operation of a document.
+
+    Invalid documents and unknown operations cost nothing: they are rejected
+    by the validation or the execution.
+    """
+    fragments = {}
+    operation = None
+    operations = []
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.FragmentDefinition):
+            fragments[definition.name.value] = definition
+        elif isinstance(definition, ast.OperationDefinition):
+            operations.append(definition)
+            if operation_name is None or (
+                definition.name and definition.name.value == operation_name
+            ):
+                operation = definition
+    if operation is None or (operation_name is None and len(operations) > 1):
+        return QueryCost(0, 0)
+
+    root_type = {
+        'query': schema.get_query_type(),
+        'mutation': schema.get_mutation_type(),
+        'subscription': schema.get_subscription_type(),
+    }[operation.operation]
+    variables = dict(variables or {})
+    for definition in operation.variable_definitions or []:
+        name = definition.variable.name.value
+        default = definition.default_value
+        if name not in variables and isinstance(default, ast.IntValue):
+            variables[name] = int(default.value)
+    analysis = _CostAnalysis(schema, fragments, variables)
+    return analysis.selection_set(operation.selection_set, root_type, set())
+
+
+def check_query_cost(query_cost: QueryCost) -> None:
+    """Raise if the cost or the depth of an operation is over the budget."""
+    if query_cost.depth > settings.GRAPHQL_MAX_QUERY_DEPTH:
+        raise Exception(
+            f'Query depth {query_cost.depth} exceeds the maximum depth of '
+            f'{settings.GRAPHQL_MAX_QUERY_DEPTH}'
+        )
+    if query_cost.cost > settings.GRAPHQL_MAX_QUERY_COST:
+        raise Exception(
+            f'Query cost {query_cost.cost} exceeds the maximum cost of '
+            f'{settings.GRAPHQL_MAX_QUERY_COST}'
+        )
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from graphql import parse
+from graphql.error import GraphQLSyntaxError
+from graphql.validation import validate
+
+from src.api.models import PersistedQuery, get_document_hash
+from src.schema import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Registers GraphQL documents so that clients can execute them by "
+        "sending only their SHA-256 hash"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='.graphql files, or directories containing them',
+        )
+
+    def handle(self, *args, **options):
+        for path in self.get_document_paths(options['paths']):
+            document = path.read_text()
+            self.validate(path, document)
+            document_hash = get_document_hash(document)
+            _, created = PersistedQuery.objects.get_or_create(
+                sha256=document_hash, defaults={'document': document}
+            )
+            status = 'registered' if created else 'already registered'
+            self.stdout.write(f'{document_hash} {path} ({status})')
+
+    def get_document_paths(self, paths):
+        for raw_path in paths:
+            path = Path(raw_path)
+            if path.is_dir():
+                yield from sorted(path.glob('**/*.graphql'))
+            elif path.is_file():
+                yield path
+            else:
+                raise CommandError(f'{path} does not exist')
+
+    def validate(self, path, document):
+        try:
+            document_ast = parse(document)
+        except GraphQLSyntaxError as e:
+            raise CommandError(f'{path} is not a valid document: {e}')
+        errors = validate(schema, document_ast)
+        if errors:
+            messages = ', '.join(error.message for error in errors)
+            raise CommandError(f'{path} is not a valid document: {messages}')
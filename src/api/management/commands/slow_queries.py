@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.api.slow_queries import read_log, summarize
+
+SORT_KEYS = {
+    'total': lambda query: query.total_ms,
+    'max': lambda query: query.max_ms,
+    'mean': lambda query: query.mean_ms,
+    'count': lambda query: query.count,
+}
+
+
+def format_counts(counts):
+    ordered = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return ', '.join(f'{value} ({count})' for value, count in ordered)
+
+
+class Command(BaseCommand):
+    help = "Summarises the worst statements of the slow query log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=None, help='defaults to SLOW_QUERY_LOG'
+        )
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='print the plan of the slowest execution of each statement',
+        )
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.SLOW_QUERY_LOG
+        slow_queries = summarize(read_log(path))
+        if not slow_queries:
+            self.stdout.write(f'No slow queries in {path}')
+            return
+        slow_queries.sort(key=SORT_KEYS[options['sort']], reverse=True)
+        for rank, query in enumerate(slow_queries[: options['limit']], 1):
+            self.stdout.write(
+                f'#{rank} {query.count} times, total {query.total_ms:.1f} ms, '
+                f'mean {query.mean_ms:.1f} ms, max {query.max_ms:.1f} ms'
+            )
+            self.stdout.write(f'  SQL: {query.sql}')
+            if query.operations:
+                operations = format_counts(query.operations)
+                self.stdout.write(f'  Operations: {operations}')
+            if query.paths:
+                self.stdout.write(f'  Paths: {format_counts(query.paths)}')
+            if options['explain'] and query.explain:
+                for line in query.explain.splitlines():
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,22 @@
+# Generated by Django 3.0.4 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersistedQuery',
+            fields=[
+                ('sha256', models.CharField(help_text='SHA-256 hex digest of the document, used as its id.', max_length=64, primary_key=True, serialize=False)),
+                ('document', models.TextField(help_text='GraphQL document, as sent by the clients.')),
+                ('registered', models.DateTimeField(auto_now_add=True, help_text='Moment at which the document was registered.')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+import hashlib
+
+from django.db import models
+
+
+def get_document_hash(document: str) -> str:
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+
+class PersistedQuery(models.Model):
+    """GraphQL document that clients can execute by sending only its hash."""
+
+    sha256 = models.CharField(
+        max_length=64,
+        primary_key=True,
+        help_text='SHA-256 hex digest of the document, used as its id.',
+    )
+    document = models.TextField(
+        null=False, help_text='GraphQL document, as sent by the clients.',
+    )
+    registered = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Moment at which the document was registered.',
+    )
+
+    def __repr__(self) -> str:
+        return f"<PersistedQuery {self.sha256}>"
@@ -0,0 +1,178 @@
+"""Cache of the responses of GraphQL query operations.
+
+Responses are keyed by the hash of the document, the operation name, the
+variables and the current version of every model the document reads (see
+`src.plan.versions`). Writes bump the versions of the models they touch, so
+stale responses are never served again and simply expire. Queries missing
+the cache are read from the primary database while the replicas may lag
+behind the versions in their key.
+
+The models a document reads are found by walking it along the schema: each
+selected Django type contributes its model. Types not backed by a model can
+declare the models they are built from in a `cache_models` attribute,
+otherwise they are assumed to depend on every model of the schema.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from graphene.relay import Connection, PageInfo
+from graphene_django.types import DjangoObjectType
+from graphql.backend.base import GraphQLDocument
+from graphql.language.visitor import TypeInfoVisitor, Visitor, visit
+from graphql.type import GraphQLObjectType, get_named_type
+from graphql.utils.type_info import TypeInfo
+
+from src.api.backends import ValidatedDocument
+from src.api.models import get_document_hash
+from src.metrics import observe_cache
+from src.plan.versions import get_versions, were_written_recently
+
+RESPONSE_KEY_PREFIX = 'graphql-response'
+
+
+def get_schema_models(schema: Any) -> Set[Type[models.Model]]:
+    return {
+        graphql_type.graphene_type._meta.model
+        for graphql_type in schema.get_type_map().values()
+        if _is_django_type(graphql_type)
+    }
+
+
+def _is_django_type(graphql_type: Any) -> bool:
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(
+        graphene_type, DjangoObjectType
+    )
+
+
+def _get_type_models(
+    graphql_type: Any, schema: Any
+) -> Set[Type[models.Model]]:
+    if not isinstance(graphql_type, GraphQLObjectType):
+        return set()
+    if graphql_type in (schema.get_query_type(), schema.get_mutation_type()):
+        return set()
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    if _is_django_type(graphql_type):
+        return {graphene_type._meta.model}
+    if graphene_type is None:
+        # Introspection types
+        return set()
+    if issubclass(graphene_type, (Connection, PageInfo)):
+        return set()
+    if {'node', 'cursor'} <= set(graphene_type._meta.fields):
+        # Edge of a connection, its node is visited on its own
+        return set()
+    declared = getattr(graphene_type, 'cache_models', None)
+    if declared is not None:
+        return set(declared)
+    return get_schema_models(schema)
+
+
+class _ModelsCollector(Visitor):
+    def __init__(self, type_info: TypeInfo, schema: Any) -> None:
+        self.type_info = type_info
+        self.schema = schema
+        self.models: Set[Type[models.Model]] = set()
+
+    def enter_Field(self, node, *args):
+        field_type = self.type_info.get_type()
+        if field_type is not None:
+            named_type = get_named_type(field_type)
+            self.models |= _get_type_models(named_type, self.schema)
+
+
+def get_document_models(document: GraphQLDocument,) -> Set[Type[models.Model]]:
+    """Return the models whose data a document reads."""
+    type_info = TypeInfo(document.schema)
+    collector = _ModelsCollector(type_info, document.schema)
+    visit(document.document_ast, TypeInfoVisitor(type_info, collector))
+    return collector.models
+
+
+class ResponseCache:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT > 0
+
+    @property
+    def cache(self) -> Any:
+        return caches[settings.GRAPHQL_RESPONSE_CACHE_ALIAS]
+
+    def _get_models(
+        self, document: GraphQLDocument
+    ) -> List[Type[models.Model]]:
+        # Kept on the document, so that they are evicted along with it from
+        # the bounded document cache
+        document_models = getattr(document, 'models', None)
+        if document_models is None:
+            document_models = sorted(
+                get_document_models(document),
+                key=lambda model: model._meta.label_lower,
+            )
+            if isinstance(document, ValidatedDocument):
+                document.models = document_models
+        return document_models
+
+    def get_key(
+        self,
+        document: GraphQLDocument,
+        operation_name: Optional[str],
+        variables: Optional[Dict],
+    ) -> str:
+        document_hash = get_document_hash(document.document_string)
+        versions = get_versions(self._get_models(document))
+        payload = json.dumps(
+            [document_hash, operation_name, variables, versions],
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f'{RESPONSE_KEY_PREFIX}:{digest}'
+
+    def was_written_recently(self, document: GraphQLDocument) -> bool:
+        """Return whether replicas may lag behind the data of the document.
+
+        Always false without read replicas.
+        """
+        if not settings.DATABASE_REPLICAS:
+            return False
+        return were_written_recently(self._get_models(document))
+
+    def get(self, key: str) -> Optional[Dict]:
+        data = self.cache.get(key)
+        observe_cache('graphql_response', hit=data is not None)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key: str, data: Dict) -> None:
+        self.cache.set(
+            key, data, timeout=settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT
+        )
+
+    def stats(self) -> Tuple[int, int]:
+        """Return the amount of hits and misses of this process."""
+        with self._lock:
+            return self.hits, self.misses
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,238 @@
+"""Log of the slow SQL statements run on the tables of the plan app.
+
+`SlowQueryMiddleware` wraps the database execution of every request. Any
+SELECT statement on a table of the plan app slower than
+SLOW_QUERY_THRESHOLD_MS is explained (with ANALYZE on PostgreSQL if
+SLOW_QUERY_EXPLAIN_ANALYZE is on, which runs the statement again) and
+written as a JSON line to the rotating SLOW_QUERY_LOG file, along with the
+GraphQL operation and the path of the resolver that ran it. Other slow
+statements are logged without plan.
+
+The resolver path is the one of the last resolver that started, like in
+`src.api.tracing`. The `slow_queries` management command summarises the log.
+"""
+import datetime
+import json
+import logging
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+
+# Name of the GraphQL operation and path of the resolver being executed
+current_operation: ContextVar[Optional[str]] = ContextVar(
+    'current_operation', default=None
+)
+current_path: ContextVar[Optional[Tuple]] = ContextVar(
+    'current_path', default=None
+)
+# Set while explaining a statement, whose own statements are not recorded
+_explaining: ContextVar[bool] = ContextVar('explaining', default=False)
+
+RECORDED_APP = 'plan'
+
+# Placeholders of `IN (%s, %s, ...)` lists, which vary with the amount of
+# values
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+_loggers: Dict[str, logging.Logger] = {}
+
+
+def is_enabled() -> bool:
+    return settings.SLOW_QUERY_THRESHOLD_MS > 0
+
+
+def get_logger() -> logging.Logger:
+    """Return a logger writing the lines of SLOW_QUERY_LOG, created once."""
+    path = settings.SLOW_QUERY_LOG
+    if path not in _loggers:
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+            delay=True,
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger(f'{__name__}.{path}')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _loggers[path] = logger
+    return _loggers[path]
+
+
+def get_recorded_tables() -> List[str]:
+    app = apps.get_app_config(RECORDED_APP)
+    return [model._meta.db_table for model in app.get_models()]
+
+
+def normalize_sql(sql: str) -> str:
+    """Return the statement with lists of placeholders collapsed."""
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def is_explainable(sql: str) -> bool:
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+def explain(connection: Any, sql: str, params: Any) -> str:
+    options = {}
+    if (
+        settings.SLOW_QUERY_EXPLAIN_ANALYZE
+        and connection.vendor == 'postgresql'
+    ):
+        options['analyze'] = True
+    prefix = connection.ops.explain_query_prefix(**options)
+    token = _explaining.set(True)
+    try:
+        # A failing EXPLAIN must not break the transaction of the request
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        _explaining.reset(token)
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def record_statement(
+    connection: Any, sql: str, params: Any, many: bool, duration: float
+) -> None:
+    tables = get_recorded_tables()
+    if not any(table in sql for table in tables):
+        return None
+    plan = None
+    if not many and is_explainable(sql):
+        plan = explain(connection, sql, params)
+    # List indexes are left out, to group the entries by field
+    path = [key for key in current_path.get() or () if isinstance(key, str)]
+    entry = {
+        'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'duration_ms': round(duration * 1000, 3),
+        'database': connection.alias,
+        'sql': sql,
+        'operation': current_operation.get(),
+        'path': '.'.join(path) or None,
+        'explain': plan,
+    }
+    get_logger().info(json.dumps(entry))
+    return None
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """Database execution wrapper recording the slow statements."""
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        record_statement(context['connection'], sql, params, many, duration)
+    return result
+
+
+@contextmanager
+def recording_operation(operation_name: Optional[str]) -> Iterator[None]:
+    """Attribute the statements run in the block to a GraphQL operation."""
+    operation_token = current_operation.set(operation_name)
+    path_token = current_path.set(None)
+    try:
+        yield
+    finally:
+        current_path.reset(path_token)
+        current_operation.reset(operation_token)
+
+
+class SlowQueryMiddleware:
+    """Record the slow statements run while serving requests."""
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_enabled():
+            return self.get_response(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(record_slow_query)
+                )
+            return self.get_response(request)
+
+
+class ResolverPathMiddleware:
+    """Graphene middleware keeping track of the path being resolved."""
+
+    def resolve(self, next, root, info, **args):
+        current_path.set(tuple(info.path))
+        return next(root, info, **args)
+
+
+class SlowQuery:
+    """Aggregate of the log entries of the same statement."""
+
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.operations: Dict[str, int] = {}
+        self.paths: Dict[str, int] = {}
+        # Plan of the slowest execution
+        self.explain: Optional[str] = None
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        duration = entry['duration_ms']
+        self.count += 1
+        self.total_ms += duration
+        if duration >= self.max_ms:
+            self.max_ms = duration
+            self.explain = entry.get('explain') or self.explain
+        for key, counts in (
+            ('operation', self.operations),
+            ('path', self.paths),
+        ):
+            value = entry.get(key)
+            if value:
+                counts[value] = counts.get(value, 0) + 1
+
+
+def read_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the entries of the log, including its rotated files."""
+    paths = [
+        f'{path}.{index}'
+        for index in range(settings.SLOW_QUERY_LOG_BACKUP_COUNT, 0, -1)
+    ]
+    for log_path in [*paths, path]:
+        try:
+            file = open(log_path)
+        except FileNotFoundError:
+            continue
+        with file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries: Iterator[Dict[str, Any]]) -> List[SlowQuery]:
+    slow_queries: Dict[str, SlowQuery] = {}
+    for entry in entries:
+        sql = normalize_sql(entry['sql'])
+        if sql not in slow_queries:
+            slow_queries[sql] = SlowQuery(sql)
+        slow_queries[sql].add(entry)
+    return list(slow_queries.values())
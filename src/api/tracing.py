@@ -0,0 +1,242 @@
+"""Per-operation timings of the resolvers and of the SQL statements.
+
+When tracing is enabled for a request (GRAPHQL_TRACING, or the
+GRAPHQL_TRACING_HEADER header when DEBUG is on), a `Tracer` records:
+
+- The start offset and duration of every resolver, in the format of Apollo
+  tracing. Resolvers returning a promise (DataLoaders) last until it settles.
+- Every SQL statement run on any database connection during the operation,
+  through a database execution wrapper. Statements are attributed to the
+  last resolver that started, which is the field whose value is being
+  completed (e.g. a lazily evaluated QuerySet) or whose DataLoader batch is
+  being dispatched.
+
+The trace is returned in the `tracing` entry of the response `extensions`
+and written to the `src.api.tracing` logger.
+"""
+import datetime
+import logging
+import time
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from graphql.utils.get_operation_ast import get_operation_ast
+from promise import Promise, is_thenable
+
+logger = logging.getLogger(__name__)
+
+TRACING_VERSION = 1
+
+# Resolvers reported in the log, slowest first
+LOGGED_RESOLVERS = 5
+
+
+def is_tracing_enabled(request: Any) -> bool:
+    if settings.GRAPHQL_TRACING:
+        return True
+    header = request.headers.get(settings.GRAPHQL_TRACING_HEADER)
+    return settings.DEBUG and header not in (None, '', '0')
+
+
+def get_operation_name(
+    document_ast: Any, operation_name: Optional[str]
+) -> Optional[str]:
+    """Return the name of the executed operation, if it has one."""
+    operation = get_operation_ast(document_ast, operation_name)
+    if operation is None or operation.name is None:
+        return None
+    return operation.name.value
+
+
+def _format_datetime(value: datetime.datetime) -> str:
+    return value.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _to_ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+
+def _get_path(info: Any) -> Tuple:
+    return tuple(info.path) if info.path is not None else ()
+
+
+class ResolverTrace:
+    def __init__(self, info: Any, start_offset: float) -> None:
+        self.path = _get_path(info)
+        self.parent_type = str(info.parent_type)
+        self.field_name = info.field_name
+        self.return_type = str(info.return_type)
+        self.start_offset = start_offset
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_duration = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'path': list(self.path),
+            'parentType': self.parent_type,
+            'fieldName': self.field_name,
+            'returnType': self.return_type,
+            'startOffset': _to_ns(self.start_offset),
+            'duration': _to_ns(self.duration),
+            'sqlCount': self.sql_count,
+            'sqlDuration': _to_ns(self.sql_duration),
+        }
+
+
+class SqlTrace:
+    def __init__(
+        self,
+        sql: str,
+        alias: str,
+        start_offset: float,
+        duration: float,
+        path: Optional[Tuple],
+    ) -> None:
+        self.sql = sql
+        self.alias = alias
+        self.start_offset = start_offset
+        self.duration = duration
+        self.path = path
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'sql': self.sql,
+            'database': self.alias,
+            'startOffset': _to_ns(self.start_offset),
+            'duration': _to_ns(self.duration),
+            'path': list(self.path) if self.path is not None else None,
+        }
+
+
+class Tracer:
+    """Trace a single GraphQL operation, use it as a context manager."""
+
+    def __init__(self, operation_name: Optional[str] = None) -> None:
+        self.operation_name = operation_name
+        self.start_time = datetime.datetime.now(datetime.timezone.utc)
+        self.end_time = self.start_time
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.resolvers: List[ResolverTrace] = []
+        self.sql: List[SqlTrace] = []
+        self.current: Optional[ResolverTrace] = None
+        self._exit_stack = ExitStack()
+
+    def __enter__(self) -> 'Tracer':
+        for connection in connections.all():
+            self._exit_stack.enter_context(
+                connection.execute_wrapper(self.trace_sql)
+            )
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._exit_stack.close()
+        self.duration = time.perf_counter() - self.started
+        self.end_time = self.start_time + datetime.timedelta(
+            seconds=self.duration
+        )
+
+    def offset(self) -> float:
+        return time.perf_counter() - self.started
+
+    def trace_sql(self, execute, sql, params, many, context):
+        """Database execution wrapper recording the duration of statements."""
+        resolver = self.current
+        start_offset = self.offset()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = self.offset() - start_offset
+            alias = context['connection'].alias
+            path = resolver.path if resolver is not None else None
+            self.sql.append(SqlTrace(sql, alias, start_offset, duration, path))
+            if resolver is not None:
+                resolver.sql_count += 1
+                resolver.sql_duration += duration
+
+    def start_resolver(self, info: Any) -> ResolverTrace:
+        resolver = ResolverTrace(info, self.offset())
+        self.resolvers.append(resolver)
+        self.current = resolver
+        return resolver
+
+    def end_resolver(self, resolver: ResolverTrace) -> None:
+        resolver.duration = self.offset() - resolver.start_offset
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'version': TRACING_VERSION,
+            'startTime': _format_datetime(self.start_time),
+            'endTime': _format_datetime(self.end_time),
+            'duration': _to_ns(self.duration),
+            'execution': {
+                'resolvers': [
+                    resolver.as_dict() for resolver in self.resolvers
+                ]
+            },
+            'sql': {
+                'count': len(self.sql),
+                'duration': _to_ns(sum(sql.duration for sql in self.sql)),
+                'statements': [sql.as_dict() for sql in self.sql],
+            },
+        }
+
+    def log(self) -> None:
+        sql_duration = sum(sql.duration for sql in self.sql)
+        slowest = sorted(
+            self.resolvers,
+            key=lambda resolver: resolver.duration,
+            reverse=True,
+        )[:LOGGED_RESOLVERS]
+        logger.info(
+            'GraphQL operation %s: %.1f ms, %d SQL statements in %.1f ms',
+            self.operation_name or '<anonymous>',
+            self.duration * 1000,
+            len(self.sql),
+            sql_duration * 1000,
+            extra={
+                'graphql_operation': self.operation_name,
+                'duration_ms': round(self.duration * 1000, 3),
+                'sql_count': len(self.sql),
+                'sql_duration_ms': round(sql_duration * 1000, 3),
+                'slowest_resolvers': [
+                    {
+                        'path': '.'.join(str(key) for key in resolver.path),
+                        'duration_ms': round(resolver.duration * 1000, 3),
+                        'sql_count': resolver.sql_count,
+                    }
+                    for resolver in slowest
+                ],
+            },
+        )
+
+
+class TracingMiddleware:
+    """Graphene middleware timing every resolver of a traced operation."""
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+
+    def resolve(self, next, root, info, **args):
+        resolver = self.tracer.start_resolver(info)
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            self.tracer.end_resolver(resolver)
+            raise
+        if not is_thenable(result):
+            self.tracer.end_resolver(resolver)
+            return result
+
+        def on_resolve(value):
+            self.tracer.end_resolver(resolver)
+            return value
+
+        def on_reject(error):
+            self.tracer.end_resolver(resolver)
+            raise error
+
+        return Promise.resolve(result).then(on_resolve, on_reject)
@@ -0,0 +1,329 @@
+import json
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.http.response import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql.execution import ExecutionResult
+
+from src.api import slow_queries
+from src.api.backends import CachedDocumentBackend
+from src.api.cost import check_query_cost, get_query_cost
+from src.api.models import PersistedQuery
+from src.api.response_cache import response_cache
+from src.api.slow_queries import ResolverPathMiddleware, recording_operation
+from src.api.tracing import (
+    Tracer,
+    TracingMiddleware,
+    get_operation_name,
+    is_tracing_enabled,
+)
+from src.metrics import (
+    ANONYMOUS_OPERATION,
+    UNREGISTERED_OPERATION,
+    observe_operation,
+)
+from src.plan.api.graphql.loaders import clear_loaders
+from src.routers import use_primary
+
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+
+INVALID_JSON = 'POST body sent invalid JSON.'
+
+# Type of the operations of invalid documents in the metrics
+INVALID_OPERATION_TYPE = 'invalid'
+
+_document_backend: Optional[CachedDocumentBackend] = None
+
+
+def get_document_backend() -> CachedDocumentBackend:
+    """Return the document cache shared by every GraphQL view."""
+    global _document_backend
+    if _document_backend is None:
+        _document_backend = CachedDocumentBackend(
+            max_size=settings.GRAPHQL_DOCUMENT_CACHE_SIZE
+        )
+    return _document_backend
+
+
+def get_persisted_query_hash(extensions: Any) -> Optional[str]:
+    """Return the hash sent by clients using Apollo persisted queries.
+
+    The hash is found in `{"persistedQuery": {"sha256Hash": ...}}`, sent as
+    the `extensions` parameter (a JSON string in GET requests).
+    """
+    if not extensions:
+        return None
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(
+                HttpResponseBadRequest('Extensions are invalid JSON.')
+            )
+    persisted_query = extensions.get('persistedQuery') or {}
+    return persisted_query.get('sha256Hash')
+
+
+class GraphQLView(BaseGraphQLView):
+    """GraphQL view with document and response caches.
+
+    It also supports persisted queries, and rejects operations over the
+    depth or cost budget before executing them. The cost of every operation
+    is returned in the `extensions` of the response, along with its trace
+    when tracing is enabled (see `src.api.tracing`).
+    """
+
+    # Whether the operation being executed was sent as a persisted query
+    persisted_query = False
+
+    def __init__(self, *args, **kwargs) -> None:
+        kwargs.setdefault('backend', get_document_backend())
+        super().__init__(*args, **kwargs)
+
+    def parse_body(self, request):
+        """Parse the body like the base view, accepting batches of operations.
+
+        A JSON array of operations is executed in batch mode: operations run
+        in order, sharing the GraphQL context (the request) and so the
+        DataLoaders, and their results are returned in an array.
+        """
+        if self.get_content_type(request) != 'application/json':
+            return super().parse_body(request)
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(HttpResponseBadRequest(INVALID_JSON))
+        if isinstance(data, dict):
+            return data
+        if not isinstance(data, list) or not all(
+            isinstance(entry, dict) for entry in data
+        ):
+            raise HttpError(HttpResponseBadRequest(INVALID_JSON))
+        if not 0 < len(data) <= settings.GRAPHQL_MAX_BATCH_SIZE:
+            raise HttpError(
+                HttpResponseBadRequest(
+                    f'Batches must contain between 1 and '
+                    f'{settings.GRAPHQL_MAX_BATCH_SIZE} operations.'
+                )
+            )
+        # Views are instantiated for every request
+        self.batch = True
+        return data
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(
+            request, data
+        )
+        # Set for each operation of a batch
+        self.persisted_query = False
+        if not query:
+            document_hash = get_persisted_query_hash(
+                request.GET.get('extensions') or data.get('extensions')
+            )
+            if document_hash:
+                query = self.get_persisted_query(document_hash)
+                self.persisted_query = True
+        return query, variables, operation_name, id
+
+    def get_persisted_query(self, document_hash: str) -> str:
+        """Return the registered document with the given hash.
+
+        Documents already in the document cache are not looked up.
+        """
+        document = self.backend.get_cached(self.schema, document_hash)
+        if document is not None:
+            return document.document_string
+        try:
+            return PersistedQuery.objects.get(pk=document_hash).document
+        except PersistedQuery.DoesNotExist:
+            raise HttpError(HttpResponseBadRequest(PERSISTED_QUERY_NOT_FOUND))
+
+    def get_response(self, request, data, show_graphiql=False):
+        """Build the response like the base view, including `extensions`."""
+        query, variables, operation_name, id = self.get_graphql_params(
+            request, data
+        )
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response: Dict[str, Any] = {}
+        if execution_result.errors:
+            response['errors'] = [
+                self.format_error(e) for e in execution_result.errors
+            ]
+        if execution_result.invalid:
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        if execution_result.extensions:
+            response['extensions'] = execution_result.extensions
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+        result = self.json_encode(request, response, pretty=show_graphiql)
+        return result, status_code
+
+    def execute_graphql_request(
+        self,
+        request,
+        data,
+        query,
+        variables,
+        operation_name,
+        show_graphiql=False,
+    ):
+        if not query:
+            return super().execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        started = time.perf_counter()
+        try:
+            document = self.backend.document_from_string(self.schema, query)
+        except Exception as e:
+            observe_operation(
+                None,
+                INVALID_OPERATION_TYPE,
+                time.perf_counter() - started,
+                failed=True,
+            )
+            return ExecutionResult(errors=[e], invalid=True)
+
+        operation_type = document.get_operation_type(operation_name)
+        if request.method.lower() == 'get' and operation_type not in (
+            None,
+            'query',
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ['POST'],
+                    f'Can only perform a {operation_type} operation from a '
+                    f'POST request.',
+                )
+            )
+
+        result = self.execute_operation(
+            request, document, variables, operation_name, operation_type
+        )
+        if document.errors or operation_type is None:
+            observe_operation(
+                None,
+                INVALID_OPERATION_TYPE,
+                time.perf_counter() - started,
+                failed=True,
+            )
+        else:
+            observe_operation(
+                self.get_metrics_operation_name(document, operation_name),
+                operation_type,
+                time.perf_counter() - started,
+                failed=bool(result.errors) or result.invalid,
+            )
+        return result
+
+    def get_metrics_operation_name(self, document, operation_name) -> str:
+        """Return the name labelling the metrics of a valid operation.
+
+        Metrics keep a series per distinct name, so only the names of
+        persisted queries are used: any other operation is labelled as
+        unregistered, whatever name its client gave it.
+        """
+        if not self.persisted_query:
+            return UNREGISTERED_OPERATION
+        name = get_operation_name(document.document_ast, operation_name)
+        return name or ANONYMOUS_OPERATION
+
+    def execute_operation(
+        self, request, document, variables, operation_name, operation_type
+    ):
+        """Check the cost of an operation, then execute and trace it."""
+        if document.errors:
+            # Invalid documents are neither costed nor executed
+            return ExecutionResult(errors=document.errors, invalid=True)
+        query_cost = get_query_cost(
+            self.schema, document.document_ast, operation_name, variables
+        )
+        extensions = {'cost': query_cost.as_dict()}
+        try:
+            check_query_cost(query_cost)
+        except Exception as e:
+            return ExecutionResult(
+                errors=[e], invalid=True, extensions=extensions
+            )
+
+        if operation_type == 'mutation':
+            # Mutations read what they write
+            use_primary()
+        name = get_operation_name(document.document_ast, operation_name)
+        tracer = Tracer(name) if is_tracing_enabled(request) else None
+        with recording_operation(name), tracer or nullcontext():
+            if operation_type == 'query' and response_cache.enabled:
+                result = self.execute_cached_document(
+                    request, document, variables, operation_name, tracer
+                )
+            else:
+                result = self.execute_document(
+                    request, document, variables, operation_name, tracer
+                )
+        if operation_type == 'mutation':
+            # Following operations of the batch must not read stale data
+            clear_loaders(self.get_context(request))
+        result.extensions.update(extensions)
+        if tracer is not None:
+            result.extensions['tracing'] = tracer.as_dict()
+            tracer.log()
+        return result
+
+    def execute_cached_document(
+        self, request, document, variables, operation_name, tracer=None
+    ):
+        """Execute a query, serving its response from the cache if possible."""
+        key = response_cache.get_key(document, operation_name, variables)
+        cached_data = response_cache.get(key)
+        if cached_data is not None:
+            return ExecutionResult(data=cached_data)
+        if response_cache.was_written_recently(document):
+            # A lagging replica would cache old rows under the new versions
+            use_primary()
+        result = self.execute_document(
+            request, document, variables, operation_name, tracer
+        )
+        if not result.errors and not result.invalid:
+            response_cache.set(key, result.data)
+        return result
+
+    def execute_document(
+        self, request, document, variables, operation_name, tracer=None
+    ):
+        """Execute an already parsed query, like the base view does."""
+        extra_options = {}
+        if self.executor:
+            extra_options['executor'] = self.executor
+        try:
+            return document.execute(
+                root_value=self.get_root_value(request),
+                variable_values=variables,
+                operation_name=operation_name,
+                context_value=self.get_context(request),
+                middleware=self.get_execution_middleware(request, tracer),
+                **extra_options,
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+
+    def get_execution_middleware(self, request, tracer=None):
+        """Return the graphene middleware, along with the tracing ones."""
+        middleware = self.get_middleware(request)
+        if slow_queries.is_enabled():
+            middleware = [*(middleware or []), ResolverPathMiddleware()]
+        if tracer is not None:
+            middleware = [*(middleware or []), TracingMiddleware(tracer)]
+        return middleware
@@ -0,0 +1,124 @@
+"""Prometheus metrics, exposed at /metrics.
+
+With several worker processes, set the PROMETHEUS_MULTIPROC_DIR environment
+variable to an empty directory shared by the workers (wiped when the server
+starts): every process writes its samples to memory-mapped files there, and
+/metrics aggregates them. Otherwise the metrics of the serving process are
+returned.
+
+Metrics are updated where things happen, and incrementing a counter or
+observing a histogram only updates a value in memory (or in the mmapped
+file), so the overhead on the hot path is negligible.
+"""
+import os
+import time
+from contextlib import ExitStack
+from typing import Optional
+
+from django.db import connections
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS_DIR_VARIABLE = 'PROMETHEUS_MULTIPROC_DIR'
+
+ANONYMOUS_OPERATION = '<anonymous>'
+# Name of the operations not sent as persisted queries, as any amount of
+# distinct names would create as many series
+UNREGISTERED_OPERATION = '<unregistered>'
+
+GRAPHQL_OPERATIONS = Counter(
+    'graphql_operations_total',
+    'GraphQL operations, by name, type and status (success or error).',
+    ['operation_name', 'operation_type', 'status'],
+)
+GRAPHQL_OPERATION_DURATION = Histogram(
+    'graphql_operation_duration_seconds',
+    'Duration of the GraphQL operations, by name and type.',
+    ['operation_name', 'operation_type'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter(
+    'db_queries_total', 'SQL statements run, by database.', ['database']
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds',
+    'Duration of the SQL statements, by database.',
+    ['database'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Cache lookups, by cache and result (hit or miss).',
+    ['cache', 'result'],
+)
+RECORDS_INGESTED = Counter(
+    'records_ingested_total',
+    'Records stored, by source (create_session, sync_sessions, '
+    'append_records or import).',
+    ['source'],
+)
+
+
+def observe_operation(
+    operation_name: Optional[str],
+    operation_type: str,
+    duration: float,
+    failed: bool,
+) -> None:
+    labels = (operation_name or ANONYMOUS_OPERATION, operation_type)
+    GRAPHQL_OPERATIONS.labels(*labels, 'error' if failed else 'success').inc()
+    GRAPHQL_OPERATION_DURATION.labels(*labels).observe(duration)
+
+
+def observe_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_query(execute, sql, params, many, context):
+    """Database execution wrapper counting and timing the SQL statements."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        database = context['connection'].alias
+        DB_QUERIES.labels(database).inc()
+        DB_QUERY_DURATION.labels(database).observe(
+            time.perf_counter() - started
+        )
+
+
+class MetricsMiddleware:
+    """Observe the SQL statements run while serving requests."""
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(observe_query))
+            return self.get_response(request)
+
+
+def get_registry() -> CollectorRegistry:
+    if MULTIPROCESS_DIR_VARIABLE not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+@require_GET
+def metrics_view(request) -> HttpResponse:
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
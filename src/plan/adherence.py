@@ -0,0 +1,222 @@
+"""Measure how closely a Session followed a Plan.
+
+The records of the session, ordered by start, are aligned with the steps of
+the compiled plan (see `compiler.py`) on their exercise. Every step is either
+matched with a record, and then compared with it, or skipped. Records not
+matched with any step are extra.
+
+The alignment is the longest common subsequence of both exercise sequences,
+found with Myers' O((N+M)D) difference algorithm, where D is the amount of
+skipped steps plus extra records: sessions that follow their plan closely
+are aligned in near linear time. The linear space variant (splitting on the
+"middle snake") is used so that long, unrelated sequences do not need
+quadratic memory.
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from src.plan.compiler import Step, get_compiled_plan
+from src.plan.models import Record
+
+# Index in the first sequence and index in the second sequence
+Match = Tuple[int, int]
+
+
+def _find_split(
+    a: Sequence, a_lo: int, a_hi: int, b: Sequence, b_lo: int, b_hi: int,
+) -> Optional[Match]:
+    """Return a point of an optimal alignment, searching from both ends.
+
+    Return None if both sequences have nothing in common.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    size = 2 * max_d + 2
+    forward = [-1] * size
+    backward = [-1] * size
+    forward[offset + 1] = 0
+    backward[offset + 1] = 0
+    delta = n - m
+    # If the total amount of differences is odd, the paths overlap when
+    # extending the forward path
+    check_forward = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    for d in range(max_d):
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (
+                k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]
+            ):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                x1 += 1
+                y1 += 1
+            forward[k1_offset] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif check_forward:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and backward[k2_offset] != -1:
+                    if x1 >= n - backward[k2_offset]:
+                        return a_lo + x1, b_lo + y1
+
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (
+                k2 != d and backward[k2_offset - 1] < backward[k2_offset + 1]
+            ):
+                x2 = backward[k2_offset + 1]
+            else:
+                x2 = backward[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            backward[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not check_forward:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    y1 = offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return a_lo + x1, b_lo + y1
+    return None
+
+
+def _align(
+    a: Sequence,
+    a_lo: int,
+    a_hi: int,
+    b: Sequence,
+    b_lo: int,
+    b_hi: int,
+    matches: List[Match],
+) -> None:
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        matches.append((a_lo, b_lo))
+        a_lo += 1
+        b_lo += 1
+    suffix = []
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+        suffix.append((a_hi, b_hi))
+
+    if a_lo < a_hi and b_lo < b_hi:
+        split = _find_split(a, a_lo, a_hi, b, b_lo, b_hi)
+        if split is not None:
+            x, y = split
+            _align(a, a_lo, x, b, b_lo, y, matches)
+            _align(a, x, a_hi, b, y, b_hi, matches)
+    matches.extend(reversed(suffix))
+
+
+def align(a: Sequence, b: Sequence) -> List[Match]:
+    """Return the pairs of indexes of a longest common subsequence.
+
+    Items without any equal item in the other sequence can not be matched,
+    so they are discarded before aligning (e.g. exercises of the plan that
+    were never recorded), which keeps D small.
+    """
+    a_items, b_items = set(a), set(b)
+    a_indexes = [i for i, item in enumerate(a) if item in b_items]
+    b_indexes = [j for j, item in enumerate(b) if item in a_items]
+    matches: List[Match] = []
+    _align(
+        [a[i] for i in a_indexes],
+        0,
+        len(a_indexes),
+        [b[j] for j in b_indexes],
+        0,
+        len(b_indexes),
+        matches,
+    )
+    return [(a_indexes[i], b_indexes[j]) for i, j in matches]
+
+
+class GoalAdherence(NamedTuple):
+    step: Step
+    record_id: Optional[int]
+    # Seconds
+    actual_duration: Optional[float]
+    duration_drift: Optional[float]
+    repetitions_drift: Optional[int]
+
+    @property
+    def skipped(self) -> bool:
+        return self.record_id is None
+
+
+class Adherence(NamedTuple):
+    plan_id: int
+    session_id: int
+    goals: List[GoalAdherence]
+    extra_record_ids: List[int]
+
+    @property
+    def completed_goals(self) -> int:
+        return sum(not goal.skipped for goal in self.goals)
+
+    @property
+    def skipped_goals(self) -> int:
+        return len(self.goals) - self.completed_goals
+
+
+def compare(step: Step, record: Record) -> GoalAdherence:
+    actual_duration = (record.end - record.start).total_seconds()
+    duration_drift = None
+    if step.duration is not None:
+        duration_drift = actual_duration - step.duration
+    repetitions_drift = None
+    if step.repetitions is not None:
+        repetitions_drift = record.reps - step.repetitions
+    return GoalAdherence(
+        step=step,
+        record_id=record.id,
+        actual_duration=actual_duration,
+        duration_drift=duration_drift,
+        repetitions_drift=repetitions_drift,
+    )
+
+
+def get_adherence(plan_id: int, session_id: int) -> Adherence:
+    """Align the records of a session with the steps of a plan."""
+    steps = get_compiled_plan(plan_id).steps
+    records = list(
+        Record.objects.filter(session_id=session_id)
+        .order_by('start', 'id')
+        .only('id', 'exercise_id', 'start', 'end', 'reps')
+    )
+    matches = dict(
+        align(
+            [step.exercise_id for step in steps],
+            [record.exercise_id for record in records],
+        )
+    )
+    goals = [
+        compare(step, records[matches[i]])
+        if i in matches
+        else GoalAdherence(step, None, None, None, None)
+        for i, step in enumerate(steps)
+    ]
+    matched_records = set(matches.values())
+    return Adherence(
+        plan_id=int(plan_id),
+        session_id=int(session_id),
+        goals=goals,
+        extra_record_ids=[
+            record.id
+            for i, record in enumerate(records)
+            if i not in matched_records
+        ],
+    )
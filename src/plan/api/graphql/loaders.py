@@ -0,0 +1,168 @@
+"""Per-request DataLoaders used to batch the resolution of nested fields.
+
+Each loader covers a single relation and is keyed by the id of the parent
+object, so resolving e.g. the loops of N plans costs one SQL query instead of
+N. Loaders are stored in the GraphQL context (the Django request) so that
+their cache lives exactly as long as the request.
+
+Children loaders only fetch the columns selected in the query: there is one
+loader per relation and projection (see `optimizer.py`).
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from django.db.models import Model, QuerySet
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from src.plan.api.graphql.optimizer import (
+    Projection,
+    get_projection,
+    get_selection,
+)
+from src.plan.models import Exercise, Goal, Loop, Record
+
+LOADERS_CONTEXT_ATTRIBUTE = 'plan_loaders'
+
+
+def group_by_key(
+    rows: Iterable[Model], key_attribute: str, keys: List[int]
+) -> List[List[Model]]:
+    """Return the rows grouped by `key_attribute`, in the order of `keys`."""
+    groups: Dict[int, List[Model]] = defaultdict(list)
+    for row in rows:
+        groups[getattr(row, key_attribute)].append(row)
+    return [groups.get(key, []) for key in keys]
+
+
+class ChildrenLoader(DataLoader):
+    """Load the children of many parents with a single query.
+
+    Subclasses define the child queryset, the ForeignKey pointing to the
+    parent, and the ordering of the children.
+    """
+
+    queryset: QuerySet
+    parent_field: str
+    ordering: List[str]
+
+    def __init__(self, projection: Optional[Projection] = None) -> None:
+        super().__init__()
+        self.projection = projection
+
+    @classmethod
+    def get_projection(cls, info: Any) -> Projection:
+        """Return the projection of the children selected in `info`."""
+        return get_projection(
+            cls.queryset.model,
+            get_selection(info),
+            required=[cls.parent_field, *cls.ordering],
+        )
+
+    def batch_load_fn(self, parent_ids: List[int]) -> Promise:
+        parent_key = f'{self.parent_field}_id'
+        children = self.queryset.filter(
+            **{f'{parent_key}__in': parent_ids}
+        ).order_by(parent_key, *self.ordering)
+        if self.projection is not None:
+            children = self.projection.apply(children)
+        return Promise.resolve(group_by_key(children, parent_key, parent_ids))
+
+
+class LoopsByPlanLoader(ChildrenLoader):
+    queryset = Loop.objects.all()
+    parent_field = 'plan'
+    ordering = ['loop_index']
+
+
+class GoalsByLoopLoader(ChildrenLoader):
+    queryset = Goal.objects.all()
+    parent_field = 'loop'
+    ordering = ['goal_index']
+
+
+class RecordsBySessionLoader(ChildrenLoader):
+    queryset = Record.objects.all()
+    parent_field = 'session'
+    ordering = ['start', 'id']
+
+
+class ExerciseLoader(DataLoader):
+    def batch_load_fn(self, exercise_ids: List[int]) -> Promise:
+        exercises = Exercise.objects.in_bulk(exercise_ids)
+        return Promise.resolve(
+            [exercises.get(exercise_id) for exercise_id in exercise_ids]
+        )
+
+
+class Loaders:
+    """Bundle of every loader needed to resolve a single request."""
+
+    def __init__(self) -> None:
+        self.exercise = ExerciseLoader()
+        self._children: Dict[
+            Tuple[Type[ChildrenLoader], Projection], ChildrenLoader
+        ] = {}
+        # Projections computed for a field of the query, keyed by the id of
+        # its AST node (which is kept alive to avoid the reuse of its id)
+        self._projections: Dict[Tuple[Type[ChildrenLoader], int], Any] = {}
+
+    def _get_projection(
+        self, loader_class: Type[ChildrenLoader], info: Any
+    ) -> Projection:
+        field_ast = info.field_asts[0]
+        key = (loader_class, id(field_ast))
+        if key not in self._projections:
+            projection = loader_class.get_projection(info)
+            self._projections[key] = (field_ast, projection)
+        return self._projections[key][1]
+
+    def children(
+        self, loader_class: Type[ChildrenLoader], info: Any
+    ) -> ChildrenLoader:
+        """Return the loader of the children selected in `info`."""
+        projection = self._get_projection(loader_class, info)
+        key = (loader_class, projection)
+        if key not in self._children:
+            self._children[key] = loader_class(projection)
+        return self._children[key]
+
+
+def get_loaders(context: Any) -> Loaders:
+    """Return the loaders bound to the GraphQL context, creating them once.
+
+    When there is no context to attach them to (e.g. `schema.execute` called
+    without `context_value`), fresh loaders are returned and nothing is
+    batched.
+    """
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, LOADERS_CONTEXT_ATTRIBUTE, None)
+    if loaders is None:
+        loaders = Loaders()
+        setattr(context, LOADERS_CONTEXT_ATTRIBUTE, loaders)
+    return loaders
+
+
+def clear_loaders(context: Any) -> None:
+    """Drop the loaders bound to the context, along with their cache."""
+    if hasattr(context, LOADERS_CONTEXT_ATTRIBUTE):
+        delattr(context, LOADERS_CONTEXT_ATTRIBUTE)
+
+
+def load_children(
+    info: Any, loader_class: Type[ChildrenLoader], parent_id: int
+) -> Promise:
+    loader = get_loaders(info.context).children(loader_class, info)
+    return loader.load(parent_id)
+
+
+def load_exercise(info: Any, instance: Model) -> Any:
+    """Return the Exercise of a Goal or a Record.
+
+    The Exercise is only loaded when it was not fetched along with the
+    instance through `select_related`.
+    """
+    if instance._meta.get_field('exercise').is_cached(instance):
+        return instance.exercise
+    return get_loaders(info.context).exercise.load(instance.exercise_id)
@@ -1,11 +1,16 @@
 import datetime
-from typing import List
+from typing import Any, Dict, List
 
 import graphene
 
 from src.plan.api.graphql import types
 from src.plan.models import Loop, Record
-from src.plan.services import ExerciseService, PlanService, SessionService
+from src.plan.services import (
+    ExerciseService,
+    PlanService,
+    SessionService,
+    SyncStatus,
+)
 
 NO_RECORDS: List[Record] = []
 NO_LOOPS: List[Loop] = []
@@ -122,8 +127,73 @@ class CreateSession(graphene.Mutation):
         return CreateSession(session=session)
 
 
+class AppendRecords(graphene.Mutation):
+    class Arguments:
+        session_id = graphene.String(required=True)
+        records = graphene.List(graphene.NonNull(RecordInput), required=True)
+
+    session = graphene.Field(types.SessionGraphqlType)
+    appended = graphene.Int(required=True)
+
+    @staticmethod
+    def mutate(
+        root, info, session_id: str, records: List[Record]
+    ) -> 'AppendRecords':
+        """Add Records to a Session while it is being recorded."""
+        session = SessionService.append_records(
+            id=int(session_id), records=records
+        )
+        return AppendRecords(session=session, appended=len(records))
+
+
+SyncStatusGraphqlType = graphene.Enum.from_enum(SyncStatus)
+
+
+class SessionSyncInput(graphene.InputObjectType):
+    idempotency_key = graphene.String(required=True)
+    name = graphene.String(required=True)
+    description = graphene.String(required=False)
+    notes = graphene.String(required=False)
+    start = graphene.DateTime(required=True)
+    records = graphene.List(RecordInput, required=False)
+
+
+class SessionSyncResult(graphene.ObjectType):
+    idempotency_key = graphene.String(required=True)
+    status = graphene.Field(SyncStatusGraphqlType, required=True)
+    session = graphene.Field(types.SessionGraphqlType)
+    errors = graphene.List(graphene.NonNull(graphene.String), required=True)
+
+
+class SyncSessions(graphene.Mutation):
+    class Arguments:
+        sessions = graphene.List(
+            graphene.NonNull(SessionSyncInput), required=True
+        )
+
+    results = graphene.List(graphene.NonNull(SessionSyncResult))
+
+    @staticmethod
+    def mutate(root, info, sessions: List[Dict[str, Any]]) -> 'SyncSessions':
+        """Create the Sessions recorded offline that were not synced yet."""
+        results = SessionService.sync(sessions)
+        return SyncSessions(
+            results=[
+                SessionSyncResult(
+                    idempotency_key=result.idempotency_key,
+                    status=result.status.value,
+                    session=result.session,
+                    errors=result.errors,
+                )
+                for result in results
+            ]
+        )
+
+
 class Mutation:
     create_exercise = CreateExercise.Field()
     delete_exercise = DeleteExercise.Field()
     create_plan = CreatePlan.Field()
     create_session = CreateSession.Field()
+    sync_sessions = SyncSessions.Field()
+    append_records = AppendRecords.Field()
@@ -0,0 +1,113 @@
+"""Build querysets that only fetch what the GraphQL query selects.
+
+The selection set of a field is turned into a `Projection`: the columns to
+pass to `only()` and the forward relations to pass to `select_related()`, so
+that unrequested columns (e.g. long `description` or `notes` TextFields) and
+relations are never fetched. Reverse relations (loops, goals, records) are not
+prefetched here: they are batched by the DataLoaders in `loaders.py`, which
+apply the projection of the children they load.
+"""
+from typing import Any, Dict, FrozenSet, Iterable, NamedTuple, Set, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, QuerySet
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import ast
+
+# Selected field names (snake case) mapped to their own selection
+Selection = Dict[str, Any]
+
+
+class Projection(NamedTuple):
+    only: FrozenSet[str]
+    select_related: FrozenSet[str]
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        return queryset.only(*sorted(self.only))
+
+
+def _collect(
+    selection_set: ast.SelectionSet, fragments: Dict, into: Selection
+) -> Selection:
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.Field):
+            name = selection.name.value
+            if name.startswith('__'):
+                continue
+            sub_selection = into.setdefault(to_snake_case(name), {})
+            if selection.selection_set:
+                _collect(selection.selection_set, fragments, sub_selection)
+        elif isinstance(selection, ast.FragmentSpread):
+            fragment = fragments[selection.name.value]
+            _collect(fragment.selection_set, fragments, into)
+        elif isinstance(selection, ast.InlineFragment):
+            _collect(selection.selection_set, fragments, into)
+    return into
+
+
+def get_selection(info: Any) -> Selection:
+    """Return the fields selected under the field being resolved.
+
+    Fragments are expanded, and `@skip`/`@include` directives are ignored:
+    fetching a column that ends up skipped is harmless.
+    """
+    selection: Selection = {}
+    for field_ast in info.field_asts:
+        if field_ast.selection_set:
+            _collect(field_ast.selection_set, info.fragments, selection)
+    return selection
+
+
+def get_node_selection(info: Any) -> Selection:
+    """Return the fields selected for the nodes of a Relay connection."""
+    return get_selection(info).get('edges', {}).get('node', {})
+
+
+def _project(
+    model: Type[Model],
+    selection: Selection,
+    prefix: str,
+    only: Set[str],
+    select_related: Set[str],
+) -> None:
+    for name, sub_selection in selection.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if not field.concrete:
+            # Reverse relations are loaded by the DataLoaders
+            continue
+        only.add(prefix + name)
+        if field.is_relation:
+            select_related.add(prefix + name)
+            _project(
+                field.related_model,
+                sub_selection,
+                f'{prefix}{name}__',
+                only,
+                select_related,
+            )
+
+
+def get_projection(
+    model: Type[Model], selection: Selection, required: Iterable[str] = ()
+) -> Projection:
+    """Return the projection of `model` needed to resolve `selection`.
+
+    The primary key is always fetched, as well as the `required` fields (e.g.
+    the ForeignKey to the parent or the ordering columns).
+    """
+    only = {model._meta.pk.name, *required}
+    select_related: Set[str] = set()
+    _project(model, selection, '', only, select_related)
+    return Projection(frozenset(only), frozenset(select_related))
+
+
+def optimize(
+    queryset: QuerySet, selection: Selection, required: Iterable[str] = ()
+) -> QuerySet:
+    projection = get_projection(queryset.model, selection, required)
+    return projection.apply(queryset)
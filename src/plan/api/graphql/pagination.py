@@ -0,0 +1,103 @@
+"""Keyset (cursor) pagination for Relay connections.
+
+Unlike offset pagination, keyset pagination filters on the values of the
+ordering columns of the last seen row, so fetching any page costs the same
+regardless of how deep into the table it is.
+
+A cursor is the base64 encoded JSON list of the ordering value and the id of
+a row. The id is always used as tie-breaker so that the ordering is total.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.db.models import Model, Q, QuerySet
+from graphene.relay import Connection, PageInfo
+
+
+def encode_cursor(instance: Model, order_field: str) -> str:
+    field = instance._meta.get_field(order_field)
+    value = field.value_to_string(instance)
+    payload = json.dumps([value, instance.pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(
+    cursor: str, model: Type[Model], order_field: str
+) -> Tuple[Any, int]:
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError):
+        raise Exception(f'Invalid cursor: {cursor}')
+    field = model._meta.get_field(order_field)
+    return field.to_python(value), int(pk)
+
+
+def get_page_size(first: Optional[int], last: Optional[int]) -> int:
+    """Return the requested page size, capped by GRAPHQL_MAX_PAGE_SIZE."""
+    max_page_size = settings.GRAPHQL_MAX_PAGE_SIZE
+    requested = first if first is not None else last
+    if requested is None:
+        return max_page_size
+    if requested < 0:
+        raise Exception('The page size must not be negative')
+    return min(requested, max_page_size)
+
+
+def paginate(
+    queryset: QuerySet,
+    connection_type: Type[Connection],
+    order_field: str,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+) -> Connection:
+    """Return one page of `queryset`, ordered by `order_field` and id.
+
+    Paginate forwards with `first`/`after` and backwards with `last`/`before`.
+    """
+    if first is not None and last is not None:
+        raise Exception('Paginate either with `first` or with `last`')
+    model = queryset.model
+    page_size = get_page_size(first, last)
+    backwards = last is not None or (before is not None and first is None)
+
+    if after is not None:
+        value, pk = decode_cursor(after, model, order_field)
+        queryset = queryset.filter(
+            Q(**{f'{order_field}__gt': value})
+            | Q(**{order_field: value, 'pk__gt': pk})
+        )
+    if before is not None:
+        value, pk = decode_cursor(before, model, order_field)
+        queryset = queryset.filter(
+            Q(**{f'{order_field}__lt': value})
+            | Q(**{order_field: value, 'pk__lt': pk})
+        )
+
+    if backwards:
+        queryset = queryset.order_by(f'-{order_field}', '-pk')
+    else:
+        queryset = queryset.order_by(order_field, 'pk')
+
+    # Fetch one extra row to know whether there is another page
+    rows: List[Model] = list(queryset[: page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(row, order_field))
+        for row in rows
+    ]
+    page_info = PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=has_more if backwards else after is not None,
+        has_next_page=before is not None if backwards else has_more,
+    )
+    return connection_type(edges=edges, page_info=page_info)
@@ -1,29 +1,87 @@
 import graphene
 
+from src.plan.adherence import get_adherence
 from src.plan.api.graphql import types
+from src.plan.api.graphql.optimizer import (
+    get_node_selection,
+    get_selection,
+    optimize,
+)
+from src.plan.api.graphql.pagination import paginate
+from src.plan.changes import get_changes
+from src.plan.compiler import get_compiled_plan
 from src.plan.models import Exercise, Plan, Session
 
 
 class Query(object):
     plans = graphene.List(types.PlanGraphqlType)
+    plans_connection = graphene.relay.ConnectionField(types.PlanConnection)
     plan = graphene.Field(types.PlanGraphqlType, plan_id=graphene.String())
+    compiled_plan = graphene.Field(
+        types.CompiledPlanGraphqlType, plan_id=graphene.String()
+    )
     sessions = graphene.List(types.SessionGraphqlType)
+    adherence = graphene.Field(
+        types.AdherenceGraphqlType,
+        plan_id=graphene.String(required=True),
+        session_id=graphene.String(required=True),
+    )
+    sessions_connection = graphene.relay.ConnectionField(
+        types.SessionConnection
+    )
     exercise = graphene.Field(
         types.ExerciseGraphqlType, exercise_id=graphene.String()
     )
     exercises = graphene.List(types.ExerciseGraphqlType)
+    exercises_connection = graphene.relay.ConnectionField(
+        types.ExerciseConnection
+    )
+    changes_since = graphene.Field(
+        types.ChangesGraphqlType, cursor=graphene.String(), required=True,
+    )
 
     def resolve_plan(self, info, plan_id):
-        return Plan.objects.get(pk=plan_id)
+        return optimize(Plan.objects.all(), get_selection(info)).get(
+            pk=plan_id
+        )
+
+    def resolve_compiled_plan(self, info, plan_id):
+        return get_compiled_plan(plan_id)
 
     def resolve_plans(self, info, **kwargs):
-        return Plan.objects.all()
+        return optimize(Plan.objects.all(), get_selection(info))
+
+    def resolve_plans_connection(self, info, **kwargs):
+        plans = optimize(
+            Plan.objects.all(),
+            get_node_selection(info),
+            required=['last_updated'],
+        )
+        return paginate(plans, types.PlanConnection, 'last_updated', **kwargs)
 
     def resolve_sessions(self, info, **kwargs):
-        return Session.objects.all()
+        return optimize(Session.objects.all(), get_selection(info))
+
+    def resolve_sessions_connection(self, info, **kwargs):
+        sessions = optimize(
+            Session.objects.all(), get_node_selection(info), required=['start']
+        )
+        return paginate(sessions, types.SessionConnection, 'start', **kwargs)
+
+    def resolve_adherence(self, info, plan_id, session_id):
+        return get_adherence(plan_id, session_id)
 
     def resolve_exercise(self, info, exercise_id):
-        return Exercise.objects.get(pk=exercise_id)
+        return optimize(Exercise.objects.all(), get_selection(info)).get(
+            pk=exercise_id
+        )
 
     def resolve_exercises(self, info, **kwargs):
-        return Exercise.objects.all()
+        return optimize(Exercise.objects.all(), get_selection(info))
+
+    def resolve_exercises_connection(self, info, **kwargs):
+        exercises = optimize(Exercise.objects.all(), get_node_selection(info))
+        return paginate(exercises, types.ExerciseConnection, 'id', **kwargs)
+
+    def resolve_changes_since(self, info, cursor=None):
+        return get_changes(cursor)
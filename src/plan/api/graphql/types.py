@@ -1,6 +1,14 @@
 import graphene
 from graphene_django.types import DjangoObjectType
 
+from src.plan.api.graphql.loaders import (
+    GoalsByLoopLoader,
+    LoopsByPlanLoader,
+    RecordsBySessionLoader,
+    load_children,
+    load_exercise,
+)
+from src.plan.api.graphql.optimizer import get_selection, optimize
 from src.plan.models import (
     Exercise,
     ExerciseType,
@@ -23,22 +31,160 @@ class GoalGraphqlType(DjangoObjectType):
     class Meta:
         model = Goal
 
+    def resolve_exercise(self, info):
+        return load_exercise(info, self)
+
 
 class LoopGraphqlType(DjangoObjectType):
     class Meta:
         model = Loop
 
+    def resolve_goals(self, info):
+        return load_children(info, GoalsByLoopLoader, self.id)
+
 
 class PlanGraphqlType(DjangoObjectType):
     class Meta:
         model = Plan
+        exclude = ('version',)
+
+    def resolve_loops(self, info):
+        return load_children(info, LoopsByPlanLoader, self.id)
 
 
 class RecordGraphqlType(DjangoObjectType):
     class Meta:
         model = Record
 
+    def resolve_exercise(self, info):
+        return load_exercise(info, self)
+
 
 class SessionGraphqlType(DjangoObjectType):
     class Meta:
         model = Session
+
+    def resolve_records(self, info):
+        return load_children(info, RecordsBySessionLoader, self.id)
+
+
+class ExerciseConnection(graphene.relay.Connection):
+    class Meta:
+        node = ExerciseGraphqlType
+
+
+class PlanConnection(graphene.relay.Connection):
+    class Meta:
+        node = PlanGraphqlType
+
+
+class SessionConnection(graphene.relay.Connection):
+    class Meta:
+        node = SessionGraphqlType
+
+
+class CompiledPlanStepGraphqlType(graphene.ObjectType):
+    cache_models = [Plan, Loop, Goal, Exercise]
+
+    loop_index = graphene.Int(required=True)
+    round_index = graphene.Int(required=True)
+    goal_index = graphene.Int(required=True)
+    exercise_id = graphene.ID(required=True)
+    exercise_name = graphene.String(required=True)
+    exercise_type = graphene.Field(ExerciseTypeGraphqlType, required=True)
+    duration = graphene.Int()
+    repetitions = graphene.Int()
+    pause = graphene.Boolean(required=True)
+
+
+class ExerciseTypeTotalGraphqlType(graphene.ObjectType):
+    cache_models = [Plan, Loop, Goal, Exercise]
+
+    exercise_type = graphene.Field(ExerciseTypeGraphqlType, required=True)
+    steps = graphene.Int(required=True)
+    duration = graphene.Int(required=True)
+    repetitions = graphene.Int(required=True)
+
+
+class CompiledPlanGraphqlType(graphene.ObjectType):
+    """Flat timeline of the steps of a plan, see `src.plan.compiler`."""
+
+    cache_models = [Plan, Loop, Goal, Exercise]
+
+    plan_id = graphene.ID(required=True)
+    last_updated = graphene.DateTime(required=True)
+    duration = graphene.Int(required=True)
+    steps = graphene.List(
+        graphene.NonNull(CompiledPlanStepGraphqlType), required=True
+    )
+    totals = graphene.List(
+        graphene.NonNull(ExerciseTypeTotalGraphqlType), required=True
+    )
+
+
+class GoalAdherenceGraphqlType(graphene.ObjectType):
+    cache_models = [Plan, Loop, Goal, Exercise, Session, Record]
+
+    step = graphene.Field(CompiledPlanStepGraphqlType, required=True)
+    record_id = graphene.ID()
+    skipped = graphene.Boolean(required=True)
+    actual_duration = graphene.Float()
+    duration_drift = graphene.Float()
+    repetitions_drift = graphene.Int()
+
+
+class AdherenceGraphqlType(graphene.ObjectType):
+    """Alignment of a session with a plan, see `src.plan.adherence`."""
+
+    cache_models = [Plan, Loop, Goal, Exercise, Session, Record]
+
+    plan_id = graphene.ID(required=True)
+    session_id = graphene.ID(required=True)
+    completed_goals = graphene.Int(required=True)
+    skipped_goals = graphene.Int(required=True)
+    goals = graphene.List(
+        graphene.NonNull(GoalAdherenceGraphqlType), required=True
+    )
+    extra_record_ids = graphene.List(
+        graphene.NonNull(graphene.ID), required=True
+    )
+
+
+class TombstoneGraphqlType(graphene.ObjectType):
+    cache_models = [Plan, Loop, Goal, Exercise, Session, Record]
+
+    model = graphene.String(required=True)
+    id = graphene.ID(required=True)
+
+
+class ChangesGraphqlType(graphene.ObjectType):
+    """Rows changed after a cursor, see `src.plan.changes`."""
+
+    cache_models = [Plan, Loop, Goal, Exercise, Session, Record]
+
+    cursor = graphene.String(required=True)
+    has_more = graphene.Boolean(required=True)
+    exercises = graphene.List(
+        graphene.NonNull(ExerciseGraphqlType), required=True
+    )
+    plans = graphene.List(graphene.NonNull(PlanGraphqlType), required=True)
+    sessions = graphene.List(
+        graphene.NonNull(SessionGraphqlType), required=True
+    )
+    tombstones = graphene.List(
+        graphene.NonNull(TombstoneGraphqlType), required=True
+    )
+
+    def resolve_exercises(self, info):
+        return _get_changed(Exercise, self.changed['exercise'], info)
+
+    def resolve_plans(self, info):
+        return _get_changed(Plan, self.changed['plan'], info)
+
+    def resolve_sessions(self, info):
+        return _get_changed(Session, self.changed['session'], info)
+
+
+def _get_changed(model, ids, info):
+    # Rows deleted after the change are left out, their tombstone comes later
+    return optimize(model.objects.filter(pk__in=ids), get_selection(info))
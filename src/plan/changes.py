@@ -0,0 +1,168 @@
+"""Append-only feed of the changes of the plans, exercises and sessions.
+
+Instead of fetching every plan, exercise and session on launch, clients keep
+the cursor returned by `get_changes` and only fetch what changed after it.
+
+The services record a `ChangeEvent` for every write, in the same transaction
+and with a single bulk insert:
+
+- Plans (with their loops and goals), exercises and sessions (with their
+  records) are synced as a whole: writing a loop, goal or record is recorded
+  as an update of its plan or session.
+- Deleted rows are recorded as tombstones, including the goals and records
+  deleted in cascade with an exercise, along with an update of their plan or
+  session.
+
+The cursor is the id of the last event read, which only grows and is the
+primary key of the table. Ids are taken when events are inserted, not when
+they commit: transactions recording events are serialized (see `lock_feed`),
+so that an event never becomes visible after one with a higher id.
+"""
+import base64
+import binascii
+import json
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+
+from src.plan.models import (
+    ChangeEvent,
+    ChangeKind,
+    Exercise,
+    Goal,
+    Plan,
+    Record,
+    Session,
+)
+
+SYNCED_MODELS = (Exercise, Plan, Session)
+
+# Key of the PostgreSQL advisory lock held by the transactions recording
+# events
+FEED_LOCK_KEY = 4_242_001
+
+# (model, id of the row, kind of change)
+Change = Tuple[Type[models.Model], int, str]
+
+
+class Tombstone(NamedTuple):
+    model: str
+    id: int
+
+
+class Changes(NamedTuple):
+    cursor: str
+    has_more: bool
+    # IDs of the rows created or updated, by model name
+    changed: Dict[str, List[int]]
+    tombstones: List[Tombstone]
+
+
+def get_model_name(model: Type[models.Model]) -> str:
+    return model._meta.model_name
+
+
+def lock_feed(using: str) -> None:
+    """Wait until the other transactions recording events commit.
+
+    Otherwise, a transaction taking an id and committing after one taking a
+    higher id would be missed by the clients reading in between. SQLite
+    already runs a single writing transaction at once.
+    """
+    if connections[using].vendor == 'postgresql':
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [FEED_LOCK_KEY])
+
+
+def record_events(changes: Iterable[Change]) -> None:
+    """Append the changes to the feed, each row once.
+
+    The transaction holds the lock of the feed until it commits, events are
+    best recorded last.
+    """
+    events = {(get_model_name(model), id): kind for model, id, kind in changes}
+    using = router.db_for_write(ChangeEvent)
+    with transaction.atomic(using=using, savepoint=False):
+        lock_feed(using)
+        ChangeEvent.objects.using(using).bulk_create(
+            [
+                ChangeEvent(model=model_name, object_id=id, kind=kind)
+                for (model_name, id), kind in events.items()
+            ]
+        )
+
+
+def record_changes(
+    model: Type[models.Model], ids: Iterable[int], kind: str
+) -> None:
+    record_events((model, id, kind) for id in ids)
+
+
+def record_exercise_deletion(exercise: Exercise) -> None:
+    """Record the deletion of an exercise and of the rows deleted with it.
+
+    Must be called before deleting the exercise.
+    """
+    goals = Goal.objects.filter(exercise=exercise).values_list(
+        'id', 'loop__plan_id'
+    )
+    records = Record.objects.filter(exercise=exercise).values_list(
+        'id', 'session_id'
+    )
+    changes: List[Change] = [(Exercise, exercise.id, ChangeKind.DELETE)]
+    for id, plan_id in goals:
+        changes.append((Goal, id, ChangeKind.DELETE))
+        changes.append((Plan, plan_id, ChangeKind.UPDATE))
+    for id, session_id in records:
+        changes.append((Record, id, ChangeKind.DELETE))
+        changes.append((Session, session_id, ChangeKind.UPDATE))
+    record_events(changes)
+
+
+def encode_cursor(event_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([event_id]).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Return the id of the last event seen, 0 if there is no cursor."""
+    if cursor is None:
+        return 0
+    try:
+        (event_id,) = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(event_id)
+    except (binascii.Error, TypeError, ValueError):
+        raise Exception(f'Invalid cursor: {cursor}')
+
+
+def get_changes(cursor: Optional[str]) -> Changes:
+    """Return the rows changed after the cursor, from the oldest change.
+
+    At most CHANGES_PAGE_SIZE events are read at once, `has_more` tells
+    whether the changes must be fetched again with the returned cursor.
+    """
+    last_seen = decode_cursor(cursor)
+    page_size = settings.CHANGES_PAGE_SIZE
+    events = list(
+        ChangeEvent.objects.filter(id__gt=last_seen)
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'kind')[: page_size + 1]
+    )
+    has_more = len(events) > page_size
+    events = events[:page_size]
+
+    # Last change of each row
+    kinds = {(model, id): kind for _, model, id, kind in events}
+    changed: Dict[str, List[int]] = {
+        get_model_name(model): [] for model in SYNCED_MODELS
+    }
+    tombstones: List[Tombstone] = []
+    for (model, id), kind in kinds.items():
+        if kind == ChangeKind.DELETE:
+            tombstones.append(Tombstone(model, id))
+        elif model in changed:
+            changed[model].append(id)
+
+    if events:
+        last_seen = events[-1][0]
+    return Changes(encode_cursor(last_seen), has_more, changed, tombstones)
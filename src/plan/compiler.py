@@ -0,0 +1,148 @@
+"""Compile a Plan into the flat timeline of steps a client executes.
+
+A Plan is a tree: each Loop repeats its Goals `rounds` times. Compiling it
+unrolls the tree into the ordered list of steps to run, and sums the duration
+and repetitions of the steps of each exercise type.
+
+Compiled plans are memoized in the cache, keyed by the plan id and its
+`last_updated` time. Loops and goals can be written, and exercises deleted
+along with their goals, without touching the time set by the client, so the
+`version` of the plan, bumped by those writes, is part of the key too. Both
+are read from the database, so that no worker process serves a plan compiled
+before it changed.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Prefetch, QuerySet
+
+from src.metrics import observe_cache
+from src.plan.models import ExerciseType, Goal, Loop, Plan
+
+COMPILED_PLAN_KEY_PREFIX = 'compiled-plan'
+
+
+class Step(NamedTuple):
+    loop_index: int
+    round_index: int
+    goal_index: int
+    exercise_id: int
+    exercise_name: str
+    exercise_type: str
+    duration: Optional[int]
+    repetitions: Optional[int]
+    pause: bool
+
+
+class ExerciseTypeTotal(NamedTuple):
+    exercise_type: str
+    steps: int
+    duration: int
+    repetitions: int
+
+
+class CompiledPlan(NamedTuple):
+    plan_id: int
+    last_updated: datetime
+    steps: List[Step]
+    totals: List[ExerciseTypeTotal]
+
+    @property
+    def duration(self) -> int:
+        return sum(total.duration for total in self.totals)
+
+
+def compile_steps(loops: Iterable[Loop]) -> List[Step]:
+    """Unroll the rounds of the loops, which must be ordered by index.
+
+    The goals of each loop must be prefetched, ordered by index, along with
+    their exercise.
+    """
+    steps: List[Step] = []
+    for loop in loops:
+        goals = list(loop.goals.all())
+        for round_index in range(loop.rounds):
+            steps.extend(
+                Step(
+                    loop_index=loop.loop_index,
+                    round_index=round_index,
+                    goal_index=goal.goal_index,
+                    exercise_id=goal.exercise_id,
+                    exercise_name=goal.exercise.name,
+                    exercise_type=goal.exercise.exercise_type,
+                    duration=goal.duration,
+                    repetitions=goal.repetitions,
+                    pause=goal.pause,
+                )
+                for goal in goals
+            )
+    return steps
+
+
+def get_totals(steps: Iterable[Step]) -> List[ExerciseTypeTotal]:
+    """Return the totals of each exercise type present in `steps`."""
+    totals = OrderedDict(
+        (exercise_type, [0, 0, 0]) for exercise_type in ExerciseType.values
+    )
+    for step in steps:
+        total = totals[step.exercise_type]
+        total[0] += 1
+        total[1] += step.duration or 0
+        total[2] += step.repetitions or 0
+    return [
+        ExerciseTypeTotal(exercise_type, *total)
+        for exercise_type, total in totals.items()
+        if total[0]
+    ]
+
+
+def compile_plan(plan: Plan) -> CompiledPlan:
+    goals = Goal.objects.select_related('exercise').order_by('goal_index')
+    loops = (
+        Loop.objects.filter(plan_id=plan.id)
+        .order_by('loop_index')
+        .prefetch_related(Prefetch('goals', queryset=goals))
+    )
+    steps = compile_steps(loops)
+    return CompiledPlan(
+        plan_id=plan.id,
+        last_updated=plan.last_updated,
+        steps=steps,
+        totals=get_totals(steps),
+    )
+
+
+def get_compiled_plan_key(plan: Plan) -> str:
+    return ':'.join(
+        [
+            COMPILED_PLAN_KEY_PREFIX,
+            str(plan.id),
+            str(plan.last_updated.timestamp()),
+            str(plan.version),
+        ]
+    )
+
+
+def invalidate_compiled_plans(plans: QuerySet) -> None:
+    """Bump the version of the plans whose loops or goals are written."""
+    plans.update(version=F('version') + 1)
+
+
+def get_compiled_plan(plan_id: int) -> CompiledPlan:
+    """Return the compiled plan, compiling it only if it is not cached.
+
+    Raise Plan.DoesNotExist if the plan does not exist.
+    """
+    plan = Plan.objects.only('last_updated', 'version').get(pk=plan_id)
+    key = get_compiled_plan_key(plan)
+    compiled_plan = cache.get(key)
+    observe_cache('compiled_plan', hit=compiled_plan is not None)
+    if compiled_plan is None:
+        compiled_plan = compile_plan(plan)
+        cache.set(
+            key, compiled_plan, timeout=settings.COMPILED_PLAN_CACHE_TIMEOUT
+        )
+    return compiled_plan
@@ -0,0 +1,145 @@
+"""Stream the sessions and their records as NDJSON or CSV.
+
+Rows are read with `QuerySet.iterator()`, which uses a server-side cursor on
+PostgreSQL, and are encoded and yielded in chunks of EXPORT_CHUNK_SIZE rows,
+so exporting uses the same amount of memory whatever the size of the history.
+
+There is one row per record, along with its session and the name and type
+of its exercise, so that importing an export (see `importer.py`) restores
+everything. Sessions without records are exported as a single row without
+record.
+"""
+import csv
+import datetime
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import dateparse, timezone
+
+from src.plan.models import Session
+
+EXPORT_FIELDS = (
+    'session_id',
+    'session_name',
+    'session_description',
+    'session_notes',
+    'session_start',
+    'record_id',
+    'exercise_name',
+    'exercise_type',
+    'record_start',
+    'record_end',
+    'reps',
+)
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+Row = Tuple
+
+
+def iter_rows(
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[Row]:
+    """Yield the rows of the sessions started in [since, until)."""
+    sessions = Session.objects.all()
+    if since is not None:
+        sessions = sessions.filter(start__gte=since)
+    if until is not None:
+        sessions = sessions.filter(start__lt=until)
+    rows = sessions.order_by(
+        'start', 'id', 'records__start', 'records__id'
+    ).values_list(
+        'id',
+        'name',
+        'description',
+        'notes',
+        'start',
+        'records__id',
+        'records__exercise__name',
+        'records__exercise__exercise_type',
+        'records__start',
+        'records__end',
+        'records__reps',
+    )
+    return rows.iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+def _chunks(rows: Iterable[Row], chunk_size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return DjangoJSONEncoder().default(value)
+    return value
+
+
+class _Echo:
+    """File-like object returning what is written to it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _to_ndjson(rows: Iterable[Row], chunk_size: int) -> Iterator[str]:
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_FIELDS, map(_encode_value, row))))
+            + '\n'
+            for row in chunk
+        )
+
+
+def _to_csv(rows: Iterable[Row], chunk_size: int) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            writer.writerow(map(_encode_value, row)) for row in chunk
+        )
+
+
+def parse_datetime(value: str) -> datetime.datetime:
+    """Parse an ISO 8601 date or datetime, in the current time zone if naive.
+
+    Raise ValueError if the value is not a valid date or datetime.
+    """
+    parsed = dateparse.parse_datetime(value)
+    if parsed is None:
+        date = dateparse.parse_date(value)
+        if date is None:
+            raise ValueError(f'Invalid date or datetime: {value!r}')
+        parsed = datetime.datetime.combine(date, datetime.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_sessions(
+    export_format: str,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+) -> Iterator[str]:
+    """Yield the encoded rows of the sessions, one chunk at a time."""
+    if export_format not in EXPORT_FORMATS:
+        formats = ', '.join(EXPORT_FORMATS)
+        raise Exception(
+            f'Unknown export format {export_format!r}, use one of: {formats}'
+        )
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = iter_rows(since, until, chunk_size)
+    if export_format == 'csv':
+        return _to_csv(rows, chunk_size)
+    return _to_ndjson(rows, chunk_size)
@@ -0,0 +1,279 @@
+"""Generate synthetic plans and sessions for development and load testing.
+
+Every random value (exercise types, rounds, durations, repetitions,
+exercises picked and offsets between timestamps) is drawn from a generator
+seeded with `--seed`, so the same options produce the same values. The
+dataset is not identical across runs though: timestamps are relative to the
+time of the run (every session happened in the past, one after another), and
+the names of the generated rows end with a tag unique to each run, used to
+fetch the ids of the inserted rows on databases that do not return them from
+bulk inserts.
+
+Rows are inserted in chunks with bulk inserts (COPY for records on
+PostgreSQL, see `importer.py`), so that millions of records can be created
+in minutes with a bounded amount of memory.
+"""
+import datetime
+import random
+import uuid
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from django.db import transaction
+from django.utils import timezone
+
+from src.plan.changes import record_changes
+from src.plan.importer import load_records
+from src.plan.models import (
+    ChangeKind,
+    Exercise,
+    ExerciseType,
+    Goal,
+    Loop,
+    Plan,
+    Record,
+    Session,
+)
+from src.plan.versions import bump_versions
+
+# Rows of the parent model (plans or sessions) inserted at once
+CHUNK_SIZE = 1000
+
+EXERCISE_TYPE_WEIGHTS = {
+    ExerciseType.WORK: 7,
+    ExerciseType.REST: 2,
+    ExerciseType.PREPARATION: 1,
+}
+
+
+class GeneratorOptions(NamedTuple):
+    plans: int = 2
+    loops_per_plan: int = 4
+    goals_per_loop: int = 3
+    sessions: int = 1
+    records_per_session: int = 3
+    exercises: int = 6
+    seed: int = 0
+
+
+class GeneratedData(NamedTuple):
+    exercises: int
+    plans: int
+    loops: int
+    goals: int
+    sessions: int
+    records: int
+
+
+def _assign_ids(instances: Sequence, queryset, key: str) -> None:
+    """Set the primary key of bulk inserted instances if it is missing."""
+    if not instances or instances[0].pk is not None:
+        return None
+    ids: Dict = dict(queryset.values_list(key, 'id'))
+    for instance in instances:
+        instance.id = ids[getattr(instance, key)]
+    return None
+
+
+class DataGenerator:
+    def __init__(
+        self,
+        options: GeneratorOptions,
+        progress: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.progress = progress or (lambda message: None)
+        # Appended to the name of the rows of this run
+        self.suffix = f' ({uuid.uuid4().hex[:8]})'
+        self.now = timezone.now().replace(microsecond=0)
+        self.counts = dict.fromkeys(GeneratedData._fields, 0)
+
+    def generate(self) -> GeneratedData:
+        exercises = self.generate_exercises()
+        self.generate_plans(exercises)
+        self.generate_sessions(exercises)
+        bump_versions(Exercise, Plan, Loop, Goal, Session, Record)
+        return GeneratedData(**self.counts)
+
+    def _chunks(self, total: int):
+        for first in range(0, total, CHUNK_SIZE):
+            yield range(first, min(first + CHUNK_SIZE, total))
+
+    def generate_exercises(self) -> List[Exercise]:
+        exercise_types = list(EXERCISE_TYPE_WEIGHTS)
+        weights = list(EXERCISE_TYPE_WEIGHTS.values())
+        exercises = [
+            Exercise(
+                name=f'exercise {i}{self.suffix}',
+                description=f'description of the exercise {i}',
+                exercise_type=self.rng.choices(exercise_types, weights)[0],
+            )
+            for i in range(self.options.exercises)
+        ]
+        with transaction.atomic():
+            Exercise.objects.bulk_create(exercises)
+            _assign_ids(
+                exercises,
+                Exercise.objects.filter(name__endswith=self.suffix),
+                'name',
+            )
+            record_changes(
+                Exercise,
+                [exercise.id for exercise in exercises],
+                ChangeKind.CREATE,
+            )
+        self.counts['exercises'] = len(exercises)
+        self.progress(f'{len(exercises)} exercises')
+        return exercises
+
+    def generate_plans(self, exercises: List[Exercise]) -> None:
+        options = self.options
+        for chunk in self._chunks(options.plans):
+            plans = []
+            for i in chunk:
+                created = self.now - datetime.timedelta(
+                    days=self.rng.randint(1, 365),
+                    seconds=self.rng.randint(0, 86400),
+                )
+                plans.append(
+                    Plan(
+                        name=f'plan {i}{self.suffix}',
+                        description=f'description of the plan {i}',
+                        created=created,
+                        last_updated=min(
+                            created
+                            + datetime.timedelta(days=self.rng.randint(0, 30)),
+                            self.now,
+                        ),
+                    )
+                )
+            with transaction.atomic():
+                Plan.objects.bulk_create(plans)
+                _assign_ids(
+                    plans,
+                    Plan.objects.filter(name__endswith=self.suffix),
+                    'name',
+                )
+                loops = [
+                    Loop(
+                        plan=plan,
+                        loop_index=loop_index,
+                        rounds=self.rng.randint(1, 5),
+                        description=f'loop {loop_index}',
+                    )
+                    for plan in plans
+                    for loop_index in range(options.loops_per_plan)
+                ]
+                Loop.objects.bulk_create(loops)
+                if loops and loops[0].pk is None:
+                    ids = {
+                        (plan_id, loop_index): id
+                        for plan_id, loop_index, id in Loop.objects.filter(
+                            plan__in=plans
+                        ).values_list('plan_id', 'loop_index', 'id')
+                    }
+                    for loop in loops:
+                        loop.id = ids[(loop.plan_id, loop.loop_index)]
+                goals = [
+                    self.build_goal(loop, goal_index, exercises)
+                    for loop in loops
+                    for goal_index in range(options.goals_per_loop)
+                ]
+                Goal.objects.bulk_create(goals)
+                record_changes(
+                    Plan, [plan.id for plan in plans], ChangeKind.CREATE
+                )
+            self.counts['plans'] += len(plans)
+            self.counts['loops'] += len(loops)
+            self.counts['goals'] += len(goals)
+            self.progress(f'{self.counts["plans"]}/{options.plans} plans')
+
+    def build_goal(
+        self, loop: Loop, goal_index: int, exercises: List[Exercise]
+    ) -> Goal:
+        exercise = self.rng.choice(exercises)
+        work = exercise.exercise_type == ExerciseType.WORK
+        return Goal(
+            loop_id=loop.id,
+            exercise_id=exercise.id,
+            goal_index=goal_index,
+            duration=self.rng.randint(10, 120),
+            repetitions=self.rng.randint(1, 20) if work else 1,
+            pause=self.rng.random() < 0.1,
+        )
+
+    def generate_sessions(self, exercises: List[Exercise]) -> None:
+        options = self.options
+        # Sessions happen one after another, the last one ends at least an
+        # hour ago
+        session_length = datetime.timedelta(
+            seconds=options.records_per_session * 120 + 3600
+        )
+        first_start = (
+            self.now
+            - datetime.timedelta(hours=1)
+            - session_length * options.sessions
+        )
+        for chunk in self._chunks(options.sessions):
+            sessions = [
+                Session(
+                    name=f'session {i}{self.suffix}',
+                    start=first_start + session_length * i,
+                )
+                for i in chunk
+            ]
+            with transaction.atomic():
+                Session.objects.bulk_create(sessions)
+                _assign_ids(
+                    sessions,
+                    Session.objects.filter(name__endswith=self.suffix),
+                    'name',
+                )
+                records = [
+                    record
+                    for session in sessions
+                    for record in self.build_records(session, exercises)
+                ]
+                if records:
+                    load_records(records)
+                record_changes(
+                    Session,
+                    [session.id for session in sessions],
+                    ChangeKind.CREATE,
+                )
+            self.counts['sessions'] += len(sessions)
+            self.counts['records'] += len(records)
+            self.progress(
+                f'{self.counts["sessions"]}/{options.sessions} sessions, '
+                f'{self.counts["records"]} records'
+            )
+
+    def build_records(
+        self, session: Session, exercises: List[Exercise]
+    ) -> List[Record]:
+        records = []
+        start = session.start + datetime.timedelta(
+            seconds=self.rng.randint(0, 300)
+        )
+        for _ in range(self.options.records_per_session):
+            exercise = self.rng.choice(exercises)
+            work = exercise.exercise_type == ExerciseType.WORK
+            end = start + datetime.timedelta(seconds=self.rng.randint(20, 90))
+            records.append(
+                Record(
+                    session_id=session.id,
+                    exercise_id=exercise.id,
+                    start=start,
+                    end=end,
+                    reps=self.rng.randint(1, 20) if work else 0,
+                )
+            )
+            start = end + datetime.timedelta(seconds=self.rng.randint(0, 30))
+        return records
+
+
+def generate_data(
+    options: GeneratorOptions,
+    progress: Optional[Callable[[str], None]] = None,
+) -> GeneratedData:
+    return DataGenerator(options, progress).generate()
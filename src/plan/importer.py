@@ -0,0 +1,337 @@
+"""Bulk import of sessions and records from NDJSON or CSV.
+
+The rows have the same fields as the export (see `export.py`), where
+`exercise_type` is optional (WORK if the record has reps, REST otherwise):
+one row per record, with its session and the name of its exercise. Rows of
+the same session share their `session_id`, or their name and start when the
+id is missing. Rows without exercise import a session without records.
+
+Rows are read, validated and loaded in batches of IMPORT_BATCH_SIZE rows:
+
+- Exercises are resolved by name and type like `ExerciseService.get_or_create`
+  does, once per distinct exercise thanks to an in-memory map.
+- Records are validated in memory with `collect_errors`, so invalid rows are
+  reported with their line number and skipped, without aborting the import.
+- Records are loaded with COPY on PostgreSQL, and with chunked bulk inserts
+  on other databases.
+"""
+import csv
+import datetime
+import io
+import json
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from src.metrics import RECORDS_INGESTED
+from src.plan.changes import record_changes
+from src.plan.export import EXPORT_FORMATS, parse_datetime
+from src.plan.models import ChangeKind, Exercise, ExerciseType, Record, Session
+from src.plan.services import ExerciseService, RecordService, SessionService
+from src.plan.validation import collect_errors
+from src.plan.versions import bump_versions
+
+# (line number, row), the row is None if it could not be decoded
+NumberedRow = Tuple[int, Optional[Dict[str, Any]]]
+
+RECORD_COPY_FIELDS = ('session', 'exercise', 'start', 'end', 'reps')
+
+
+class RowError(NamedTuple):
+    line: int
+    message: str
+
+
+class ImportProgress(NamedTuple):
+    rows: int
+    sessions: int
+    records: int
+    errors: int
+
+
+class ImportResult(NamedTuple):
+    sessions: int
+    records: int
+    errors: List[RowError]
+
+
+def read_rows(file: TextIO, import_format: str) -> Iterator[NumberedRow]:
+    """Yield the rows of the file along with their line number."""
+    if import_format not in EXPORT_FORMATS:
+        formats = ', '.join(EXPORT_FORMATS)
+        raise Exception(
+            f'Unknown import format {import_format!r}, use one of: {formats}'
+        )
+    if import_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        decoded: Optional[Any]
+        try:
+            decoded = json.loads(line)
+        except ValueError:
+            decoded = None
+        yield line_number, decoded if isinstance(decoded, dict) else None
+
+
+def _format_field_errors(fields: Dict[str, List[str]]) -> str:
+    return '; '.join(
+        f'{field}: {" ".join(messages)}' for field, messages in fields.items()
+    )
+
+
+def _format_error(error: Exception) -> str:
+    if isinstance(error, ValidationError) and hasattr(error, 'error_dict'):
+        return _format_field_errors(error.message_dict)
+    if isinstance(error, ValidationError):
+        return ' '.join(error.messages)
+    return str(error)
+
+
+def _get(row: Dict[str, Any], field: str) -> Any:
+    """Return the value of a field, None if missing or empty."""
+    value = row.get(field)
+    return None if value == '' else value
+
+
+class _ExerciseResolver:
+    """Resolve exercises by name and type, querying each of them once."""
+
+    def __init__(self) -> None:
+        self.exercises: Dict[Tuple[str, str], Exercise] = {}
+
+    def resolve(self, name: str, exercise_type: str) -> Exercise:
+        key = (name, exercise_type)
+        if key not in self.exercises:
+            self.exercises[key] = ExerciseService.get_or_create(
+                name=name, exercise_type=exercise_type
+            )
+        return self.exercises[key]
+
+
+def _copy_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def copy_records(records: List[Record]) -> None:
+    """Insert the records with a single COPY statement (PostgreSQL only)."""
+    fields = [Record._meta.get_field(name) for name in RECORD_COPY_FIELDS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(
+            [_copy_value(getattr(record, field.attname)) for field in fields]
+        )
+    buffer.seek(0)
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in fields)
+    table = quote_name(Record._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(
+            f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+
+
+def load_records(records: List[Record]) -> None:
+    if connection.vendor == 'postgresql':
+        copy_records(records)
+    else:
+        RecordService.bulk_create(records)
+
+
+class SessionImporter:
+    def __init__(
+        self, progress: Optional[Callable[[ImportProgress], None]] = None
+    ) -> None:
+        self.progress = progress
+        self.exercises = _ExerciseResolver()
+        # Session of each session key of the file, None if it is invalid
+        self.sessions: Dict[Tuple, Optional[Session]] = {}
+        self.rows = 0
+        self.sessions_created = 0
+        self.records_created = 0
+        self.errors: List[RowError] = []
+
+    def get_session_key(self, row: Dict[str, Any]) -> Tuple:
+        session_id = _get(row, 'session_id')
+        if session_id is not None:
+            return ('id', str(session_id))
+        return ('name', _get(row, 'session_name'), _get(row, 'session_start'))
+
+    def build_session(self, row: Dict[str, Any]) -> Session:
+        start = _get(row, 'session_start')
+        return Session(
+            name=_get(row, 'session_name'),
+            description=_get(row, 'session_description') or '',
+            notes=_get(row, 'session_notes') or '',
+            start=parse_datetime(start) if start else None,
+        )
+
+    def get_record_fields(self, row: Dict[str, Any]) -> Optional[Dict]:
+        """Return the fields of the record of the row, None if it has none."""
+        exercise_name = _get(row, 'exercise_name')
+        if exercise_name is None:
+            return None
+        reps = int(_get(row, 'reps') or 0)
+        exercise_type = _get(row, 'exercise_type') or (
+            ExerciseType.WORK if reps > 0 else ExerciseType.REST
+        )
+        if exercise_type not in ExerciseType.values:
+            raise Exception(f'Unknown exercise type {exercise_type!r}')
+        return {
+            'exercise': self.exercises.resolve(exercise_name, exercise_type),
+            'start': parse_datetime(_get(row, 'record_start') or ''),
+            'end': parse_datetime(_get(row, 'record_end') or ''),
+            'reps': reps,
+        }
+
+    def add_error(self, line: int, error: Any) -> None:
+        if isinstance(error, dict):
+            message = _format_field_errors(error)
+        else:
+            message = _format_error(error)
+        self.errors.append(RowError(line, message))
+
+    def create_sessions(
+        self, new_sessions: Dict[Tuple, Tuple[int, Session]]
+    ) -> None:
+        """Validate and insert the sessions first seen in a batch."""
+        keys = list(new_sessions)
+        sessions = [new_sessions[key][1] for key in keys]
+        errors = collect_errors(sessions)
+        valid_sessions = []
+        for index, (key, session) in enumerate(zip(keys, sessions)):
+            if index in errors:
+                self.add_error(new_sessions[key][0], errors[index])
+                self.sessions[key] = None
+            else:
+                valid_sessions.append(session)
+                self.sessions[key] = session
+        SessionService.bulk_create(valid_sessions)
+        record_changes(
+            Session,
+            [session.id for session in valid_sessions],
+            ChangeKind.CREATE,
+        )
+        self.sessions_created += len(valid_sessions)
+
+    def import_batch(self, rows: List[NumberedRow]) -> None:
+        # Rows with a record, and the first row of each new session
+        record_rows: List[Tuple[int, Tuple, Dict]] = []
+        new_sessions: Dict[Tuple, Tuple[int, Session]] = {}
+        for line, row in rows:
+            if row is None:
+                self.add_error(line, 'The row is not a valid JSON object')
+                continue
+            try:
+                key = self.get_session_key(row)
+                if key not in self.sessions and key not in new_sessions:
+                    new_sessions[key] = (line, self.build_session(row))
+                record_fields = self.get_record_fields(row)
+            except Exception as e:
+                self.add_error(line, e)
+                continue
+            if record_fields is not None:
+                record_rows.append((line, key, record_fields))
+        self.create_sessions(new_sessions)
+
+        lines: List[int] = []
+        records: List[Record] = []
+        for line, key, record_fields in record_rows:
+            session = self.sessions[key]
+            if session is None:
+                # The error is reported on the first row of the session
+                if key not in new_sessions or new_sessions[key][0] != line:
+                    self.add_error(line, 'The session of the row is invalid')
+                continue
+            try:
+                record = RecordService.build(session=session, **record_fields)
+            except Exception as e:
+                self.add_error(line, e)
+                continue
+            lines.append(line)
+            records.append(record)
+
+        errors = collect_errors(records, exclude=['session'])
+        for index, fields in errors.items():
+            self.add_error(lines[index], fields)
+        valid_records = [
+            record
+            for index, record in enumerate(records)
+            if index not in errors
+        ]
+        if valid_records:
+            load_records(valid_records)
+        # Records added to sessions created by a previous batch of the file
+        # update them
+        new_session_ids = {
+            session.id
+            for session in map(self.sessions.get, new_sessions)
+            if session is not None
+        }
+        record_changes(
+            Session,
+            {record.session_id for record in valid_records} - new_session_ids,
+            ChangeKind.UPDATE,
+        )
+        self.records_created += len(valid_records)
+
+    def flush(self, batch: List[NumberedRow]) -> None:
+        records_created = self.records_created
+        with transaction.atomic():
+            self.import_batch(batch)
+            bump_versions(Exercise, Session, Record)
+        RECORDS_INGESTED.labels('import').inc(
+            self.records_created - records_created
+        )
+        self.rows += len(batch)
+        if self.progress is not None:
+            self.progress(
+                ImportProgress(
+                    rows=self.rows,
+                    sessions=self.sessions_created,
+                    records=self.records_created,
+                    errors=len(self.errors),
+                )
+            )
+
+    def run(self, rows: Iterable[NumberedRow]) -> ImportResult:
+        batch: List[NumberedRow] = []
+        for numbered_row in rows:
+            batch.append(numbered_row)
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        self.errors.sort()
+        return ImportResult(
+            self.sessions_created, self.records_created, self.errors
+        )
+
+
+def import_sessions(
+    file: TextIO,
+    import_format: str,
+    progress: Optional[Callable[[ImportProgress], None]] = None,
+) -> ImportResult:
+    """Import the sessions and records of an NDJSON or CSV file."""
+    rows = read_rows(file, import_format)
+    return SessionImporter(progress).run(rows)
@@ -1,112 +1,43 @@
-import datetime
-import time
-import uuid
+from django.core.management.base import BaseCommand, CommandError
 
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+from src.plan.generator import GeneratorOptions, generate_data
 
-from src.plan.models import (
-    Exercise,
-    ExerciseType,
-    Goal,
-    Loop,
-    Plan,
-    Record,
-    Session,
-)
 
-
-def create_uuid() -> str:
-    return str(uuid.uuid4())
-
-
-def generate_exercise() -> Exercise:
-    exercise = Exercise(
-        name=f"exercise name {create_uuid()}",
-        description=f"exercise description {create_uuid()}",
-        exercise_type=ExerciseType.WORK,
-    )
-    exercise.save()
-    return exercise
-
-
-def generate_goal(loop: Loop, index: int, exercise: Exercise) -> Goal:
-    goal = Goal(
-        loop=loop,
-        exercise=exercise,
-        goal_index=index,
-        duration=10,
-        repetitions=3,
-    )
-    goal.save()
-    return goal
-
-
-def generate_loop(plan: Plan, index: int) -> Loop:
-    loop = Loop(
-        plan=plan,
-        rounds=2,
-        loop_index=index,
-        description=f"description of the Loop {create_uuid()}",
-    )
-    loop.save()
-    return loop
-
-
-def generate_plan() -> Plan:
-    creation_datetime = timezone.now() - datetime.timedelta(hours=1)
-    plan = Plan(
-        name=f"plan name {create_uuid()}",
-        description=f"plan description {create_uuid()}",
-        created=creation_datetime,
-        last_updated=creation_datetime,
+class Command(BaseCommand):
+    help = (
+        "Creates random exercises, plans and sessions. The same options and "
+        "seed draw the same random values, timestamps are relative to the "
+        "current time and names are tagged with the run"
     )
-    plan.save()
-    return plan
 
-
-def generate_whole_plan() -> None:
-    """Creates a Plan, with Loops, Goals and Exercises."""
-    plan = generate_plan()
-
-    loops = [generate_loop(plan, i) for i in range(4)]
-
-    exercises = [(generate_exercise(), i) for i in range(3)]
-
-    goals = []
-    for loop in loops:
-        for exercise, i in exercises:
-            goal = generate_goal(loop, i, exercise)
-            goals.append(goal)
-
-
-def generate_session() -> Session:
-    session = Session(name='my session', start=timezone.now())
-    session.save()
-    return session
-
-
-def generate_record(session: Session, exercise: Exercise) -> Record:
-    start = timezone.now()
-    time.sleep(0.01)
-    end = timezone.now()
-    record = Record(session=session, exercise=exercise, start=start, end=end)
-    record.save()
-    return record
-
-
-def generate_whole_session() -> None:
-    session = generate_session()
-    exercise = Exercise.objects.first()
-    generate_record(session, exercise)
-    generate_record(session, exercise)
-    generate_record(session, exercise)
-
-
-class Command(BaseCommand):
-    help = "Creates random plan data"
+    def add_arguments(self, parser):
+        defaults = GeneratorOptions()
+        for option in GeneratorOptions._fields:
+            parser.add_argument(
+                f'--{option.replace("_", "-")}',
+                type=int,
+                default=getattr(defaults, option),
+                help=f'Defaults to {getattr(defaults, option)}',
+            )
 
     def handle(self, *args, **kwargs):
-        generate_whole_plan()
-        generate_whole_plan()
-        generate_whole_session()
+        options = GeneratorOptions(
+            **{option: kwargs[option] for option in GeneratorOptions._fields}
+        )
+        if any(value < 0 for value in options):
+            raise CommandError('The options must not be negative')
+        needs_exercises = (
+            options.plans * options.loops_per_plan * options.goals_per_loop
+            or options.sessions * options.records_per_session
+        )
+        if needs_exercises and not options.exercises:
+            raise CommandError('Goals and records need at least one exercise')
+
+        generated = generate_data(options, progress=self.stdout.write)
+        self.stdout.write(
+            ', '.join(
+                f'{count} {name}'
+                for name, count in generated._asdict().items()
+            )
+            + ' created'
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.plan.export import EXPORT_FORMATS, export_sessions, parse_datetime
+
+
+def parse_datetime_argument(value):
+    try:
+        return parse_datetime(value)
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+class Command(BaseCommand):
+    help = "Exports the sessions and their records as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=list(EXPORT_FORMATS), default='ndjson',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only export sessions started at or after this date(time)',
+        )
+        parser.add_argument(
+            '--until',
+            help='Only export sessions started before this date(time)',
+        )
+        parser.add_argument(
+            '--output', help='File to write to, defaults to the stdout',
+        )
+
+    def handle(self, *args, **options):
+        since, until = (
+            parse_datetime_argument(options[name]) if options[name] else None
+            for name in ('since', 'until')
+        )
+        chunks = export_sessions(options['format'], since, until)
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.plan.export import EXPORT_FORMATS
+from src.plan.importer import import_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports sessions and records from an NDJSON or CSV file, reporting "
+        "the rows that could not be imported"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_FORMATS),
+            help='Defaults to the extension of the file',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['format'] or path.rsplit('.', 1)[-1]
+        if import_format not in EXPORT_FORMATS:
+            raise CommandError(
+                f'Unknown format of {path}, use --format to specify it'
+            )
+        try:
+            with open(path, newline='', encoding='utf-8') as file:
+                result = import_sessions(
+                    file, import_format, progress=self.report_progress
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in result.errors:
+            self.stderr.write(f'Line {error.line}: {error.message}')
+        self.stdout.write(
+            f'Imported {result.sessions} sessions and {result.records} '
+            f'records, {len(result.errors)} rows failed'
+        )
+
+    def report_progress(self, progress):
+        self.stdout.write(
+            f'{progress.rows} rows read: {progress.sessions} sessions, '
+            f'{progress.records} records, {progress.errors} errors'
+        )
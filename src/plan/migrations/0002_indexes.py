@@ -0,0 +1,37 @@
+# Generated by Django 3.0.4 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['name', 'created'], name='plan_name_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['last_updated', 'id'], name='plan_last_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['session', 'start'], name='record_session_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['start', 'id'], name='session_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='goal',
+            constraint=models.UniqueConstraint(fields=('loop', 'goal_index'), name='unique_goal_index'),
+        ),
+        migrations.AddConstraint(
+            model_name='loop',
+            constraint=models.UniqueConstraint(fields=('plan', 'loop_index'), name='unique_loop_index'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.4 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='description',
+            field=models.TextField(blank=True, default='', help_text='Optional space for details about the exercise, technique, caveats...'),
+        ),
+    ]
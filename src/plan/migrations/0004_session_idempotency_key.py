@@ -0,0 +1,18 @@
+# Generated by Django 3.0.4 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0003_exercise_description_blank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Key given by the client to the session when recording it.', max_length=64, null=True, unique=True),
+        ),
+    ]
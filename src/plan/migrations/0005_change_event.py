@@ -0,0 +1,45 @@
+# Generated by Django 3.0.4 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+BACKFILLED_MODELS = ('exercise', 'plan', 'session')
+BATCH_SIZE = 1000
+
+
+def backfill_change_events(apps, schema_editor):
+    """Record the creation of the existing rows, for clients to sync them."""
+    ChangeEvent = apps.get_model('plan', 'ChangeEvent')
+    for model_name in BACKFILLED_MODELS:
+        model = apps.get_model('plan', model_name)
+        ids = model.objects.order_by('id').values_list('id', flat=True)
+        events = []
+        for id in ids.iterator():
+            events.append(
+                ChangeEvent(model=model_name, object_id=id, kind='CREATE')
+            )
+            if len(events) >= BATCH_SIZE:
+                ChangeEvent.objects.bulk_create(events)
+                events = []
+        ChangeEvent.objects.bulk_create(events)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0004_session_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text='Name of the model of the changed row.', max_length=32)),
+                ('object_id', models.IntegerField(help_text='ID of the changed row.')),
+                ('kind', models.CharField(choices=[('CREATE', 'Create'), ('UPDATE', 'Update'), ('DELETE', 'Delete')], max_length=6)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(
+            backfill_change_events, migrations.RunPython.noop
+        ),
+    ]
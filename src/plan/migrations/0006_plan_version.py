@@ -0,0 +1,18 @@
+# Generated by Django 3.0.4 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0005_change_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented by the backend when the loops or goals of the plan change, so that its compiled timeline is compiled again.'),
+        ),
+    ]
@@ -36,6 +36,7 @@ class Exercise(models.Model):
         help_text='Short name for the user to identify the exercise.',
     )
     description = models.TextField(
+        blank=True,
         default=EMPTY_STRING,
         help_text='Optional space for details about the exercise, technique, caveats...',
     )
@@ -75,6 +76,13 @@ class Goal(models.Model):
         help_text='Specifies if the goal waits for users approval to run or not.',
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['loop', 'goal_index'], name='unique_goal_index'
+            ),
+        ]
+
     def __repr__(self) -> str:
         return f"<Goal #{self.id}>"
 
@@ -99,6 +107,13 @@ class Loop(models.Model):
         help_text='Optional description for a group of goals.',
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['plan', 'loop_index'], name='unique_loop_index'
+            ),
+        ]
+
     def __repr__(self) -> str:
         return f"<Loop #{self.id}>"
 
@@ -120,6 +135,21 @@ class Plan(models.Model):
         null=False,
         help_text='Moment at which the plan was update for last time in the client. This time has nothing to do with when was the plan updated in the backend.',
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text='Incremented by the backend when the loops or goals of the plan change, so that its compiled timeline is compiled again.',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['name', 'created'], name='plan_name_created_idx'
+            ),
+            # Keyset pagination
+            models.Index(
+                fields=['last_updated', 'id'], name='plan_last_updated_idx'
+            ),
+        ]
 
     def __repr__(self) -> str:
         return f"<Plan '{self.name}'>"
@@ -153,6 +183,21 @@ class Session(models.Model):
         help_text='Moment at which the session started.',
         validators=[is_not_future_datetime],
     )
+    # Generated by the client for each session recorded offline, so that
+    # replaying the sync of a session does not store it twice
+    idempotency_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text='Key given by the client to the session when recording it.',
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset pagination
+            models.Index(fields=['start', 'id'], name='session_start_idx'),
+        ]
 
     def __repr__(self) -> str:
         return f"<Session '{self.name}'>"
@@ -189,5 +234,34 @@ class Record(models.Model):
         help_text='Amount of times the execise was repeated during the record.',
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['session', 'start'], name='record_session_start_idx'
+            ),
+        ]
+
     def __repr__(self) -> str:
         return f"<Record '{self.exercise.name}'>"
+
+
+class ChangeKind(models.TextChoices):
+    CREATE = 'CREATE'
+    UPDATE = 'UPDATE'
+    DELETE = 'DELETE'
+
+
+class ChangeEvent(models.Model):
+    """Append-only log of the writes to the plan models, see `changes.py`."""
+
+    # Ordered and indexed, clients sync from the id of the last event seen
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(
+        max_length=32, help_text='Name of the model of the changed row.',
+    )
+    object_id = models.IntegerField(help_text='ID of the changed row.')
+    kind = models.CharField(max_length=6, choices=ChangeKind.choices)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __repr__(self) -> str:
+        return f"<ChangeEvent {self.kind} {self.model} #{self.object_id}>"
@@ -0,0 +1,103 @@
+"""Buffered, coalesced inserts of the records appended to live sessions.
+
+Clients call `appendRecords` every few seconds during a session, so that a
+crash does not lose the workout and the final upload stays small. Instead of
+an INSERT per call, each process buffers the appended records and flushes
+the appends of every session at once (group commit):
+
+- The first append to an empty buffer leads the next flush. When other
+  appends are in flight, it waits up to RECORD_BUFFER_DELAY_MS for more
+  appends, or until the buffer holds RECORD_BUFFER_SIZE records, then writes
+  all of them at once (see `SessionService.append_records`). A lone append
+  is written right away.
+- Each append returns once its records are committed, so acknowledged
+  records are never lost, and the session can be read while it grows.
+
+Records are validated before being buffered, but a write can still fail
+(e.g. a session was deleted meanwhile). Then the appends of the flush are
+written one by one, so that only the failing ones fail.
+"""
+import threading
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from src.plan.models import Record
+
+
+class _Append:
+    def __init__(self, records: List[Record]) -> None:
+        self.records = records
+        self.flushed = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+class RecordBuffer:
+    def __init__(self, write: Callable[[List[Record]], None]) -> None:
+        # Inserts the records of a flush in a single transaction
+        self.write = write
+        self._lock = threading.Lock()
+        self._appends: List[_Append] = []
+        self._size = 0
+        self._full = threading.Event()
+        # Appends waiting for their records to be written
+        self._in_flight = 0
+
+    def append(self, records: List[Record]) -> None:
+        """Insert the records along with the appends of other requests."""
+        if settings.RECORD_BUFFER_DELAY_MS <= 0 or connection.in_atomic_block:
+            # Records written by the transaction of another request would be
+            # lost if this one rolled back
+            self.write(records)
+            return None
+
+        append = _Append(records)
+        with self._lock:
+            self._appends.append(append)
+            self._size += len(records)
+            self._in_flight += 1
+            leads_flush = len(self._appends) == 1
+            # Nobody else would join the flush
+            alone = self._in_flight == 1
+            if self._size >= settings.RECORD_BUFFER_SIZE:
+                self._full.set()
+        try:
+            if leads_flush:
+                if not alone:
+                    self._full.wait(settings.RECORD_BUFFER_DELAY_MS / 1000)
+                self.flush()
+            append.flushed.wait()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        if append.error is not None:
+            raise append.error
+        return None
+
+    def flush(self) -> None:
+        with self._lock:
+            appends = self._appends
+            self._appends = []
+            self._size = 0
+            self._full.clear()
+        try:
+            self.write(
+                [record for append in appends for record in append.records]
+            )
+        except Exception as e:
+            if len(appends) == 1:
+                appends[0].error = e
+            else:
+                self._write_each(appends)
+        finally:
+            for append in appends:
+                append.flushed.set()
+
+    def _write_each(self, appends: List[_Append]) -> None:
+        """Write the appends one by one, so that only failing ones fail."""
+        for append in appends:
+            try:
+                self.write(append.records)
+            except Exception as e:
+                append.error = e
@@ -1,10 +1,26 @@
 import datetime
-from typing import Any, List, NoReturn, Optional, Union
+import enum
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    NoReturn,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import django
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 
+from src.metrics import RECORDS_INGESTED
+from src.plan.changes import record_changes, record_exercise_deletion
+from src.plan.compiler import invalidate_compiled_plans
 from src.plan.models import (
+    ChangeKind,
     Exercise,
     ExerciseType,
     Goal,
@@ -13,10 +29,35 @@ from src.plan.models import (
     Record,
     Session,
 )
+from src.plan.record_buffer import RecordBuffer
+from src.plan.validation import (
+    ItemErrors,
+    collect_errors,
+    validate_instance,
+    validate_instances,
+)
+from src.plan.versions import bump_versions
 
 NO_RECORDS: List[Record] = []
 NO_LOOPS: List[Loop] = []
 
+# Amount of rows sent to the database per INSERT statement when bulk inserting
+RECORDS_BATCH_SIZE = 500
+
+
+class SyncStatus(enum.Enum):
+    CREATED = 'CREATED'
+    # The session was already synced with the same idempotency key
+    DUPLICATE = 'DUPLICATE'
+    INVALID = 'INVALID'
+
+
+class SyncResult(NamedTuple):
+    idempotency_key: str
+    status: SyncStatus
+    session: Optional[Session]
+    errors: List[str]
+
 
 def get_default_from_model(
     model: django.db.models.Model, field_name: str
@@ -115,6 +156,20 @@ def validate_loop_and_goal_indexes(loops: List[Loop]) -> Optional[NoReturn]:
     return None
 
 
+def assign_loop_ids(plan: Plan, loops: List[Loop]) -> None:
+    """Set the primary key of Loops inserted with `bulk_create`.
+
+    PostgreSQL returns the primary keys of bulk inserted rows, but other
+    backends do not, in which case they are fetched with a single query.
+    """
+    if not loops or loops[0].pk is not None:
+        return None
+    ids = dict(Loop.objects.filter(plan=plan).values_list('loop_index', 'id'))
+    for loop in loops:
+        loop.id = ids[loop.loop_index]
+    return None
+
+
 class ExerciseService:
     @staticmethod
     def create(
@@ -126,8 +181,11 @@ class ExerciseService:
         exercise = Exercise(
             name=name, description=description, exercise_type=exercise_type
         )
-        exercise.full_clean()
-        exercise.save()
+        validate_instance(exercise)
+        with transaction.atomic():
+            exercise.save()
+            record_changes(Exercise, [exercise.id], ChangeKind.CREATE)
+            bump_versions(Exercise)
         return exercise
 
     @staticmethod
@@ -137,6 +195,11 @@ class ExerciseService:
         except Exercise.DoesNotExist:
             return None
 
+    @staticmethod
+    def get_by_ids(ids: Iterable[int]) -> Dict[int, Exercise]:
+        """Return the existing Exercises with the given IDs, keyed by ID."""
+        return Exercise.objects.in_bulk({int(id) for id in ids})
+
     @staticmethod
     def get_or_create(
         *, name: str, description: str = None, exercise_type: str,
@@ -176,7 +239,13 @@ class ExerciseService:
         exercise = ExerciseService.get_by_id(id)
         if not exercise:
             return False
-        deleted_resources = exercise.delete()
+        with transaction.atomic():
+            record_exercise_deletion(exercise)
+            invalidate_compiled_plans(
+                Plan.objects.filter(loops__goals__exercise=exercise)
+            )
+            deleted_resources = exercise.delete()
+            bump_versions(Exercise, Goal, Record)
         # deleted_resources example:
         # (8, {'plan.Goal': 4, 'plan.Record': 3, 'plan.Exercise': 1})
         if len(deleted_resources) == 2:
@@ -202,8 +271,12 @@ class GoalService:
             repetitions=repetitions,
             pause=pause,
         )
-        goal.full_clean()
-        goal.save()
+        validate_instance(goal)
+        with transaction.atomic():
+            goal.save()
+            invalidate_compiled_plans(Plan.objects.filter(pk=loop.plan_id))
+            record_changes(Plan, [loop.plan_id], ChangeKind.UPDATE)
+            bump_versions(Goal)
         return goal
 
 
@@ -222,8 +295,12 @@ class LoopService:
             loop_index=loop_index,
             description=description,
         )
-        loop.full_clean()
-        loop.save()
+        validate_instance(loop)
+        with transaction.atomic():
+            loop.save()
+            invalidate_compiled_plans(Plan.objects.filter(pk=plan.id))
+            record_changes(Plan, [plan.id], ChangeKind.UPDATE)
+            bump_versions(Loop)
         return loop
 
 
@@ -237,42 +314,69 @@ class PlanService:
         loops: List[Loop] = NO_LOOPS,
     ) -> Plan:
         validate_loop_and_goal_indexes(loops)
-        with transaction.atomic():
-            plan = Plan(
-                name=name,
-                description=description,
-                created=created,
-                last_updated=created,
+        exercises = ExerciseService.get_by_ids(
+            goal_data.exercise_id
+            for loop_data in loops
+            for goal_data in loop_data.goals
+        )
+
+        # Build and validate everything in memory first, so that the amount
+        # of queries does not depend on the size of the plan
+        plan = Plan(
+            name=name,
+            description=description,
+            created=created,
+            last_updated=created,
+        )
+        validate_instance(plan)
+
+        new_loops: List[Loop] = []
+        new_goals_per_loop: List[List[Goal]] = []
+        for loop_data in loops:
+            loop = Loop(
+                rounds=loop_data.rounds,
+                loop_index=loop_data.loop_index,
+                description=loop_data.description,
             )
-            plan.full_clean()
-            plan.save()
+            new_loops.append(loop)
 
-            for loop_data in loops:
-                loop = Loop(
-                    plan=plan,
-                    rounds=loop_data.rounds,
-                    loop_index=loop_data.loop_index,
-                    description=loop_data.description,
+            new_goals: List[Goal] = []
+            for goal_data in loop_data.goals:
+                exercise = exercises.get(goal_data.exercise_id)
+                if not exercise:
+                    raise Exception(
+                        f'It was not possible to create Goal because there is no Exercise with ID {goal_data.exercise_id}. Loop {loop_data.loop_index}, Goal {goal_data.goal_index}'
+                    )
+                goal = Goal(
+                    exercise=exercise,
+                    goal_index=goal_data.goal_index,
+                    duration=goal_data.duration,
+                    repetitions=goal_data.repetitions,
+                    pause=goal_data.pause,
                 )
-                loop.full_clean()
-                loop.save()
+                new_goals.append(goal)
+            new_goals_per_loop.append(new_goals)
 
-                for goal_data in loop_data.goals:
-                    exercise = ExerciseService.get_by_id(goal_data.exercise_id)
-                    if not exercise:
-                        raise Exception(
-                            f'It was not possible to create Goal because there is no Exercise with ID {goal_data.exercise_id}. Loop {loop_data.loop_index}, Goal {goal_data.goal_index}'
-                        )
-                    goal = Goal(
-                        loop=loop,
-                        exercise=exercise,
-                        goal_index=goal_data.goal_index,
-                        duration=goal_data.duration,
-                        repetitions=goal_data.repetitions,
-                        pause=goal_data.pause,
-                    )
-                    goal.full_clean()
-                    goal.save()
+        all_new_goals = [
+            goal for new_goals in new_goals_per_loop for goal in new_goals
+        ]
+        validate_instances(new_loops, exclude=['plan'])
+        validate_instances(all_new_goals, exclude=['loop'])
+
+        with transaction.atomic():
+            plan.save()
+
+            for loop in new_loops:
+                loop.plan = plan
+            Loop.objects.bulk_create(new_loops)
+            assign_loop_ids(plan, new_loops)
+
+            for loop, new_goals in zip(new_loops, new_goals_per_loop):
+                for goal in new_goals:
+                    goal.loop = loop
+            Goal.objects.bulk_create(all_new_goals)
+            record_changes(Plan, [plan.id], ChangeKind.CREATE)
+            bump_versions(Plan, Loop, Goal)
 
         return plan
 
@@ -293,8 +397,28 @@ class RecordService:
     def create(cls, **kwargs) -> Record:
         cls._validate_exercise_type_and_record_reps(**kwargs)
         record = Record(**kwargs)
-        record.full_clean()
-        return record.save()
+        validate_instance(record)
+        with transaction.atomic():
+            record.save()
+            record_changes(Session, [record.session_id], ChangeKind.UPDATE)
+            bump_versions(Record)
+        return record
+
+    @classmethod
+    def build(cls, **kwargs) -> Record:
+        """Return an unsaved Record after checking its exercise type and reps.
+
+        The fields are not validated, use `validate_instances` to validate
+        many Records at once before calling `bulk_create`.
+        """
+        cls._validate_exercise_type_and_record_reps(**kwargs)
+        return Record(**kwargs)
+
+    @staticmethod
+    def bulk_create(records: List[Record]) -> List[Record]:
+        return Record.objects.bulk_create(
+            records, batch_size=RECORDS_BATCH_SIZE
+        )
 
     @classmethod
     def _validate_exercise_type_and_record_reps(
@@ -331,23 +455,254 @@ class SessionService:
         start: datetime.datetime,
         records: List[Record] = NO_RECORDS,
     ) -> Session:
+        session = Session(
+            name=name, description=description, notes=notes, start=start
+        )
+        validate_instance(session)
+        new_records = cls._build_records(records)
+
         with transaction.atomic():
-            session = Session(
-                name=name, description=description, notes=notes, start=start
+            session.save()
+            for new_record in new_records:
+                new_record.session = session
+            RecordService.bulk_create(new_records)
+            record_changes(Session, [session.id], ChangeKind.CREATE)
+            bump_versions(Session, Record)
+        RECORDS_INGESTED.labels('create_session').inc(len(new_records))
+        return session
+
+    @classmethod
+    def append_records(cls, *, id: int, records: List[Record]) -> Session:
+        """Add records to a session while it is being recorded."""
+        try:
+            session = Session.objects.get(pk=id)
+        except Session.DoesNotExist:
+            raise Exception(
+                f'Failed to append Records because the Session with ID {id} does not exist'
+            )
+        new_records = cls._build_records(records)
+        for new_record in new_records:
+            new_record.session = session
+        record_buffer.append(new_records)
+        return session
+
+    @staticmethod
+    def _write_appended_records(records: List[Record]) -> None:
+        # Records of the same session are inserted in the order they started
+        records.sort(key=lambda record: (record.session_id, record.start))
+        with transaction.atomic():
+            RecordService.bulk_create(records)
+            record_changes(
+                Session,
+                {record.session_id for record in records},
+                ChangeKind.UPDATE,
+            )
+            bump_versions(Record)
+        RECORDS_INGESTED.labels('append_records').inc(len(records))
+
+    @staticmethod
+    def _build_records(records: List[Record]) -> List[Record]:
+        """Build and validate the records of a session."""
+        exercises = ExerciseService.get_by_ids(
+            record.exercise_id for record in records
+        )
+        new_records: List[Record] = []
+        for record in records:
+            exercise = exercises.get(int(record.exercise_id))
+            if not exercise:
+                raise Exception(
+                    f"""Failed to create Record because there the Exercise with ID {record.exercise_id} does not exist. Record data: start={record.start.isoformat()}, end={record.end.isoformat()}"""
+                )
+            new_record = RecordService.build(
+                start=record.start,
+                end=record.end,
+                reps=record.reps,
+                exercise=exercise,
             )
-            session.full_clean()
+            new_records.append(new_record)
+        validate_instances(new_records, exclude=['session'])
+        return new_records
+
+    @staticmethod
+    def bulk_create(sessions: List[Session]) -> None:
+        """Insert the sessions, setting their primary key."""
+        if connection.features.can_return_rows_from_bulk_insert:
+            Session.objects.bulk_create(sessions)
+            return None
+        # Bulk inserted sessions could not be told apart to fetch their ids
+        for session in sessions:
             session.save()
-            for record in records:
-                exercise = ExerciseService.get_by_id(record.exercise_id)
-                if not exercise:
-                    raise Exception(
-                        f"""Failed to create Record because there the Exercise with ID {record.exercise_id} does not exist. Record data: start={record.start.isoformat()}, end={record.end.isoformat()}"""
+        return None
+
+    @classmethod
+    def sync(cls, sessions: List[Dict[str, Any]]) -> List[SyncResult]:
+        """Create the sessions recorded offline, skipping the synced ones.
+
+        Each session has the arguments of `create` plus the `idempotency_key`
+        generated by the client. Sessions are inserted in batches of
+        SYNC_BATCH_SIZE, each in its own transaction, and invalid sessions
+        are reported without aborting the others. Return the result of each
+        session, in order.
+        """
+        results: List[SyncResult] = []
+        size = settings.SYNC_BATCH_SIZE
+        for start in range(0, len(sessions), size):
+            batch = sessions[start : start + size]
+            try:
+                with transaction.atomic():
+                    results.extend(cls._sync_batch(batch))
+            except IntegrityError as e:
+                if not _is_idempotency_key_conflict(e):
+                    raise
+                # A concurrent sync inserted some of the keys first, they are
+                # found as duplicates on the second attempt
+                with transaction.atomic():
+                    results.extend(cls._sync_batch(batch))
+        return results
+
+    @classmethod
+    def _sync_batch(cls, items: List[Dict[str, Any]]) -> List[SyncResult]:
+        keys = [item['idempotency_key'] for item in items]
+        synced = {
+            session.idempotency_key: session
+            for session in Session.objects.filter(idempotency_key__in=keys)
+        }
+        exercises = ExerciseService.get_by_ids(
+            record.exercise_id
+            for item in items
+            for record in item.get('records') or NO_RECORDS
+            if str(record.exercise_id).isdigit()
+        )
+
+        # Position of the first item of each key to create
+        first_items: Dict[str, int] = {}
+        errors: Dict[int, List[str]] = {}
+        sessions: List[Session] = []
+        records: List[Record] = []
+        # Position of the item of each session and record, and record index
+        session_items: List[int] = []
+        record_items: List[Tuple[int, int]] = []
+        for position, item in enumerate(items):
+            key = item['idempotency_key']
+            if key in synced or key in first_items:
+                continue
+            first_items[key] = position
+            session = Session(
+                name=item['name'],
+                description=item.get('description') or '',
+                notes=item.get('notes') or '',
+                start=item['start'],
+                idempotency_key=key,
+            )
+            sessions.append(session)
+            session_items.append(position)
+            for index, record in enumerate(item.get('records') or NO_RECORDS):
+                exercise_id = str(record.exercise_id)
+                exercise = (
+                    exercises.get(int(exercise_id))
+                    if exercise_id.isdigit()
+                    else None
+                )
+                try:
+                    if exercise is None:
+                        raise Exception(
+                            f'The Exercise with ID {record.exercise_id} does '
+                            f'not exist'
+                        )
+                    new_record = RecordService.build(
+                        session=session,
+                        start=record.start,
+                        end=record.end,
+                        reps=record.reps,
+                        exercise=exercise,
                     )
-                RecordService.create(
-                    start=record.start,
-                    end=record.end,
-                    reps=record.reps,
-                    exercise=exercise,
-                    session=session,
+                except Exception as e:
+                    errors.setdefault(position, []).append(
+                        f'records[{index}]: {e}'
+                    )
+                    continue
+                records.append(new_record)
+                record_items.append((position, index))
+
+        _add_errors(errors, collect_errors(sessions), session_items)
+        _add_errors(
+            errors,
+            collect_errors(records, exclude=['session']),
+            [position for position, _ in record_items],
+            [f'records[{index}].' for _, index in record_items],
+        )
+        new_sessions = [
+            session
+            for position, session in zip(session_items, sessions)
+            if position not in errors
+        ]
+        new_records = [
+            record
+            for (position, _), record in zip(record_items, records)
+            if position not in errors
+        ]
+        if new_sessions:
+            cls.bulk_create(new_sessions)
+            for record in new_records:
+                record.session_id = record.session.id
+            RecordService.bulk_create(new_records)
+            record_changes(
+                Session,
+                [session.id for session in new_sessions],
+                ChangeKind.CREATE,
+            )
+            bump_versions(Session, Record)
+        # Batches replayed after a conflict are only counted once
+        ingested = len(new_records)
+        transaction.on_commit(
+            lambda: RECORDS_INGESTED.labels('sync_sessions').inc(ingested)
+        )
+
+        results: List[SyncResult] = []
+        for position, key in enumerate(keys):
+            if key in synced:
+                results.append(
+                    SyncResult(key, SyncStatus.DUPLICATE, synced[key], [])
                 )
-            return session
+                continue
+            first_item = first_items[key]
+            if first_item in errors:
+                results.append(
+                    SyncResult(
+                        key, SyncStatus.INVALID, None, errors[first_item]
+                    )
+                )
+            else:
+                session = sessions[session_items.index(first_item)]
+                status = (
+                    SyncStatus.CREATED
+                    if position == first_item
+                    else SyncStatus.DUPLICATE
+                )
+                results.append(SyncResult(key, status, session, []))
+        return results
+
+
+def _is_idempotency_key_conflict(error: IntegrityError) -> bool:
+    # Unique violations name the column or the constraint of the key
+    return 'idempotency_key' in str(error)
+
+
+def _add_errors(
+    errors: Dict[int, List[str]],
+    item_errors: ItemErrors,
+    positions: List[int],
+    prefixes: Optional[List[str]] = None,
+) -> None:
+    """Add the validation errors of the instances to their items."""
+    for index, fields in sorted(item_errors.items()):
+        prefix = prefixes[index] if prefixes else ''
+        errors.setdefault(positions[index], []).extend(
+            f'{prefix}{field}: {message}'
+            for field, messages in fields.items()
+            for message in messages
+        )
+
+
+# Records appended to the sessions being recorded, flushed at once
+record_buffer = RecordBuffer(SessionService._write_appended_records)
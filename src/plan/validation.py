@@ -0,0 +1,148 @@
+"""Validation of many model instances at once.
+
+`Model.full_clean()` validates a single instance and checks each ForeignKey
+with its own SELECT, even when the related object is already in memory. The
+functions in this module run the field validators (`is_positive_number`,
+`is_not_future_datetime`, `MinValueValidator`...) in memory over whole lists
+of instances and check the existence of ForeignKeys with one query per related
+model, skipping the related objects already loaded from the database.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db.models import ForeignKey, Model
+
+# {item index: {field name: [error messages]}}
+ItemErrors = Dict[int, Dict[str, List[str]]]
+
+
+class BatchValidationError(ValidationError):
+    """Raised when one or more instances of a batch are not valid.
+
+    `item_errors` holds the error messages of every invalid instance, keyed
+    by the position of the instance in the batch and by field name.
+    """
+
+    def __init__(self, item_errors: ItemErrors, label: str = 'item') -> None:
+        self.item_errors = item_errors
+        super().__init__(
+            {
+                f'{label}[{index}].{field}': messages
+                for index, fields in sorted(item_errors.items())
+                for field, messages in fields.items()
+            }
+        )
+
+
+def _is_loaded_from_db(instance: Optional[Model]) -> bool:
+    return (
+        instance is not None
+        and instance.pk is not None
+        and not instance._state.adding
+    )
+
+
+def _clean_fields(instance: Model, exclude: Set[str]) -> Dict[str, List[str]]:
+    """Run the validators of every non-relational field, like `clean_fields`.
+
+    ForeignKeys are skipped because `ForeignKey.validate` queries the database
+    for each instance; they are checked in bulk by `_check_foreign_keys`.
+    """
+    errors: Dict[str, List[str]] = {}
+    for field in instance._meta.fields:
+        if field.name in exclude:
+            continue
+        raw_value = getattr(instance, field.attname)
+        if isinstance(field, ForeignKey):
+            if raw_value is None and not field.null:
+                errors[field.name] = [field.error_messages['null']]
+            continue
+        if field.blank and raw_value in field.empty_values:
+            continue
+        try:
+            setattr(instance, field.attname, field.clean(raw_value, instance))
+        except ValidationError as e:
+            errors[field.name] = e.messages
+
+    try:
+        instance.clean()
+    except ValidationError as e:
+        errors.setdefault(NON_FIELD_ERRORS, []).extend(e.messages)
+    return errors
+
+
+def _check_foreign_keys(
+    instances: Sequence[Model], exclude: Set[str], errors: ItemErrors
+) -> None:
+    """Check that the ForeignKeys point to existing rows.
+
+    Related objects already loaded from the database are trusted, the rest of
+    the ids are checked with a single query per related model.
+    """
+    pending: Dict[ForeignKey, List[Tuple[int, int]]] = defaultdict(list)
+    for index, instance in enumerate(instances):
+        for field in instance._meta.fields:
+            if not isinstance(field, ForeignKey) or field.name in exclude:
+                continue
+            value = getattr(instance, field.attname)
+            if value is None:
+                continue
+            value = field.target_field.to_python(value)
+            if field.is_cached(instance) and _is_loaded_from_db(
+                field.get_cached_value(instance)
+            ):
+                continue
+            pending[field].append((index, value))
+
+    for field, values in pending.items():
+        related_model = field.remote_field.model
+        existing = set(
+            related_model._default_manager.filter(
+                pk__in={value for _, value in values}
+            ).values_list('pk', flat=True)
+        )
+        for index, value in values:
+            if value in existing:
+                continue
+            message = field.error_messages['invalid'] % {
+                'model': related_model._meta.verbose_name,
+                'pk': value,
+                'field': field.remote_field.field_name,
+                'value': value,
+            }
+            errors[index].setdefault(field.name, []).append(message)
+
+
+def collect_errors(
+    instances: Sequence[Model], exclude: Iterable[str] = ()
+) -> ItemErrors:
+    """Return the validation errors of each invalid instance, by position."""
+    excluded = set(exclude)
+    errors: ItemErrors = defaultdict(dict)
+    for index, instance in enumerate(instances):
+        field_errors = _clean_fields(instance, excluded)
+        if field_errors:
+            errors[index] = field_errors
+    _check_foreign_keys(instances, excluded, errors)
+    return {index: fields for index, fields in errors.items() if fields}
+
+
+def validate_instances(
+    instances: Sequence[Model], exclude: Iterable[str] = (), label: str = ''
+) -> None:
+    """Validate a list of instances of the same model.
+
+    Raise a `BatchValidationError` describing every invalid instance.
+    """
+    errors = collect_errors(instances, exclude)
+    if errors:
+        label = label or instances[0]._meta.model_name
+        raise BatchValidationError(errors, label=label)
+
+
+def validate_instance(instance: Model, exclude: Iterable[str] = ()) -> None:
+    """Validate a single instance, raising the same error as `full_clean`."""
+    errors = collect_errors([instance], exclude)
+    if errors:
+        raise ValidationError(errors[0])
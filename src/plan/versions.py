@@ -0,0 +1,82 @@
+"""Version counters of the plan models, used to invalidate cached reads.
+
+Every write to a model bumps its version. Cache entries built from a model
+include its version in their key, so they become invisible as soon as the
+model changes. The counters live in the cache configured by
+GRAPHQL_RESPONSE_CACHE_ALIAS: they are only shared by every worker process
+when it is not a local memory cache, which is why the caches relying on them
+are disabled by default with one.
+
+With read replicas, writes are also remembered for DATABASE_REPLICA_MAX_LAG
+seconds: until then, replicas may not have replayed the write yet.
+"""
+import time
+from typing import Dict, Iterable, Type
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+
+VERSION_KEY_PREFIX = 'model-version'
+WRITE_KEY_PREFIX = 'model-written'
+
+
+def get_version_key(model: Type[models.Model]) -> str:
+    return f'{VERSION_KEY_PREFIX}:{model._meta.label_lower}'
+
+
+def get_write_key(model: Type[models.Model]) -> str:
+    return f'{WRITE_KEY_PREFIX}:{model._meta.label_lower}'
+
+
+def get_initial_version() -> int:
+    # Counters evicted from the cache must not restart from a value used
+    # before, or stale entries would become visible again
+    return time.time_ns()
+
+
+def get_versions(
+    model_classes: Iterable[Type[models.Model]],
+) -> Dict[str, int]:
+    """Return the current version of each model, keyed by model label."""
+    cache = caches[settings.GRAPHQL_RESPONSE_CACHE_ALIAS]
+    keys = {get_version_key(model): model for model in model_classes}
+    versions = cache.get_many(list(keys))
+    for key in keys.keys() - versions.keys():
+        cache.add(key, get_initial_version(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]._meta.label_lower: versions[key] for key in keys}
+
+
+def were_written_recently(
+    model_classes: Iterable[Type[models.Model]],
+) -> bool:
+    """Return whether replicas may still lag behind writes to the models."""
+    cache = caches[settings.GRAPHQL_RESPONSE_CACHE_ALIAS]
+    return bool(
+        cache.get_many([get_write_key(model) for model in model_classes])
+    )
+
+
+def _bump_versions(model_classes: Iterable[Type[models.Model]]) -> None:
+    cache = caches[settings.GRAPHQL_RESPONSE_CACHE_ALIAS]
+    for model in model_classes:
+        key = get_version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, get_initial_version(), timeout=None)
+    if settings.DATABASE_REPLICAS and settings.DATABASE_REPLICA_MAX_LAG > 0:
+        cache.set_many(
+            {get_write_key(model): True for model in model_classes},
+            timeout=settings.DATABASE_REPLICA_MAX_LAG,
+        )
+
+
+def bump_versions(*model_classes: Type[models.Model]) -> None:
+    """Bump the version of the given models once the transaction commits.
+
+    Bumping before the commit would let a concurrent read cache the old rows
+    under the new version.
+    """
+    transaction.on_commit(lambda: _bump_versions(model_classes))
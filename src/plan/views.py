@@ -0,0 +1,64 @@
+import io
+
+from django.http import (
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from src.plan.export import EXPORT_FORMATS, export_sessions, parse_datetime
+from src.plan.importer import import_sessions
+
+
+@require_GET
+def export_sessions_view(request):
+    """Stream the sessions started in [since, until) as NDJSON or CSV."""
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(
+            f'Unknown export format {export_format!r}'
+        )
+    try:
+        since, until = (
+            parse_datetime(request.GET[name]) if name in request.GET else None
+            for name in ('since', 'until')
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(
+        export_sessions(export_format, since, until),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response[
+        'Content-Disposition'
+    ] = f'attachment; filename="sessions.{export_format}"'
+    return response
+
+
+@csrf_exempt
+@require_POST
+def import_sessions_view(request):
+    """Import the sessions of the uploaded NDJSON or CSV `file`.
+
+    The response lists the errors of the rows that were not imported.
+    """
+    import_format = request.GET.get('format', 'ndjson')
+    if import_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(
+            f'Unknown import format {import_format!r}'
+        )
+    if 'file' not in request.FILES:
+        return HttpResponseBadRequest('Upload the sessions as `file`')
+
+    file = io.TextIOWrapper(request.FILES['file'], encoding='utf-8')
+    result = import_sessions(file, import_format)
+    return JsonResponse(
+        {
+            'sessions': result.sessions,
+            'records': result.records,
+            'errors': [error._asdict() for error in result.errors],
+        }
+    )
@@ -0,0 +1,108 @@
+"""Routing of the reads of each request to a read replica.
+
+Every request handled by `DatabaseRoutingMiddleware` gets a `RoutingState`:
+
+- Its reads go to a single replica of DATABASE_REPLICAS, chosen at random or
+  in turns (DATABASE_REPLICA_SELECTION).
+- Once the request writes (or executes a GraphQL mutation), its reads stick
+  to the primary database, so that they see what was written whatever the
+  replication lag.
+
+Writes, and reads outside requests (e.g. management commands), always go to
+the primary database.
+"""
+import itertools
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+REPLICA_SELECTIONS = ('random', 'round_robin')
+
+_turns = itertools.count()
+
+
+class RoutingState:
+    def __init__(self, primary: bool = False) -> None:
+        # Whether reads go to the primary database
+        self.primary = primary
+        self._replica: Optional[str] = None
+        # The root fields of async operations are resolved by several threads
+        self._lock = threading.Lock()
+
+    def get_replica(self) -> str:
+        """Return the replica of the request, chosen once."""
+        with self._lock:
+            if self._replica is None:
+                self._replica = choose_replica()
+            return self._replica
+
+
+_state: ContextVar[Optional[RoutingState]] = ContextVar(
+    'database_routing', default=None
+)
+
+
+def choose_replica() -> str:
+    replicas = settings.DATABASE_REPLICAS
+    selection = settings.DATABASE_REPLICA_SELECTION
+    if selection == 'random':
+        return random.choice(replicas)
+    if selection == 'round_robin':
+        return replicas[next(_turns) % len(replicas)]
+    raise Exception(
+        f'Unknown replica selection {selection!r}, use one of: '
+        f'{", ".join(REPLICA_SELECTIONS)}'
+    )
+
+
+@contextmanager
+def routing(primary: bool = False) -> Iterator[RoutingState]:
+    """Route the reads of the block to a replica, until something is written."""
+    state = RoutingState(primary)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def use_primary() -> None:
+    """Send the following reads of the current request to the primary."""
+    state = _state.get()
+    if state is not None:
+        state.primary = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints) -> str:
+        state = _state.get()
+        if state is None or state.primary or not settings.DATABASE_REPLICAS:
+            return PRIMARY
+        return state.get_replica()
+
+    def db_for_write(self, model, **hints) -> str:
+        use_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == PRIMARY
+
+
+class DatabaseRoutingMiddleware:
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routing():
+            return self.get_response(request)
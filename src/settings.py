@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+from typing import Dict
 
 import environ
 
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "src.plan",
+    "src.api",
     "graphene_django",
 ]
 
@@ -54,6 +56,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "src.routers.DatabaseRoutingMiddleware",
+    "src.metrics.MetricsMiddleware",
+    "src.api.slow_queries.SlowQueryMiddleware",
 ]
 
 CORS_ALLOW_CREDENTIALS = True
@@ -95,6 +100,34 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, one per host, serving the reads of
+# requests that did not write (see src.routers). Point a replica to the
+# default host to try it locally
+DATABASE_REPLICAS = []
+for index, host in enumerate(env.list("POSTGRES_REPLICA_HOSTS", default=[])):
+    DATABASE_REPLICAS.append(f"replica_{index}")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+# How the replica of each request is chosen: "random" or "round_robin"
+DATABASE_REPLICA_SELECTION = env.str(
+    "DATABASE_REPLICA_SELECTION", default="random"
+)
+# Seconds the replicas may lag behind the default database. Queries missing
+# the response cache read from the default database while a model they read
+# was written more recently, so that rows not replayed yet are never cached
+# under the version of the write (see src.api.response_cache)
+DATABASE_REPLICA_MAX_LAG = env.int("DATABASE_REPLICA_MAX_LAG", default=5)
+DATABASE_ROUTERS = ["src.routers.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -133,3 +166,118 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = "/static/"
+
+
+# Logging
+# https://docs.djangoproject.com/en/3.0/topics/logging/
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "src": {
+            "handlers": ["console"],
+            "level": env.str("LOG_LEVEL", default="INFO"),
+        },
+    },
+}
+
+
+# GraphQL
+
+# Maximum amount of items returned in a single page of a Relay connection
+GRAPHQL_MAX_PAGE_SIZE = env.int("GRAPHQL_MAX_PAGE_SIZE", default=100)
+
+# Amount of distinct parsed and validated documents kept in memory
+GRAPHQL_DOCUMENT_CACHE_SIZE = env.int(
+    "GRAPHQL_DOCUMENT_CACHE_SIZE", default=256
+)
+
+# Cache storing the responses of query operations and the model versions used
+# to invalidate them
+GRAPHQL_RESPONSE_CACHE_ALIAS = env.str(
+    "GRAPHQL_RESPONSE_CACHE_ALIAS", default="default"
+)
+# Seconds a response is cached for, 0 disables the response cache. The model
+# versions invalidating responses must be shared by every worker process, so
+# it is only enabled by default when the cache is not local to the process
+GRAPHQL_RESPONSE_CACHE_SHARED = not CACHES[GRAPHQL_RESPONSE_CACHE_ALIAS][
+    "BACKEND"
+].endswith(".LocMemCache")
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = env.int(
+    "GRAPHQL_RESPONSE_CACHE_TIMEOUT",
+    default=300 if GRAPHQL_RESPONSE_CACHE_SHARED else 0,
+)
+
+# Maximum amount of operations sent at once in a JSON array, executed in order
+# with shared DataLoaders
+GRAPHQL_MAX_BATCH_SIZE = env.int("GRAPHQL_MAX_BATCH_SIZE", default=10)
+
+# Path of the asynchronous GraphQL endpoint served under ASGI, whose requests
+# and root fields are executed concurrently by pools of GRAPHQL_ASYNC_WORKERS
+# threads (see src.api.asgi)
+GRAPHQL_ASYNC_PATH = "/graphql/async"
+GRAPHQL_ASYNC_WORKERS = env.int("GRAPHQL_ASYNC_WORKERS", default=16)
+
+# Budget of the static cost analysis of GraphQL operations (see src.api.cost),
+# exceeding operations are rejected before being executed
+GRAPHQL_MAX_QUERY_DEPTH = env.int("GRAPHQL_MAX_QUERY_DEPTH", default=10)
+GRAPHQL_MAX_QUERY_COST = env.int("GRAPHQL_MAX_QUERY_COST", default=1000000)
+# Cost of the fields, "Type.field": cost. Object fields cost 1 by default and
+# scalar fields 0
+GRAPHQL_FIELD_COSTS: Dict[str, int] = {}
+# Expected amount of items of list fields not paginated with first/last,
+# "Type.field": size. Defaults to GRAPHQL_MAX_PAGE_SIZE
+GRAPHQL_LIST_SIZES = {
+    "PlanGraphqlType.loops": 10,
+    "LoopGraphqlType.goals": 20,
+    "SessionGraphqlType.records": 1000,
+    "CompiledPlanGraphqlType.steps": 1000,
+    "AdherenceGraphqlType.goals": 1000,
+}
+
+# Return the timings of the resolvers and SQL statements of every operation in
+# the response extensions, and log them (see src.api.tracing). With DEBUG on,
+# clients can also trace single requests by sending GRAPHQL_TRACING_HEADER
+GRAPHQL_TRACING = env.bool("GRAPHQL_TRACING", default=False)
+GRAPHQL_TRACING_HEADER = "X-GraphQL-Tracing"
+
+# Statements on the tables of the plan app slower than this are explained and
+# written to the rotating SLOW_QUERY_LOG (see src.api.slow_queries), 0
+# disables it. ANALYZE runs the explained statements again (PostgreSQL only)
+SLOW_QUERY_THRESHOLD_MS = env.float("SLOW_QUERY_THRESHOLD_MS", default=500)
+SLOW_QUERY_EXPLAIN_ANALYZE = env.bool(
+    "SLOW_QUERY_EXPLAIN_ANALYZE", default=False
+)
+SLOW_QUERY_LOG = env.str(
+    "SLOW_QUERY_LOG", default=os.path.join(BASE_DIR, "slow_queries.log")
+)
+SLOW_QUERY_LOG_MAX_BYTES = env.int(
+    "SLOW_QUERY_LOG_MAX_BYTES", default=10 * 1024 * 1024
+)
+SLOW_QUERY_LOG_BACKUP_COUNT = env.int("SLOW_QUERY_LOG_BACKUP_COUNT", default=5)
+
+# Seconds a compiled plan is cached for (see src.plan.compiler)
+COMPILED_PLAN_CACHE_TIMEOUT = env.int(
+    "COMPILED_PLAN_CACHE_TIMEOUT", default=24 * 60 * 60
+)
+
+# Rows fetched from the database and encoded at once when exporting sessions
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+
+# Records appended to live sessions while other appends are in flight are
+# buffered for up to RECORD_BUFFER_DELAY_MS, or until there are
+# RECORD_BUFFER_SIZE of them, and inserted at once (see
+# src.plan.record_buffer). 0 inserts them right away
+RECORD_BUFFER_DELAY_MS = env.int("RECORD_BUFFER_DELAY_MS", default=50)
+RECORD_BUFFER_SIZE = env.int("RECORD_BUFFER_SIZE", default=1000)
+
+# Change events read at once by the changesSince query (see src.plan.changes)
+CHANGES_PAGE_SIZE = env.int("CHANGES_PAGE_SIZE", default=1000)
+
+# Sessions validated and inserted per transaction by the syncSessions mutation
+SYNC_BATCH_SIZE = env.int("SYNC_BATCH_SIZE", default=100)
+
+# Rows validated and loaded at once when importing sessions
+IMPORT_BATCH_SIZE = env.int("IMPORT_BATCH_SIZE", default=5000)
@@ -13,11 +13,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
 
+from src.api.asgi import AsyncGraphQLView
+from src.api.views import GraphQLView
+from src.metrics import metrics_view
+from src.plan.views import export_sessions_view, import_sessions_view
 from src.schema import schema
 
 urlpatterns = [
@@ -28,4 +32,12 @@ urlpatterns = [
         csrf_exempt(GraphQLView.as_view(schema=schema, graphiql=False)),
         name='graphql',
     ),
+    path(
+        settings.GRAPHQL_ASYNC_PATH.lstrip('/'),
+        csrf_exempt(AsyncGraphQLView.as_view(schema=schema, graphiql=False)),
+        name='graphql-async',
+    ),
+    path('export/sessions', export_sessions_view, name='export-sessions'),
+    path('import/sessions', import_sessions_view, name='import-sessions'),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from graphql import parse
+
+from src.api.asgi import (
+    AsyncGraphQLHandler,
+    AsyncGraphQLView,
+    get_application,
+    split_root_fields,
+)
+from src.api.models import PersistedQuery, get_document_hash
+
+QUERY = '''
+query Launch($planId: String) {
+  exercises { name }
+  plans { name loops { loopIndex } }
+  plan(planId: $planId) { ...PlanName }
+}
+fragment PlanName on PlanGraphqlType { name }
+'''
+
+
+def request(
+    application,
+    body,
+    method='POST',
+    path='/graphql/async',
+    query_string=b'',
+    headers=(),
+):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+    if method == 'POST':
+        scope['headers'].append((b'content-type', b'application/json'))
+    asyncio.run(application(scope, receive, send))
+    response_headers = {
+        name.decode().lower(): value.decode()
+        for name, value in sent[0]['headers']
+    }
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return sent[0]['status'], json.loads(body), response_headers
+
+
+def post(payload, headers=()):
+    status, body, _ = request(
+        AsyncGraphQLHandler(), json.dumps(payload).encode(), headers=headers
+    )
+    return status, body
+
+
+def test_split_root_fields():
+    documents = split_root_fields(parse(QUERY), None)
+    mutation = parse('mutation { deleteExercise(id: "1") { ok } }')
+
+    assert [
+        [
+            field.name.value
+            for field in document.definitions[0].selection_set.selections
+        ]
+        for document in documents
+    ] == [['exercises'], ['plans'], ['plan']]
+    # Fragments are kept
+    assert len(documents[2].definitions) == 2
+    assert split_root_fields(mutation, None) == [mutation]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_root_fields_run_concurrently(
+    client, settings, make_plan, monkeypatch
+):
+    settings.GRAPHQL_TRACING = True
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 0
+    plan = make_plan(loops=2)
+    threads = set()
+    execute_root_field = AsyncGraphQLView.execute_root_field
+
+    def record_thread(*args):
+        threads.add(threading.get_ident())
+        return execute_root_field(*args)
+
+    monkeypatch.setattr(AsyncGraphQLView, 'execute_root_field', record_thread)
+    payload = {'query': QUERY, 'variables': {'planId': str(plan.id)}}
+
+    status, body = post(payload)
+    sync_body = client.post(
+        '/graphql', json.dumps(payload), content_type='application/json'
+    ).json()
+
+    assert status == 200
+    assert list(body['data']) == ['exercises', 'plans', 'plan']
+    assert body['data'] == sync_body['data']
+    assert body['extensions']['cost'] == sync_body['extensions']['cost']
+    # Statements of the root fields are traced along with the request's
+    assert (
+        body['extensions']['tracing']['sql']['count']
+        == sync_body['extensions']['tracing']['sql']['count']
+        > 0
+    )
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalid_operations():
+    invalid_status, invalid = post({'query': '{ plans { unknownField } }'})
+    syntax_status, syntax = post({'query': '{ plans '})
+    method_status, _, _ = request(
+        AsyncGraphQLHandler(),
+        b'',
+        method='GET',
+        query_string=b'query=mutation{deleteExercise(id:"1"){ok}}',
+    )
+
+    assert invalid_status == 400
+    assert 'unknownField' in invalid['errors'][0]['message']
+    assert syntax_status == 400
+    assert method_status == 405
+
+
+@pytest.mark.django_db(transaction=True)
+def test_requests_go_through_the_view_and_the_middleware(settings, exercises):
+    query = '{ exercises { name } }'
+    PersistedQuery.objects.create(
+        sha256=get_document_hash(query), document=query
+    )
+    extensions = {
+        'persistedQuery': {
+            'version': 1,
+            'sha256Hash': get_document_hash(query),
+        }
+    }
+
+    status, body, headers = request(
+        AsyncGraphQLHandler(),
+        json.dumps({'extensions': extensions}).encode(),
+        headers=[(b'origin', b'http://localhost:3000')],
+    )
+    settings.GRAPHQL_MAX_QUERY_COST = 99
+    expensive_status, expensive = post({'query': query})
+
+    assert status == 200
+    assert body['data']['exercises'][0]['name'] == 'exercise 0'
+    assert headers['access-control-allow-origin'] == 'http://localhost:3000'
+    assert expensive_status == 400
+    assert expensive['errors'][0]['message'] == (
+        'Query cost 100 exceeds the maximum cost of 99'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_other_paths_are_served_by_django():
+    paths = []
+
+    async def django_application(scope, receive, send):
+        paths.append(scope['path'])
+
+    application = get_application(django_application)
+    status, _, _ = request(
+        application, json.dumps({'query': '{ exercises { name } }'}).encode()
+    )
+    asyncio.run(application({'type': 'http', 'path': '/graphql'}, None, None))
+
+    assert status == 200
+    assert paths == ['/graphql']
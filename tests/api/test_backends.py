@@ -0,0 +1,40 @@
+from src.api.backends import CachedDocumentBackend
+from src.schema import schema
+
+QUERY = '{ exercises { id } }'
+
+
+def test_documents_are_parsed_once():
+    backend = CachedDocumentBackend(max_size=2)
+
+    document = backend.document_from_string(schema, QUERY)
+
+    assert backend.document_from_string(schema, QUERY) is document
+    assert (backend.hits, backend.misses) == (1, 1)
+
+
+def test_least_recently_used_documents_are_evicted():
+    backend = CachedDocumentBackend(max_size=2)
+    first = backend.document_from_string(schema, '{ exercises { id } }')
+    backend.document_from_string(schema, '{ plans { id } }')
+    backend.document_from_string(schema, '{ exercises { id } }')
+
+    backend.document_from_string(schema, '{ sessions { id } }')
+
+    assert (
+        backend.document_from_string(schema, '{ exercises { id } }') is first
+    )
+    assert backend.misses == 3
+    backend.document_from_string(schema, '{ plans { id } }')
+    assert backend.misses == 4
+
+
+def test_validation_errors_are_cached():
+    backend = CachedDocumentBackend(max_size=2)
+
+    document = backend.document_from_string(schema, '{ unknownField }')
+    result = document.execute()
+
+    assert result.invalid
+    assert 'unknownField' in result.errors[0].message
+    assert backend.document_from_string(schema, '{ unknownField }') is document
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from graphql import parse
+
+from src.api.cost import QueryCost, get_query_cost
+from src.schema import schema
+
+SESSIONS_QUERY = '''
+query Sessions($first: Int) {
+  sessionsConnection(first: $first) {
+    edges { node { name records { reps exercise { name } } } }
+  }
+}
+'''
+
+
+def get_cost(query, variables=None, operation_name=None):
+    return get_query_cost(schema, parse(query), operation_name, variables)
+
+
+def post(client, query, variables=None):
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': query, 'variables': variables}),
+        content_type='application/json',
+    )
+    return response.status_code, response.json()
+
+
+def test_scalar_fields_are_free():
+    assert get_cost('{ exercises { id name } }') == QueryCost(100, 2)
+
+
+def test_list_fields_are_multiplied_by_their_size(settings):
+    settings.GRAPHQL_LIST_SIZES = {'PlanGraphqlType.loops': 4}
+
+    # plans (100) * (plan (1) + loops (4) * loop (1))
+    assert get_cost('{ plans { loops { rounds } } }') == QueryCost(500, 3)
+
+
+def test_connections_are_multiplied_by_the_page_size(settings):
+    settings.GRAPHQL_LIST_SIZES = {'SessionGraphqlType.records': 10}
+
+    # first * (connection + edge + node + records (10) * (record + exercise))
+    assert get_cost(SESSIONS_QUERY, {'first': 5}) == QueryCost(5 * 23, 6)
+    assert get_cost(SESSIONS_QUERY, {'first': 10 ** 6}) == QueryCost(2300, 6)
+    assert get_cost(SESSIONS_QUERY) == QueryCost(2300, 6)
+
+
+def test_aliases_and_fragments_add_up(settings):
+    settings.GRAPHQL_FIELD_COSTS = {'Query.exercise': 5}
+    query = '''
+    {
+      a: exercise(exerciseId: 1) { ...name }
+      b: exercise(exerciseId: 2) { ...name }
+    }
+    fragment name on ExerciseGraphqlType { name }
+    '''
+
+    assert get_cost(query) == QueryCost(10, 2)
+
+
+def test_fragment_cycles_are_expanded_once(settings):
+    settings.GRAPHQL_LIST_SIZES = {'PlanGraphqlType.loops': 4}
+    query = '''
+    { plans { ...loops } }
+    fragment loops on PlanGraphqlType { loops { plan { ...loops } } }
+    '''
+
+    # plans (100) * (plan (1) + loops (4) * (loop (1) + plan (1)))
+    assert get_cost(query) == QueryCost(900, 3)
+
+
+def test_introspection_is_free():
+    assert get_cost('{ __schema { types { name } } }') == QueryCost(0, 0)
+
+
+@pytest.mark.django_db
+def test_cost_is_returned_in_extensions(client, exercises):
+    status, body = post(client, '{ exercises { name } }')
+
+    assert status == 200
+    assert body['extensions']['cost']['requestedQueryCost'] == 100
+    assert body['extensions']['cost']['depth'] == 2
+
+
+@pytest.mark.django_db
+def test_reject_too_expensive_queries(
+    client, settings, django_assert_num_queries
+):
+    settings.GRAPHQL_MAX_QUERY_COST = 99
+
+    with django_assert_num_queries(0):
+        status, body = post(client, '{ exercises { name } }')
+
+    assert status == 400
+    assert 'data' not in body
+    assert body['errors'][0]['message'] == (
+        'Query cost 100 exceeds the maximum cost of 99'
+    )
+    assert body['extensions']['cost']['requestedQueryCost'] == 100
+
+
+@pytest.mark.django_db
+def test_reject_too_deep_queries(client, settings, django_assert_num_queries):
+    settings.GRAPHQL_MAX_QUERY_DEPTH = 3
+
+    with django_assert_num_queries(0):
+        status, body = post(client, '{ plans { loops { goals { id } } } }')
+
+    assert status == 400
+    assert body['errors'][0]['message'] == (
+        'Query depth 4 exceeds the maximum depth of 3'
+    )
+
+
+@pytest.mark.django_db
+def test_invalid_queries_are_not_costed(client):
+    query = '''
+    { plans { ...loops } }
+    fragment loops on PlanGraphqlType { loops { plan { ...loops } } }
+    '''
+
+    status, body = post(client, query)
+
+    assert status == 400
+    assert 'loops' in body['errors'][0]['message']
+    assert 'extensions' not in body
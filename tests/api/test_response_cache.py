@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from src.api.backends import ValidatedDocument
+from src.api.response_cache import get_document_models, response_cache
+from src.api.views import get_document_backend
+from src.plan.models import Exercise, Goal, Loop, Plan
+from src.schema import schema
+
+EXERCISES_QUERY = '{ exercises { id name } }'
+
+
+@pytest.fixture(autouse=True)
+def enable_response_cache(settings):
+    # Disabled by default with the local memory cache of the tests
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 300
+    response_cache.reset_stats()
+
+
+def post(client, query, variables=None):
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': query, 'variables': variables}),
+        content_type='application/json',
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def get_models(query):
+    document = get_document_backend().document_from_string(schema, query)
+    return get_document_models(document)
+
+
+def test_document_models():
+    assert get_models(EXERCISES_QUERY) == {Exercise}
+    assert get_models(
+        '{ plansConnection { edges { node { loops { goals { id } } } } } }'
+    ) == {Plan, Loop, Goal}
+
+
+def test_document_models_are_kept_on_cached_documents():
+    document = get_document_backend().document_from_string(
+        schema, EXERCISES_QUERY
+    )
+
+    response_cache.get_key(document, None, None)
+
+    assert isinstance(document, ValidatedDocument)
+    assert document.models == [Exercise]
+
+
+@pytest.mark.django_db
+def test_repeated_queries_are_served_from_cache(
+    client, exercises, django_assert_num_queries
+):
+    first = post(client, EXERCISES_QUERY)
+
+    with django_assert_num_queries(0):
+        second = post(client, EXERCISES_QUERY)
+
+    assert first == second
+    assert response_cache.stats() == (1, 1)
+
+
+# Versions are bumped when the transaction commits
+@pytest.mark.django_db(transaction=True)
+def test_mutations_invalidate_cached_responses(client, exercises):
+    post(client, EXERCISES_QUERY)
+
+    post(
+        client,
+        '''
+        mutation {
+          createExercise(name: "new", description: "new", exerciseType: WORK) {
+            exercise { id }
+          }
+        }
+        ''',
+    )
+    data = post(client, EXERCISES_QUERY)['data']
+
+    assert len(data['exercises']) == len(exercises) + 1
+    assert response_cache.stats() == (0, 2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unrelated_mutations_keep_cached_responses(client, exercises):
+    post(client, EXERCISES_QUERY)
+
+    post(
+        client,
+        '''
+        mutation {
+          createSession(name: "session", start: "2020-01-01T00:00:00+00:00") {
+            session { id }
+          }
+        }
+        ''',
+    )
+    post(client, EXERCISES_QUERY)
+
+    assert response_cache.stats() == (1, 1)
+
+
+@pytest.mark.django_db
+def test_variables_are_part_of_the_key(client, exercises):
+    query = 'query ($id: String) { exercise(exerciseId: $id) { name } }'
+
+    first = post(client, query, {'id': str(exercises[0].id)})
+    second = post(client, query, {'id': str(exercises[1].id)})
+
+    assert first['data']['exercise']['name'] == 'exercise 0'
+    assert second['data']['exercise']['name'] == 'exercise 1'
+
+
+@pytest.mark.django_db
+def test_disabled_cache(client, exercises, settings):
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 0
+
+    post(client, EXERCISES_QUERY)
+    post(client, EXERCISES_QUERY)
+
+    assert response_cache.stats() == (0, 0)
@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from src.api.slow_queries import read_log
+
+QUERY = 'query Plans { plans { name loops { loopIndex } } }'
+
+
+@pytest.fixture
+def slow_query_log(settings, tmp_path):
+    # Every statement is slow
+    settings.SLOW_QUERY_THRESHOLD_MS = 1e-6
+    settings.SLOW_QUERY_LOG = str(tmp_path / 'slow_queries.log')
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 0
+    return settings.SLOW_QUERY_LOG
+
+
+@pytest.mark.django_db
+def test_record_slow_queries(client, make_plan, slow_query_log):
+    make_plan()
+
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': QUERY}),
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    entries = list(read_log(slow_query_log))
+    # Model versions are not stored in tables of the plan app
+    assert [entry['path'] for entry in entries] == ['plans', 'plans.loops']
+    assert {entry['operation'] for entry in entries} == {'Plans'}
+    assert entries[0]['sql'].startswith('SELECT')
+    # SCAN on SQLite, Seq Scan or Index Scan on PostgreSQL
+    assert not entries[0]['explain'].startswith('EXPLAIN failed')
+    assert 'scan' in entries[0]['explain'].lower()
+
+
+@pytest.mark.django_db
+def test_slow_queries_command(client, make_plan, slow_query_log):
+    make_plan()
+    for _ in range(2):
+        client.post(
+            '/graphql',
+            json.dumps({'query': QUERY}),
+            content_type='application/json',
+        )
+    stdout = io.StringIO()
+
+    call_command('slow_queries', '--sort=count', '--explain', stdout=stdout)
+
+    output = stdout.getvalue()
+    assert output.startswith('#1 2 times, total ')
+    assert 'Operations: Plans (2)' in output
+    assert 'Paths: plans.loops (2)' in output
+    assert '#3' not in output
@@ -0,0 +1,71 @@
+import json
+import logging
+
+import pytest
+
+QUERY = '''
+query Plans {
+  plans { name loops { loopIndex goals { exercise { name } } } }
+}
+'''
+
+
+def post(client, payload, **headers):
+    response = client.post(
+        '/graphql',
+        json.dumps(payload),
+        content_type='application/json',
+        **headers,
+    )
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_operations_are_not_traced_by_default(client, settings, make_plan):
+    settings.DEBUG = False
+    make_plan()
+
+    body = post(client, {'query': QUERY}, HTTP_X_GRAPHQL_TRACING='1')
+
+    assert 'tracing' not in body['extensions']
+
+
+@pytest.mark.django_db
+def test_trace_operation(client, settings, make_plan, caplog):
+    settings.GRAPHQL_TRACING = True
+    make_plan(loops=2)
+
+    with caplog.at_level(logging.INFO, logger='src.api.tracing'):
+        body = post(client, {'query': QUERY})
+
+    tracing = body['extensions']['tracing']
+    resolvers = {
+        tuple(resolver['path']): resolver
+        for resolver in tracing['execution']['resolvers']
+    }
+    assert tracing['version'] == 1
+    assert resolvers[('plans',)]['returnType'] == '[PlanGraphqlType]'
+    assert resolvers[('plans', 0, 'loops', 1, 'loopIndex')]['duration'] >= 0
+    # Plans, loops, and goals along with their exercise
+    assert tracing['sql']['count'] == 3
+    assert sum(r['sqlCount'] for r in resolvers.values()) == 3
+    assert resolvers[('plans',)]['sqlCount'] == 1
+    assert tracing['sql']['statements'][0]['path'] == ['plans']
+    assert caplog.records[0].sql_count == 3
+    assert (
+        caplog.records[0].getMessage().startswith('GraphQL operation Plans: ')
+    )
+
+
+@pytest.mark.django_db
+def test_trace_operation_with_debug_header(client, settings, exercises):
+    settings.DEBUG = True
+
+    body = post(
+        client,
+        {'query': '{ exercises { name } }'},
+        HTTP_X_GRAPHQL_TRACING='1',
+    )
+
+    assert body['extensions']['tracing']['sql']['count'] == 1
+    assert len(body['data']['exercises']) == 3
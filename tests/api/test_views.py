@@ -0,0 +1,136 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from src.api.models import PersistedQuery, get_document_hash
+from src.api.views import get_document_backend
+
+QUERY = '{ exercises { name } }'
+
+
+@pytest.fixture(autouse=True)
+def clear_document_cache():
+    get_document_backend().clear()
+
+
+def post(client, payload):
+    response = client.post(
+        '/graphql', json.dumps(payload), content_type='application/json'
+    )
+    return response.status_code, response.json()
+
+
+def persisted_query_payload(document_hash):
+    return {
+        'extensions': {
+            'persistedQuery': {'version': 1, 'sha256Hash': document_hash}
+        }
+    }
+
+
+@pytest.mark.django_db
+def test_repeated_documents_are_parsed_once(client, exercises):
+    post(client, {'query': QUERY})
+    status, body = post(client, {'query': QUERY})
+
+    assert status == 200
+    assert len(body['data']['exercises']) == len(exercises)
+    backend = get_document_backend()
+    assert (backend.hits, backend.misses) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_execute_persisted_query(client, exercises):
+    PersistedQuery.objects.create(
+        sha256=get_document_hash(QUERY), document=QUERY
+    )
+
+    status, body = post(
+        client, persisted_query_payload(get_document_hash(QUERY))
+    )
+
+    assert status == 200
+    assert body['data']['exercises'][0]['name'] == 'exercise 0'
+
+
+@pytest.mark.django_db
+def test_execute_persisted_query_with_get(client, exercises):
+    extensions = json.dumps(
+        persisted_query_payload(get_document_hash(QUERY))['extensions']
+    )
+    PersistedQuery.objects.create(
+        sha256=get_document_hash(QUERY), document=QUERY
+    )
+
+    response = client.get(
+        '/graphql', {'extensions': extensions}, HTTP_ACCEPT='application/json',
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()['data']['exercises']) == len(exercises)
+
+
+@pytest.mark.django_db
+def test_unknown_persisted_query(client):
+    status, body = post(client, persisted_query_payload('0' * 64))
+
+    assert status == 400
+    assert body['errors'][0]['message'] == 'PersistedQueryNotFound'
+
+
+@pytest.mark.django_db
+def test_register_persisted_queries(tmp_path):
+    (tmp_path / 'exercises.graphql').write_text(QUERY)
+
+    call_command('register_persisted_queries', str(tmp_path))
+
+    persisted_query = PersistedQuery.objects.get()
+    assert persisted_query.sha256 == get_document_hash(QUERY)
+    assert persisted_query.document == QUERY
+
+
+SESSIONS_QUERY = (
+    'query Sessions { sessions { records { exercise { name } } } }'
+)
+
+
+@pytest.mark.django_db
+def test_execute_batch(client, settings, make_session):
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 0
+    make_session()
+    with CaptureQueriesContext(connection) as single:
+        post(client, {'query': SESSIONS_QUERY})
+
+    with CaptureQueriesContext(connection) as batch:
+        status, body = post(
+            client,
+            [
+                {'id': 1, 'query': QUERY},
+                {'id': 2, 'query': SESSIONS_QUERY},
+                {'id': 3, 'query': SESSIONS_QUERY},
+            ],
+        )
+
+    assert status == 200
+    assert [result['id'] for result in body] == [1, 2, 3]
+    assert len(body[0]['data']['exercises']) == 3
+    assert body[1]['data'] == body[2]['data']
+    # The third operation only fetches the sessions, their records were
+    # loaded by the second one
+    assert len(batch) == 1 + len(single) + 1
+
+
+@pytest.mark.django_db
+def test_batch_size_is_limited(client, settings):
+    settings.GRAPHQL_MAX_BATCH_SIZE = 2
+
+    status, body = post(client, [{'query': QUERY}] * 3)
+    empty_status, _ = post(client, [])
+
+    assert (status, empty_status) == (400, 400)
+    assert body['errors'][0]['message'] == (
+        'Batches must contain between 1 and 2 operations.'
+    )
@@ -0,0 +1,131 @@
+"""Timings of the alignment of long sessions with their plan.
+
+The alignment is timed on its own for sessions that closely follow their
+plan (the typical case), and for sessions unrelated to their plan (the worst
+case). Then `get_adherence` is timed end to end on a session stored in the
+database. Set BENCHMARK_SCALE to grow the sessions.
+"""
+import datetime
+import os
+import random
+import time
+
+import pytest
+from django.utils import timezone
+
+from src.plan.adherence import align, get_adherence
+from src.plan.models import (
+    Exercise,
+    ExerciseType,
+    Goal,
+    Loop,
+    Plan,
+    Record,
+    Session,
+)
+
+SCALE = int(os.environ.get('BENCHMARK_SCALE', '1'))
+RECORDS = 5000 * SCALE
+EXERCISES = 20
+EDITS = RECORDS // 100
+
+
+def edit(rng, sequence, edits, choices):
+    """Return a copy of `sequence` with items removed and inserted."""
+    sequence = list(sequence)
+    for _ in range(edits):
+        del sequence[rng.randrange(len(sequence))]
+        sequence.insert(rng.randrange(len(sequence)), rng.choice(choices))
+    return sequence
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+@pytest.mark.benchmark
+def test_align_long_sequences():
+    rng = random.Random(0)
+    choices = range(EXERCISES)
+    plan = [rng.choice(choices) for _ in range(RECORDS)]
+    cases = {
+        'identical': list(plan),
+        f'{EDITS} edits': edit(rng, plan, EDITS, choices),
+        f'{EDITS * 5} edits': edit(rng, plan, EDITS * 5, choices),
+        'no common exercise': [EXERCISES + i for i in range(RECORDS)],
+        'unrelated': [rng.choice(choices) for _ in range(RECORDS // 5)],
+    }
+
+    print()
+    for name, session in cases.items():
+        matches, elapsed = timed(align, plan, session)
+        print(
+            f'== {name}: {len(plan)} steps, {len(session)} records, '
+            f'{len(matches)} matches in {elapsed:.1f} ms'
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_get_adherence_of_a_long_session():
+    rng = random.Random(0)
+    now = timezone.now()
+    Exercise.objects.bulk_create(
+        Exercise(name=f'exercise {i}', exercise_type=ExerciseType.WORK)
+        for i in range(EXERCISES)
+    )
+    exercises = list(Exercise.objects.all())
+
+    plan = Plan.objects.create(name='plan', created=now, last_updated=now)
+    loops = RECORDS // 100
+    Loop.objects.bulk_create(
+        Loop(plan=plan, loop_index=i, rounds=2, description='loop')
+        for i in range(loops)
+    )
+    Goal.objects.bulk_create(
+        Goal(
+            loop=loop,
+            exercise=rng.choice(exercises),
+            goal_index=i,
+            duration=30,
+            repetitions=10,
+        )
+        for loop in Loop.objects.all()
+        for i in range(50)
+    )
+
+    session = Session.objects.create(
+        name='session', start=now - datetime.timedelta(days=1)
+    )
+    plan_exercises = []
+    for loop in Loop.objects.order_by('loop_index'):
+        goals = loop.goals.order_by('goal_index')
+        plan_exercises.extend(
+            [goal.exercise_id for goal in goals] * loop.rounds
+        )
+    exercise_ids = edit(
+        rng, plan_exercises, EDITS, [exercise.id for exercise in exercises]
+    )
+    Record.objects.bulk_create(
+        Record(
+            session=session,
+            exercise_id=exercise_id,
+            start=session.start + datetime.timedelta(seconds=30 * i),
+            end=session.start + datetime.timedelta(seconds=30 * i + 25),
+            reps=10,
+        )
+        for i, exercise_id in enumerate(exercise_ids)
+    )
+
+    adherence, cold = timed(get_adherence, plan.id, session.id)
+    _, warm = timed(get_adherence, plan.id, session.id)
+
+    print()
+    print(
+        f'== {len(adherence.goals)} goals, {len(exercise_ids)} records: '
+        f'{adherence.skipped_goals} skipped, '
+        f'{len(adherence.extra_record_ids)} extra, '
+        f'{cold:.1f} ms (plan compiled), {warm:.1f} ms (plan cached)'
+    )
@@ -0,0 +1,125 @@
+"""Throughput of the async GraphQL endpoint against the sync view under ASGI.
+
+Concurrent clients send the queries an app sends on launch (exercises, plans
+and recent sessions) to the current deployment (`GraphQLView` served by
+Django's ASGI handler) and to `AsyncGraphQLHandler`. SQLite answers far faster
+than a database server, so every SQL statement is delayed by
+BENCHMARK_DB_LATENCY_MS (2 by default) to stand for the network round trip.
+Both endpoints run graphene-django's debug middleware while DEBUG is on, which
+makes requests CPU-bound: raise the latency to compare them when the database
+dominates.
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import pytest
+from django.core.asgi import get_asgi_application
+from django.db.backends.utils import CursorWrapper
+
+from src.api.asgi import AsyncGraphQLHandler
+from src.plan.generator import GeneratorOptions, generate_data
+
+DB_LATENCY = float(os.environ.get('BENCHMARK_DB_LATENCY_MS', '2')) / 1000
+CONCURRENCY = (1, 8, 32)
+REQUESTS = 64
+
+QUERY = '''
+query Launch {
+  exercises { id name }
+  plans { name loops { loopIndex goals { duration } } }
+  sessionsConnection(last: 10) { edges { node { name start } } }
+}
+'''
+
+
+@pytest.fixture
+def db_latency(monkeypatch):
+    # Execution wrappers are not used, as the ones installed around requests
+    # are removed from the end of the list
+    for name in ('_execute', '_executemany'):
+        execute = getattr(CursorWrapper, name)
+
+        def delayed(self, *args, execute=execute):
+            time.sleep(DB_LATENCY)
+            return execute(self, *args)
+
+        monkeypatch.setattr(CursorWrapper, name, delayed)
+
+
+async def send_request(application, path, body):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    assert status == 200
+    return time.perf_counter() - started
+
+
+async def load(application, path, concurrency):
+    body = json.dumps({'query': QUERY}).encode()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def client():
+        async with semaphore:
+            return await send_request(application, path, body)
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(client() for _ in range(REQUESTS)))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_async_graphql_concurrency(settings, db_latency):
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 0
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    generate_data(GeneratorOptions(plans=20, sessions=50, exercises=20))
+    deployments = {
+        'sync view': (get_asgi_application(), '/graphql'),
+        'async app': (AsyncGraphQLHandler(), '/graphql/async'),
+    }
+
+    print()
+    for concurrency in CONCURRENCY:
+        for name, (application, path) in deployments.items():
+            duration, latencies = asyncio.run(
+                load(application, path, concurrency)
+            )
+            print(
+                f'== {name}, {concurrency} concurrent clients: '
+                f'{REQUESTS / duration:.1f} requests/s, '
+                f'p50 {statistics.median(latencies) * 1000:.1f} ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms'
+            )
@@ -0,0 +1,316 @@
+"""Wall time, SQL statements and peak memory of the main GraphQL operations.
+
+The sample queries of the README and the createPlan/createSession mutations
+are sent to the GraphQL endpoint against generated datasets of increasing
+size (see `src.plan.generator`), with the response cache disabled.
+
+Every operation has a budget of SQL statements, which must not depend on the
+size of the dataset: the benchmark fails if an operation exceeds it. The
+measurements are written as JSON to BENCHMARK_RESULTS (defaults to
+`.benchmarks/graphql.json`) so that runs can be compared. Set BENCHMARK_SCALE
+to grow the datasets.
+"""
+import datetime
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import pytest
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from src.plan.generator import GeneratorOptions, generate_data
+from src.plan.models import Exercise, Plan
+from src.plan.services import RECORDS_BATCH_SIZE
+
+SCALE = int(os.environ.get('BENCHMARK_SCALE', '1'))
+RESULTS_PATH = Path(
+    os.environ.get('BENCHMARK_RESULTS', '.benchmarks/graphql.json')
+)
+
+DATASETS = {
+    'small': GeneratorOptions(
+        plans=10,
+        loops_per_plan=3,
+        goals_per_loop=5,
+        sessions=10,
+        records_per_session=50,
+        exercises=20,
+    ),
+    'medium': GeneratorOptions(
+        plans=50 * SCALE,
+        loops_per_plan=3,
+        goals_per_loop=5,
+        sessions=50 * SCALE,
+        records_per_session=100,
+        exercises=50,
+    ),
+    'large': GeneratorOptions(
+        plans=200 * SCALE,
+        loops_per_plan=3,
+        goals_per_loop=5,
+        sessions=100 * SCALE,
+        records_per_session=200,
+        exercises=100,
+    ),
+}
+
+README_QUERY = '''
+query Readme($exerciseId: String) {
+  sessions {
+    name
+    description
+    records { start end exercise { id name } }
+  }
+  plans {
+    id
+    name
+    description
+    loops {
+      loopIndex
+      rounds
+      description
+      goals { goalIndex exercise { id name description } duration }
+    }
+  }
+  exercises { id name description }
+  exercise(exerciseId: $exerciseId) { id name description }
+}
+'''
+
+SESSIONS_CONNECTION_QUERY = '''
+query Sessions($first: Int) {
+  sessionsConnection(first: $first) {
+    pageInfo { hasNextPage endCursor }
+    edges { node { name start records { reps exercise { name } } } }
+  }
+}
+'''
+
+COMPILED_PLAN_QUERY = '''
+query CompiledPlan($planId: String) {
+  compiledPlan(planId: $planId) {
+    duration
+    steps { loopIndex roundIndex exerciseName duration repetitions pause }
+    totals { exerciseType duration }
+  }
+}
+'''
+
+CREATE_PLAN_MUTATION = '''
+mutation CreatePlan(
+  $name: String!
+  $description: String
+  $created: DateTime!
+  $loops: [LoopInput]!
+) {
+  createPlan(
+    name: $name, description: $description, created: $created, loops: $loops
+  ) {
+    plan { id loops { goals { exercise { id } } } }
+  }
+}
+'''
+
+CREATE_SESSION_MUTATION = '''
+mutation CreateSession(
+  $name: String!, $start: DateTime!, $records: [RecordInput]!
+) {
+  createSession(name: $name, start: $start, records: $records) {
+    session { name records { start exercise { id } } }
+  }
+}
+'''
+
+# The payloads of the mutations do not depend on the dataset, so that their
+# SQL budget is constant: records are inserted in batches of
+# RECORDS_BATCH_SIZE
+PLAN_LOOPS = 12
+PLAN_GOALS_PER_LOOP = 20
+SESSION_RECORDS = RECORDS_BATCH_SIZE
+
+
+def get_exercise_ids(exercise_type):
+    return list(
+        Exercise.objects.filter(exercise_type=exercise_type).values_list(
+            'id', flat=True
+        )
+    )
+
+
+def create_plan_variables() -> Dict[str, Any]:
+    exercise_ids = get_exercise_ids('WORK')
+    return {
+        'name': 'benchmark',
+        'description': 'benchmark plan',
+        'created': timezone.now().isoformat(),
+        'loops': [
+            {
+                'rounds': 2,
+                'loopIndex': loop_index,
+                'description': 'loop',
+                'goals': [
+                    {
+                        'goalIndex': goal_index,
+                        'exerciseId': exercise_ids[
+                            goal_index % len(exercise_ids)
+                        ],
+                        'repetitions': 10,
+                        'duration': 30,
+                        'pause': False,
+                    }
+                    for goal_index in range(PLAN_GOALS_PER_LOOP)
+                ],
+            }
+            for loop_index in range(PLAN_LOOPS)
+        ],
+    }
+
+
+def create_session_variables() -> Dict[str, Any]:
+    exercise_ids = get_exercise_ids('WORK')
+    start = timezone.now() - datetime.timedelta(days=1)
+    return {
+        'name': 'benchmark',
+        'start': start.isoformat(),
+        'records': [
+            {
+                'exerciseId': str(exercise_ids[i % len(exercise_ids)]),
+                'reps': 10,
+                'start': (
+                    start + datetime.timedelta(seconds=30 * i)
+                ).isoformat(),
+                'end': (
+                    start + datetime.timedelta(seconds=30 * i + 20)
+                ).isoformat(),
+            }
+            for i in range(SESSION_RECORDS)
+        ],
+    }
+
+
+class Operation(NamedTuple):
+    name: str
+    query: str
+    variables: Callable[[], Dict[str, Any]]
+    # Maximum amount of SQL statements, whatever the size of the dataset
+    sql_budget: int
+
+
+OPERATIONS = [
+    Operation(
+        'readme query',
+        README_QUERY,
+        # IDs are not reset between datasets on every database
+        lambda: {'exerciseId': str(Exercise.objects.first().id)},
+        7,
+    ),
+    Operation(
+        'sessions connection',
+        SESSIONS_CONNECTION_QUERY,
+        lambda: {'first': 50},
+        2,
+    ),
+    Operation(
+        'compiled plan',
+        COMPILED_PLAN_QUERY,
+        lambda: {'planId': str(Plan.objects.last().id)},
+        3,
+    ),
+    # Writes also take the lock of the change feed (PostgreSQL only) and
+    # insert its events, see src.plan.changes
+    Operation('create plan', CREATE_PLAN_MUTATION, create_plan_variables, 11),
+    Operation(
+        'create session', CREATE_SESSION_MUTATION, create_session_variables, 8
+    ),
+]
+
+
+def execute(client, query, variables):
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': query, 'variables': variables}),
+        content_type='application/json',
+    )
+    body = response.json()
+    assert response.status_code == 200, body
+    assert 'errors' not in body, body['errors']
+    return body
+
+
+def measure(client, operation) -> Dict[str, Any]:
+    variables = operation.variables()
+    # The query log is bounded, and loading the dataset fills it
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        execute(client, operation.query, variables)
+        wall_time = time.perf_counter() - started
+    # The next request resets the query log
+    sql_statements = len(queries)
+
+    # Tracing allocations slows the execution down, so memory is measured
+    # apart
+    variables = operation.variables()
+    tracemalloc.start()
+    try:
+        execute(client, operation.query, variables)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'operation': operation.name,
+        'wall_time_ms': round(wall_time * 1000, 2),
+        'sql_statements': sql_statements,
+        'sql_budget': operation.sql_budget,
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+@pytest.fixture(scope='module')
+def results():
+    results: List[Dict[str, Any]] = []
+    yield results
+    RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    RESULTS_PATH.write_text(
+        json.dumps(
+            {
+                'date': datetime.datetime.utcnow().isoformat(),
+                'database': connection.vendor,
+                'scale': SCALE,
+                'results': results,
+            },
+            indent=2,
+        )
+    )
+    print(f'\nResults written to {RESULTS_PATH}')
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize('dataset', DATASETS)
+def test_graphql_operations(client, settings, results, dataset):
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 0
+    generate_data(DATASETS[dataset])
+
+    print()
+    over_budget = []
+    for operation in OPERATIONS:
+        result = {'dataset': dataset, **measure(client, operation)}
+        results.append(result)
+        print(
+            f'== {dataset} / {operation.name}: '
+            f'{result["wall_time_ms"]:.1f} ms, '
+            f'{result["sql_statements"]} SQL statements '
+            f'(budget {operation.sql_budget}), '
+            f'{result["peak_memory_kb"]:.0f} KiB peak'
+        )
+        if result['sql_statements'] > operation.sql_budget:
+            over_budget.append(operation.name)
+
+    assert not over_budget, f'SQL budget exceeded by {over_budget}'
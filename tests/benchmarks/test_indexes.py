@@ -0,0 +1,193 @@
+"""Query plans and timings of the hot lookups with and without indexes.
+
+A synthetic dataset is generated, then each lookup is explained and timed
+without the indexes and unique constraints added by `0002_indexes` (only the
+implicit ForeignKey indexes remain) and again once they are recreated. Only
+those indexes are dropped, the rest of the schema stays the latest one. Set
+BENCHMARK_SCALE to grow the dataset.
+"""
+import datetime
+import importlib
+import os
+import random
+import time
+from typing import Any
+
+import pytest
+from django.apps import apps
+from django.db import connection, migrations, models
+from django.utils import timezone
+
+from src.plan.models import (
+    Exercise,
+    ExerciseType,
+    Goal,
+    Loop,
+    Plan,
+    Record,
+    Session,
+)
+
+SCALE = int(os.environ.get('BENCHMARK_SCALE', '1'))
+PLANS = 200 * SCALE
+LOOPS_PER_PLAN = 5
+GOALS_PER_LOOP = 10
+SESSIONS = 200 * SCALE
+RECORDS_PER_SESSION = 100
+REPEAT = 20
+
+INDEXES_MIGRATION = 'src.plan.migrations.0002_indexes'
+
+
+def get_indexes():
+    """Return the (model, index or constraint) pairs added by 0002."""
+    module: Any = importlib.import_module(INDEXES_MIGRATION)
+    migration = module.Migration
+    indexes = []
+    for operation in migration.operations:
+        model = apps.get_model('plan', operation.model_name)
+        if isinstance(operation, migrations.AddIndex):
+            indexes.append((model, operation.index))
+        else:
+            indexes.append((model, operation.constraint))
+    return indexes
+
+
+def drop_indexes(indexes):
+    with connection.schema_editor() as schema_editor:
+        for model, index in indexes:
+            if isinstance(index, models.Index):
+                schema_editor.remove_index(model, index)
+            else:
+                schema_editor.remove_constraint(model, index)
+
+
+def create_indexes(indexes):
+    with connection.schema_editor() as schema_editor:
+        for model, index in indexes:
+            if isinstance(index, models.Index):
+                schema_editor.add_index(model, index)
+            else:
+                schema_editor.add_constraint(model, index)
+
+
+def generate_dataset():
+    rng = random.Random(0)
+    now = timezone.now()
+    Exercise.objects.bulk_create(
+        Exercise(name=f'exercise {i}', exercise_type=ExerciseType.WORK)
+        for i in range(20)
+    )
+    exercises = list(Exercise.objects.all())
+
+    Plan.objects.bulk_create(
+        Plan(
+            name=f'plan {i}',
+            created=now - datetime.timedelta(days=i),
+            last_updated=now - datetime.timedelta(days=i),
+        )
+        for i in range(PLANS)
+    )
+    plans = list(Plan.objects.all())
+    Loop.objects.bulk_create(
+        Loop(plan=plan, loop_index=i, description='loop')
+        for plan in plans
+        for i in range(LOOPS_PER_PLAN)
+    )
+    loops = list(Loop.objects.all())
+    Goal.objects.bulk_create(
+        (
+            Goal(
+                loop=loop,
+                exercise=rng.choice(exercises),
+                goal_index=i,
+                duration=30,
+                repetitions=10,
+            )
+            for loop in loops
+            for i in range(GOALS_PER_LOOP)
+        )
+    )
+
+    Session.objects.bulk_create(
+        Session(name=f'session {i}', start=now - datetime.timedelta(days=i))
+        for i in range(SESSIONS)
+    )
+    sessions = list(Session.objects.all())
+    Record.objects.bulk_create(
+        (
+            Record(
+                session=session,
+                exercise=rng.choice(exercises),
+                start=session.start + datetime.timedelta(seconds=30 * i),
+                end=session.start + datetime.timedelta(seconds=30 * i + 20),
+                reps=10,
+            )
+            for session in sessions
+            # Insert the records of each session in random order
+            for i in rng.sample(
+                range(RECORDS_PER_SESSION), RECORDS_PER_SESSION
+            )
+        )
+    )
+    return plans, loops, sessions
+
+
+def hot_lookups(plans, loops, sessions):
+    plan = plans[len(plans) // 2]
+    loop = loops[len(loops) // 2]
+    session = sessions[len(sessions) // 2]
+    return {
+        'plan by name and created': Plan.objects.filter(
+            name=plan.name, created=plan.created
+        ),
+        'loops of a plan': Loop.objects.filter(plan_id=plan.id).order_by(
+            'loop_index'
+        ),
+        'goals of a loop': Goal.objects.filter(loop_id=loop.id).order_by(
+            'goal_index'
+        ),
+        'records of a session': Record.objects.filter(
+            session_id=session.id
+        ).order_by('start'),
+        'sessions page': Session.objects.filter(
+            start__gt=session.start
+        ).order_by('start', 'id')[:20],
+        'plans page': Plan.objects.filter(
+            last_updated__gt=plan.last_updated
+        ).order_by('last_updated', 'id')[:20],
+    }
+
+
+def measure(lookups):
+    results = {}
+    for name, queryset in lookups.items():
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            list(queryset.all())
+        elapsed = (time.perf_counter() - started) / REPEAT * 1000
+        results[name] = (elapsed, queryset.explain())
+    return results
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_hot_lookups_with_and_without_indexes():
+    plans, loops, sessions = generate_dataset()
+    lookups = hot_lookups(plans, loops, sessions)
+
+    indexes = get_indexes()
+    drop_indexes(indexes)
+    try:
+        before = measure(lookups)
+    finally:
+        create_indexes(indexes)
+    after = measure(lookups)
+
+    print()
+    for name in lookups:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        print(f'== {name}: {before_ms:.2f} ms -> {after_ms:.2f} ms')
+        print(f'-- before\n{before_plan}')
+        print(f'-- after\n{after_plan}')
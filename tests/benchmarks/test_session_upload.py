@@ -0,0 +1,76 @@
+"""Latency of uploading a Session against the amount of Records it holds.
+
+Compares the bulk ingestion path of `SessionService.create` with saving the
+Records one at a time through `RecordService.create`.
+"""
+import datetime
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+
+from src.plan.models import Exercise, ExerciseType, Session
+from src.plan.services import RecordService, SessionService
+
+RECORD_COUNTS = (10, 100, 500, 1500)
+
+
+def build_records_data(exercise, amount):
+    start = timezone.now() - datetime.timedelta(days=1)
+    records = []
+    for i in range(amount):
+        record_start = start + datetime.timedelta(seconds=5 * i)
+        records.append(
+            SimpleNamespace(
+                exercise_id=str(exercise.id),
+                start=record_start,
+                end=record_start + datetime.timedelta(seconds=4),
+                reps=10,
+            )
+        )
+    return records
+
+
+def upload_one_by_one(records_data):
+    with transaction.atomic():
+        session = Session(name='benchmark', start=records_data[0].start)
+        session.full_clean()
+        session.save()
+        for record in records_data:
+            exercise = Exercise.objects.get(pk=record.exercise_id)
+            RecordService.create(
+                start=record.start,
+                end=record.end,
+                reps=record.reps,
+                exercise=exercise,
+                session=session,
+            )
+
+
+def upload_in_bulk(records_data):
+    SessionService.create(
+        name='benchmark', start=records_data[0].start, records=records_data
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_session_upload_latency():
+    exercise = Exercise.objects.create(
+        name='benchmark', exercise_type=ExerciseType.WORK
+    )
+
+    print()
+    print(f'{"records":>8} {"one by one (ms)":>16} {"bulk (ms)":>10}')
+    for amount in RECORD_COUNTS:
+        records_data = build_records_data(exercise, amount)
+        timings = []
+        for upload in (upload_one_by_one, upload_in_bulk):
+            started = time.perf_counter()
+            upload(records_data)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f'{amount:>8} {timings[0]:>16.1f} {timings[1]:>10.1f}')
+
+    assert Session.objects.count() == 2 * len(RECORD_COUNTS)
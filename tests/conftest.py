@@ -0,0 +1,77 @@
+import datetime
+from typing import Callable, List
+
+import pytest
+from django.core.cache import caches
+from django.utils import timezone
+
+from src.plan.models import (
+    Exercise,
+    ExerciseType,
+    Goal,
+    Loop,
+    Plan,
+    Record,
+    Session,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Cached responses are keyed by model versions, which are not bumped when
+    # the test database is rolled back
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def exercises(db) -> List[Exercise]:
+    return [
+        Exercise.objects.create(
+            name=f'exercise {i}', exercise_type=ExerciseType.WORK
+        )
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def make_plan(exercises: List[Exercise]) -> Callable[..., Plan]:
+    def _make_plan(loops: int = 2, goals_per_loop: int = 3) -> Plan:
+        created = timezone.now() - datetime.timedelta(days=1)
+        plan = Plan.objects.create(
+            name='plan', created=created, last_updated=created
+        )
+        for loop_index in range(loops):
+            loop = Loop.objects.create(
+                plan=plan, loop_index=loop_index, rounds=2
+            )
+            for goal_index in range(goals_per_loop):
+                Goal.objects.create(
+                    loop=loop,
+                    exercise=exercises[goal_index % len(exercises)],
+                    goal_index=goal_index,
+                    duration=30,
+                    repetitions=10,
+                )
+        return plan
+
+    return _make_plan
+
+
+@pytest.fixture
+def make_session(exercises: List[Exercise]) -> Callable[..., Session]:
+    def _make_session(records: int = 3) -> Session:
+        start = timezone.now() - datetime.timedelta(hours=2)
+        session = Session.objects.create(name='session', start=start)
+        for i in range(records):
+            record_start = start + datetime.timedelta(minutes=i)
+            Record.objects.create(
+                session=session,
+                exercise=exercises[i % len(exercises)],
+                start=record_start,
+                end=record_start + datetime.timedelta(seconds=30),
+                reps=10,
+            )
+        return session
+
+    return _make_session
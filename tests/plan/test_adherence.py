@@ -0,0 +1,104 @@
+import datetime
+import json
+import random
+
+import pytest
+from django.utils import timezone
+
+from src.plan.adherence import align, get_adherence
+from src.plan.models import Record, Session
+
+
+def lcs_length(a, b):
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in reversed(range(len(a))):
+        for j in reversed(range(len(b))):
+            if a[i] == b[j]:
+                lengths[i][j] = lengths[i + 1][j + 1] + 1
+            else:
+                lengths[i][j] = max(lengths[i + 1][j], lengths[i][j + 1])
+    return lengths[0][0]
+
+
+def test_align_finds_a_longest_common_subsequence():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = [rng.randint(0, 4) for _ in range(rng.randint(0, 15))]
+        b = [rng.randint(0, 4) for _ in range(rng.randint(0, 15))]
+
+        matches = align(a, b)
+
+        assert all(a[i] == b[j] for i, j in matches)
+        assert matches == sorted(matches)
+        assert len({i for i, _ in matches}) == len(matches)
+        assert len({j for _, j in matches}) == len(matches)
+        assert len(matches) == lcs_length(a, b)
+
+
+@pytest.fixture
+def session(exercises):
+    start = timezone.now() - datetime.timedelta(hours=1)
+    session = Session.objects.create(name='session', start=start)
+    # The plan runs exercises 0, 1, 2, 0, 1, 2
+    for i, exercise_index in enumerate([0, 1, 0, 1, 2, 1]):
+        record_start = start + datetime.timedelta(minutes=i)
+        Record.objects.create(
+            session=session,
+            exercise=exercises[exercise_index],
+            start=record_start,
+            end=record_start + datetime.timedelta(seconds=40),
+            reps=12,
+        )
+    return session
+
+
+@pytest.mark.django_db
+def test_get_adherence(make_plan, session):
+    plan = make_plan(loops=1, goals_per_loop=3)
+    records = list(session.records.order_by('start'))
+
+    adherence = get_adherence(plan.id, session.id)
+
+    assert [goal.record_id for goal in adherence.goals] == [
+        records[0].id,
+        records[1].id,
+        None,
+        records[2].id,
+        records[3].id,
+        records[4].id,
+    ]
+    assert adherence.extra_record_ids == [records[5].id]
+    assert (adherence.completed_goals, adherence.skipped_goals) == (5, 1)
+    assert adherence.goals[0].actual_duration == 40
+    assert adherence.goals[0].duration_drift == 10
+    assert adherence.goals[0].repetitions_drift == 2
+
+
+@pytest.mark.django_db
+def test_query_adherence(client, make_plan, session):
+    plan = make_plan(loops=1, goals_per_loop=3)
+    query = '''
+    query Adherence($planId: String!, $sessionId: String!) {
+      adherence(planId: $planId, sessionId: $sessionId) {
+        skippedGoals
+        extraRecordIds
+        goals { skipped durationDrift step { goalIndex roundIndex } }
+      }
+    }
+    '''
+    variables = {'planId': str(plan.id), 'sessionId': str(session.id)}
+
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': query, 'variables': variables}),
+        content_type='application/json',
+    )
+
+    adherence = response.json()['data']['adherence']
+    assert adherence['skippedGoals'] == 1
+    assert len(adherence['extraRecordIds']) == 1
+    assert adherence['goals'][2] == {
+        'skipped': True,
+        'durationDrift': None,
+        'step': {'goalIndex': 2, 'roundIndex': 0},
+    }
@@ -0,0 +1,155 @@
+import datetime
+import json
+import threading
+import time
+
+import pytest
+from django.db import connection, transaction
+from django.utils import timezone
+
+from src.plan.changes import Tombstone, get_changes, record_changes
+from src.plan.models import ChangeKind, Exercise, Goal, Record
+from src.plan.services import ExerciseService, SessionService
+
+QUERY = '''
+query Changes($cursor: String) {
+  changesSince(cursor: $cursor) {
+    cursor
+    hasMore
+    exercises { name }
+    plans { name loops { goals { exercise { name } } } }
+    sessions { name records { reps } }
+    tombstones { model id }
+  }
+}
+'''
+
+
+@pytest.mark.django_db
+def test_changes_since_cursor(exercises):
+    exercise = ExerciseService.create(name='squat', exercise_type='WORK')
+    first = get_changes(None)
+    SessionService.create(name='session', start=timezone.now())
+
+    second = get_changes(first.cursor)
+
+    assert first.changed == {
+        'exercise': [exercise.id],
+        'plan': [],
+        'session': [],
+    }
+    assert first.tombstones == []
+    assert len(second.changed['session']) == 1
+    assert second.changed['exercise'] == []
+    assert get_changes(second.cursor) == second._replace(
+        changed={'exercise': [], 'plan': [], 'session': []}
+    )
+
+
+@pytest.mark.django_db
+def test_exercise_deletions_are_tombstones(exercises, make_plan, make_session):
+    plan = make_plan(loops=2, goals_per_loop=3)
+    session = make_session(records=3)
+    goals = Goal.objects.filter(exercise=exercises[0])
+    records = Record.objects.filter(exercise=exercises[0])
+    deleted = [
+        Tombstone('exercise', exercises[0].id),
+        *(Tombstone('goal', goal.id) for goal in goals),
+        *(Tombstone('record', record.id) for record in records),
+    ]
+
+    ExerciseService.delete(id=exercises[0].id)
+    changes = get_changes(None)
+
+    assert changes.tombstones == deleted
+    assert changes.changed == {
+        'exercise': [],
+        'plan': [plan.id],
+        'session': [session.id],
+    }
+
+
+@pytest.mark.django_db
+def test_changes_are_paginated(settings):
+    settings.CHANGES_PAGE_SIZE = 2
+    for name in ('a', 'b', 'c'):
+        ExerciseService.create(name=name, exercise_type='WORK')
+
+    first = get_changes(None)
+    second = get_changes(first.cursor)
+
+    assert first.has_more
+    assert len(first.changed['exercise']) == 2
+    assert not second.has_more
+    assert len(second.changed['exercise']) == 1
+
+    with pytest.raises(Exception, match='Invalid cursor'):
+        get_changes('not a cursor')
+
+
+@pytest.mark.django_db
+def test_changes_since_query(client, exercises, make_plan):
+    make_plan(loops=1, goals_per_loop=2)
+    created = timezone.now() - datetime.timedelta(hours=1)
+    ExerciseService.create(name='squat', exercise_type='WORK')
+    SessionService.create(name='session', start=created)
+
+    def changes_since(cursor):
+        response = client.post(
+            '/graphql',
+            json.dumps({'query': QUERY, 'variables': {'cursor': cursor}}),
+            content_type='application/json',
+        )
+        return response.json()['data']['changesSince']
+
+    changes = changes_since(None)
+    ExerciseService.delete(id=exercises[1].id)
+    after_deletion = changes_since(changes['cursor'])
+
+    assert changes['exercises'] == [{'name': 'squat'}]
+    assert changes['sessions'] == [{'name': 'session', 'records': []}]
+    assert changes['plans'] == []
+    assert not changes['hasMore']
+    assert after_deletion['exercises'] == []
+    assert after_deletion['plans'] == [
+        {
+            'name': 'plan',
+            'loops': [{'goals': [{'exercise': {'name': 'exercise 0'}}]}],
+        }
+    ]
+    assert after_deletion['tombstones'][0] == {
+        'model': 'exercise',
+        'id': str(exercises[1].id),
+    }
+    assert [
+        tombstone['model'] for tombstone in after_deletion['tombstones']
+    ] == ['exercise', 'goal']
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='SQLite runs a single writing transaction at once',
+)
+@pytest.mark.django_db(transaction=True)
+def test_events_committed_out_of_order_are_not_skipped():
+    first_inserted = threading.Event()
+
+    def record_first():
+        try:
+            with transaction.atomic():
+                record_changes(Exercise, [1], ChangeKind.CREATE)
+                first_inserted.set()
+                # Leave time for the second transaction to commit first
+                time.sleep(0.5)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=record_first)
+    thread.start()
+    first_inserted.wait()
+    record_changes(Exercise, [2], ChangeKind.CREATE)
+    changes = get_changes(None)
+    thread.join()
+    later = get_changes(changes.cursor)
+
+    assert changes.changed['exercise'] + later.changed['exercise'] == [1, 2]
@@ -0,0 +1,129 @@
+import datetime
+import json
+
+import pytest
+
+from src.plan.compiler import ExerciseTypeTotal, get_compiled_plan
+from src.plan.models import Exercise, ExerciseType, Goal, Plan
+from src.plan.services import ExerciseService, GoalService, LoopService
+
+
+@pytest.fixture
+def plan(make_plan, exercises):
+    plan = make_plan(loops=2, goals_per_loop=2)
+    rest = Exercise.objects.create(
+        name='rest', exercise_type=ExerciseType.REST
+    )
+    Goal.objects.filter(goal_index=1).update(exercise=rest, repetitions=None)
+    return plan
+
+
+@pytest.mark.django_db
+def test_compile_plan(plan, exercises):
+    compiled_plan = get_compiled_plan(plan.id)
+
+    assert [
+        (step.loop_index, step.round_index, step.goal_index)
+        for step in compiled_plan.steps
+    ] == [
+        (loop_index, round_index, goal_index)
+        for loop_index in range(2)
+        for round_index in range(2)
+        for goal_index in range(2)
+    ]
+    assert compiled_plan.steps[0].exercise_name == exercises[0].name
+    assert compiled_plan.steps[1].exercise_name == 'rest'
+    assert compiled_plan.totals == [
+        ExerciseTypeTotal(ExerciseType.WORK, 4, 120, 40),
+        ExerciseTypeTotal(ExerciseType.REST, 4, 120, 0),
+    ]
+    assert compiled_plan.duration == 240
+
+
+@pytest.mark.django_db
+def test_compiled_plans_are_cached(plan, django_assert_num_queries):
+    compiled_plan = get_compiled_plan(plan.id)
+
+    with django_assert_num_queries(1):
+        assert get_compiled_plan(plan.id) == compiled_plan
+
+    plan.last_updated += datetime.timedelta(seconds=1)
+    plan.save()
+    Goal.objects.filter(goal_index=1).delete()
+    assert len(get_compiled_plan(plan.id).steps) == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deleting_an_exercise_invalidates_compiled_plans(plan):
+    get_compiled_plan(plan.id)
+
+    ExerciseService.delete(id=Exercise.objects.get(name='rest').id)
+
+    assert len(get_compiled_plan(plan.id).steps) == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writing_loops_and_goals_invalidates_compiled_plans(plan, exercises):
+    get_compiled_plan(plan.id)
+
+    loop = LoopService.create(
+        plan=plan, loop_index=2, rounds=1, description='new loop'
+    )
+    assert len(get_compiled_plan(plan.id).steps) == 8
+
+    GoalService.create(
+        loop=loop,
+        exercise=exercises[0],
+        goal_index=0,
+        duration=30,
+        repetitions=10,
+        pause=False,
+    )
+    assert len(get_compiled_plan(plan.id).steps) == 9
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unrelated_writes_keep_compiled_plans(
+    plan, make_plan, django_assert_num_queries
+):
+    compiled_plan = get_compiled_plan(plan.id)
+
+    other_plan = make_plan(loops=1)
+    LoopService.create(
+        plan=other_plan, loop_index=1, rounds=1, description='new loop'
+    )
+    ExerciseService.create(name='squat', exercise_type=ExerciseType.WORK)
+
+    with django_assert_num_queries(1):
+        assert get_compiled_plan(plan.id) == compiled_plan
+
+
+@pytest.mark.django_db
+def test_query_compiled_plan(client, plan):
+    query = '''
+    query CompiledPlan($planId: String) {
+      compiledPlan(planId: $planId) {
+        duration
+        steps { exerciseName exerciseType }
+        totals { exerciseType steps }
+      }
+    }
+    '''
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': query, 'variables': {'planId': str(plan.id)}}),
+        content_type='application/json',
+    )
+
+    compiled_plan = response.json()['data']['compiledPlan']
+    assert compiled_plan['duration'] == 240
+    assert compiled_plan['steps'][1] == {
+        'exerciseName': 'rest',
+        'exerciseType': 'REST',
+    }
+    assert compiled_plan['totals'] == [
+        {'exerciseType': 'WORK', 'steps': 4},
+        {'exerciseType': 'REST', 'steps': 4},
+    ]
+    with pytest.raises(Plan.DoesNotExist):
+        get_compiled_plan(plan.id + 1)
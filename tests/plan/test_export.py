@@ -0,0 +1,113 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+
+from src.plan.export import EXPORT_FIELDS, export_sessions
+from src.plan.models import Session
+
+
+@pytest.fixture
+def sessions(make_session):
+    session = make_session(records=3)
+    empty_session = Session.objects.create(
+        name='empty', start=session.start - datetime.timedelta(days=1)
+    )
+    return empty_session, session
+
+
+def read_ndjson(content):
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+def test_export_ndjson(sessions, exercises, settings):
+    settings.EXPORT_CHUNK_SIZE = 2
+    empty_session, session = sessions
+
+    chunks = list(export_sessions('ndjson'))
+
+    assert len(chunks) == 2
+    rows = read_ndjson(''.join(chunks))
+    assert [row['session_id'] for row in rows] == [empty_session.id] + [
+        session.id
+    ] * 3
+    assert rows[0]['record_id'] is None
+    record = session.records.order_by('start').first()
+    encoder = DjangoJSONEncoder()
+    assert rows[1] == {
+        'session_id': session.id,
+        'session_name': session.name,
+        'session_description': session.description,
+        'session_notes': session.notes,
+        'session_start': encoder.default(session.start),
+        'record_id': record.id,
+        'exercise_name': exercises[0].name,
+        'exercise_type': exercises[0].exercise_type,
+        'record_start': encoder.default(record.start),
+        'record_end': encoder.default(record.end),
+        'reps': record.reps,
+    }
+
+
+@pytest.mark.django_db
+def test_export_csv_by_date_range(sessions):
+    empty_session, session = sessions
+
+    content = ''.join(
+        export_sessions(
+            'csv', since=session.start - datetime.timedelta(hours=1)
+        )
+    )
+
+    header, *rows = csv.reader(io.StringIO(content))
+    assert tuple(header) == EXPORT_FIELDS
+    assert len(rows) == 3
+    assert {row[0] for row in rows} == {str(session.id)}
+
+
+@pytest.mark.django_db
+def test_export_view_streams_rows(client, sessions):
+    empty_session, session = sessions
+
+    response = client.get(
+        '/export/sessions',
+        {'until': session.start.isoformat(), 'format': 'ndjson'},
+    )
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'application/x-ndjson'
+    rows = read_ndjson(b''.join(response.streaming_content).decode())
+    assert [row['session_id'] for row in rows] == [empty_session.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'params', [{'format': 'xml'}, {'since': 'yesterday'}],
+)
+def test_export_view_rejects_invalid_parameters(client, params):
+    response = client.get('/export/sessions', params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_command(sessions, tmp_path):
+    stdout = io.StringIO()
+    call_command('export_sessions', stdout=stdout)
+    assert len(read_ndjson(stdout.getvalue())) == 4
+
+    output = tmp_path / 'sessions.csv'
+    empty_session, session = sessions
+    call_command(
+        'export_sessions',
+        format='csv',
+        since=session.start.isoformat(),
+        output=output,
+    )
+    assert len(output.read_text().splitlines()) == 4
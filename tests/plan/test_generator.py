@@ -0,0 +1,82 @@
+import io
+import re
+
+import pytest
+from django.core.management import call_command
+
+from src.plan.generator import GeneratedData, GeneratorOptions, generate_data
+from src.plan.models import Goal, Plan, Record, Session
+from src.plan.validation import collect_errors
+
+OPTIONS = GeneratorOptions(
+    plans=3,
+    loops_per_plan=2,
+    goals_per_loop=4,
+    sessions=4,
+    records_per_session=5,
+    exercises=5,
+    seed=42,
+)
+
+
+def get_records():
+    # Timestamps are relative to the current time
+    return [
+        (exercise_type, end - start, reps)
+        for exercise_type, start, end, reps in Record.objects.order_by(
+            'id'
+        ).values_list('exercise__exercise_type', 'start', 'end', 'reps')
+    ]
+
+
+@pytest.mark.django_db
+def test_generate_valid_data():
+    generated = generate_data(OPTIONS)
+
+    assert generated == GeneratedData(5, 3, 6, 24, 4, 20)
+    assert Goal.objects.filter(loop__plan__in=Plan.objects.all()).count() == 24
+    assert collect_errors(list(Goal.objects.all())) == {}
+    assert collect_errors(list(Session.objects.all())) == {}
+    assert collect_errors(list(Record.objects.all())) == {}
+
+
+@pytest.mark.django_db
+def test_generated_names_end_with_the_tag_of_the_run():
+    generate_data(OPTIONS)
+
+    assert re.fullmatch(
+        r'plan 0 \([0-9a-f]{8}\)', Plan.objects.order_by('id')[0].name
+    )
+
+
+@pytest.mark.django_db
+def test_the_same_seed_generates_the_same_data():
+    generate_data(OPTIONS)
+    first_records = get_records()
+    Record.objects.all().delete()
+
+    generate_data(OPTIONS)
+    assert get_records()[-len(first_records) :] == first_records
+
+    Record.objects.all().delete()
+    generate_data(OPTIONS._replace(seed=1))
+    assert get_records()[-len(first_records) :] != first_records
+
+
+@pytest.mark.django_db
+def test_create_random_data_command():
+    stdout = io.StringIO()
+
+    call_command(
+        'create_random_data',
+        '--plans=1',
+        '--sessions=2',
+        '--records-per-session=10',
+        stdout=stdout,
+    )
+
+    assert Record.objects.count() == 20
+    assert stdout.getvalue().endswith(
+        '6 exercises, 1 plans, 4 loops, 12 goals, 2 sessions, 20 records '
+        'created\n'
+    )
@@ -0,0 +1,117 @@
+import datetime
+import io
+import json
+from typing import List
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+
+from src.plan.export import export_sessions
+from src.plan.importer import ImportProgress, RowError, import_sessions
+from src.plan.models import Exercise, ExerciseType, Record, Session
+
+START = timezone.now() - datetime.timedelta(days=1)
+
+
+def make_row(session='session', minute=0, **fields):
+    record_start = START + datetime.timedelta(minutes=minute)
+    row = {
+        'session_name': session,
+        'session_start': START.isoformat(),
+        'exercise_name': 'squat',
+        'record_start': record_start.isoformat(),
+        'record_end': (
+            record_start + datetime.timedelta(seconds=30)
+        ).isoformat(),
+        'reps': 10,
+    }
+    row.update(fields)
+    return row
+
+
+def to_ndjson(rows):
+    return io.StringIO(''.join(json.dumps(row) + '\n' for row in rows))
+
+
+@pytest.mark.django_db
+def test_import_exported_sessions(make_session):
+    session = make_session(records=3)
+    Session.objects.filter(pk=session.pk).update(
+        description='legs', notes='knee pain'
+    )
+    preparation = Exercise.objects.create(
+        name='warm up', exercise_type=ExerciseType.PREPARATION
+    )
+    session.records.create(
+        exercise=preparation, start=START, end=START, reps=0
+    )
+    Session.objects.create(name='empty', start=START)
+    exported = ''.join(export_sessions('csv'))
+    Session.objects.all().delete()
+
+    result = import_sessions(io.StringIO(exported), 'csv')
+
+    assert result == (2, 4, [])
+    assert Record.objects.count() == 4
+    imported = Session.objects.get(name='session')
+    assert (imported.description, imported.notes) == ('legs', 'knee pain')
+    # Exercises are matched by name and type
+    assert Exercise.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_import_reports_invalid_rows(settings):
+    settings.IMPORT_BATCH_SIZE = 2
+    rows = [
+        make_row(minute=0),
+        make_row(minute=1, reps=-1, exercise_type=ExerciseType.WORK),
+        make_row(minute=2, record_end='not a date'),
+        make_row(minute=3, exercise_name='rest', reps=0),
+        make_row(session=''),
+        make_row(session='', minute=1),
+    ]
+
+    progress: List[ImportProgress] = []
+    result = import_sessions(to_ndjson(rows), 'ndjson', progress.append)
+    file = io.StringIO('{"session_name": "session"\n')
+    invalid_json = import_sessions(file, 'ndjson')
+
+    assert (result.sessions, result.records) == (1, 2)
+    assert [error.line for error in result.errors] == [2, 3, 5, 6]
+    assert result.errors[1] == RowError(
+        3, "Invalid date or datetime: 'not a date'"
+    )
+    assert result.errors[3] == RowError(6, 'The session of the row is invalid')
+    assert [p.rows for p in progress] == [2, 4, 6]
+    assert Session.objects.get().records.count() == 2
+    assert Exercise.objects.get(name='rest').exercise_type == ExerciseType.REST
+    assert invalid_json.errors == [
+        RowError(1, 'The row is not a valid JSON object')
+    ]
+
+
+@pytest.mark.django_db
+def test_import_view(client):
+    content = to_ndjson([make_row(minute=i) for i in range(3)]).getvalue()
+    upload = SimpleUploadedFile('sessions.ndjson', content.encode())
+
+    response = client.post('/import/sessions', {'file': upload})
+
+    assert response.status_code == 200
+    assert response.json() == {'sessions': 1, 'records': 3, 'errors': []}
+
+
+@pytest.mark.django_db
+def test_import_command(tmp_path):
+    path = tmp_path / 'sessions.ndjson'
+    path.write_text(to_ndjson([make_row(), make_row(reps='x')]).getvalue())
+    stdout, stderr = io.StringIO(), io.StringIO()
+
+    call_command('import_sessions', str(path), stdout=stdout, stderr=stderr)
+
+    assert 'Imported 1 sessions and 1 records, 1 rows failed' in (
+        stdout.getvalue()
+    )
+    assert stderr.getvalue().startswith('Line 2: ')
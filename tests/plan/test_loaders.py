@@ -0,0 +1,63 @@
+import pytest
+from django.test import RequestFactory
+
+from src.schema import schema
+
+README_QUERY = '''
+query {
+  sessions {
+    name
+    records {
+      start
+      exercise { id name }
+    }
+  }
+  plans {
+    id
+    loops {
+      loopIndex
+      goals {
+        goalIndex
+        exercise { id name }
+      }
+    }
+  }
+}
+'''
+
+
+def execute(query):
+    result = schema.execute(query, context_value=RequestFactory().get('/'))
+    assert not result.errors
+    return result.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('amount', (1, 5))
+def test_sql_queries_do_not_depend_on_the_amount_of_data(
+    make_plan, make_session, django_assert_max_num_queries, amount
+):
+    for _ in range(amount):
+        make_plan()
+        make_session()
+
+    # plans, loops, goals, sessions, records and exercises (the exercises of
+    # the goals and of the records might be loaded in separate batches)
+    with django_assert_max_num_queries(7):
+        data = execute(README_QUERY)
+
+    assert len(data['plans']) == amount
+    assert len(data['sessions']) == amount
+
+
+@pytest.mark.django_db
+def test_children_are_returned_in_index_order(make_plan):
+    make_plan(loops=3, goals_per_loop=4)
+
+    data = execute(README_QUERY)
+
+    loops = data['plans'][0]['loops']
+    assert [loop['loopIndex'] for loop in loops] == [0, 1, 2]
+    for loop in loops:
+        goal_indexes = [goal['goalIndex'] for goal in loop['goals']]
+        assert goal_indexes == [0, 1, 2, 3]
@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from src.schema import schema
+
+
+def execute_and_capture(query):
+    with CaptureQueriesContext(connection) as context:
+        result = schema.execute(query, context_value=RequestFactory().get('/'))
+    assert not result.errors, result.errors
+    return result.data, [query['sql'] for query in context.captured_queries]
+
+
+@pytest.mark.django_db
+def test_unrequested_columns_are_not_fetched(make_plan):
+    make_plan()
+
+    data, queries = execute_and_capture('{ plans { id name } }')
+
+    assert data['plans'][0]['name'] == 'plan'
+    assert len(queries) == 1
+    assert '"name"' in queries[0]
+    assert '"description"' not in queries[0]
+
+
+@pytest.mark.django_db
+def test_children_only_fetch_requested_columns(make_plan):
+    make_plan()
+
+    data, queries = execute_and_capture(
+        '{ plans { loops { rounds goals { duration } } } }'
+    )
+
+    assert data['plans'][0]['loops'][0]['goals'][0]['duration'] == 30
+    assert len(queries) == 3
+    assert all('"description"' not in query for query in queries)
+    assert all('"repetitions"' not in query for query in queries)
+
+
+@pytest.mark.django_db
+def test_forward_relations_are_joined(make_session):
+    make_session(records=3)
+
+    data, queries = execute_and_capture(
+        '''
+        query {
+          sessions { ...sessionFields }
+        }
+        fragment sessionFields on SessionGraphqlType {
+          records { exercise { name } }
+        }
+        '''
+    )
+
+    records = data['sessions'][0]['records']
+    assert [record['exercise']['name'] for record in records] == [
+        'exercise 0',
+        'exercise 1',
+        'exercise 2',
+    ]
+    assert len(queries) == 2
+    assert 'JOIN "plan_exercise"' in queries[1]
+    assert '"plan_exercise"."description"' not in queries[1]
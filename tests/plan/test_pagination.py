@@ -0,0 +1,85 @@
+import pytest
+from django.test import RequestFactory
+
+from src.schema import schema
+
+SESSIONS_QUERY = '''
+query ($first: Int, $after: String, $last: Int, $before: String) {
+  sessionsConnection(
+    first: $first, after: $after, last: $last, before: $before
+  ) {
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+    edges { cursor node { id records { reps } } }
+  }
+}
+'''
+
+
+def execute(query, **variables):
+    result = schema.execute(
+        query,
+        variable_values=variables,
+        context_value=RequestFactory().get('/'),
+    )
+    assert not result.errors, result.errors
+    return result.data
+
+
+def session_ids(data):
+    return [edge['node']['id'] for edge in data['sessionsConnection']['edges']]
+
+
+@pytest.fixture
+def sessions(make_session):
+    return [make_session(records=2) for _ in range(5)]
+
+
+@pytest.mark.django_db
+def test_paginate_forwards(sessions):
+    expected = [str(session.id) for session in sessions]
+
+    first_page = execute(SESSIONS_QUERY, first=2)
+    page_info = first_page['sessionsConnection']['pageInfo']
+    assert session_ids(first_page) == expected[:2]
+    assert page_info['hasNextPage']
+
+    cursor = page_info['endCursor']
+    second_page = execute(SESSIONS_QUERY, first=3, after=cursor)
+    page_info = second_page['sessionsConnection']['pageInfo']
+    assert session_ids(second_page) == expected[2:]
+    assert not page_info['hasNextPage']
+
+
+@pytest.mark.django_db
+def test_paginate_backwards(sessions):
+    expected = [str(session.id) for session in sessions]
+
+    last_page = execute(SESSIONS_QUERY, last=2)
+    page_info = last_page['sessionsConnection']['pageInfo']
+    assert session_ids(last_page) == expected[-2:]
+    assert page_info['hasPreviousPage']
+
+    cursor = page_info['startCursor']
+    previous_page = execute(SESSIONS_QUERY, last=2, before=cursor)
+    assert session_ids(previous_page) == expected[1:3]
+
+
+@pytest.mark.django_db
+def test_page_size_is_capped(sessions, settings):
+    settings.GRAPHQL_MAX_PAGE_SIZE = 3
+
+    data = execute(SESSIONS_QUERY, first=100)
+
+    assert session_ids(data) == [str(session.id) for session in sessions[:3]]
+    assert data['sessionsConnection']['pageInfo']['hasNextPage']
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected(sessions):
+    result = schema.execute(
+        SESSIONS_QUERY,
+        variable_values={'first': 2, 'after': 'not a cursor'},
+        context_value=RequestFactory().get('/'),
+    )
+
+    assert result.errors[0].message == 'Invalid cursor: not a cursor'
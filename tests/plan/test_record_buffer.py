@@ -0,0 +1,190 @@
+import datetime
+import json
+import threading
+import time
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from src.plan.changes import get_changes
+from src.plan.models import Record, Session
+from src.plan.record_buffer import RecordBuffer, _Append
+from src.plan.services import SessionService
+
+MUTATION = '''
+mutation Append($sessionId: String!, $records: [RecordInput!]!) {
+  appendRecords(sessionId: $sessionId, records: $records) {
+    appended
+    session { records { start reps } }
+  }
+}
+'''
+
+
+def build_record(session, exercise, minute):
+    start = session.start + datetime.timedelta(minutes=minute)
+    return Record(
+        session=session,
+        exercise=exercise,
+        start=start,
+        end=start + datetime.timedelta(seconds=30),
+        reps=10,
+    )
+
+
+@pytest.mark.django_db
+def test_append_records_mutation(client, exercises):
+    session = Session.objects.create(
+        name='live', start=timezone.now() - datetime.timedelta(hours=1)
+    )
+    cursor = get_changes(None).cursor
+
+    def append(minutes):
+        records = [
+            {
+                'exerciseId': str(exercises[0].id),
+                'start': (
+                    session.start + datetime.timedelta(minutes=minute)
+                ).isoformat(),
+                'end': (
+                    session.start + datetime.timedelta(minutes=minute + 1)
+                ).isoformat(),
+                'reps': minute,
+            }
+            for minute in minutes
+        ]
+        response = client.post(
+            '/graphql',
+            json.dumps(
+                {
+                    'query': MUTATION,
+                    'variables': {
+                        'sessionId': str(session.id),
+                        'records': records,
+                    },
+                }
+            ),
+            content_type='application/json',
+        )
+        return response.json()
+
+    append([3, 4])
+    # Records appended late are read in the order they started
+    response = append([1, 2])
+    invalid = append([0])
+
+    result = response['data']['appendRecords']
+    assert result['appended'] == 2
+    assert [record['reps'] for record in result['session']['records']] == [
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert get_changes(cursor).changed['session'] == [session.id]
+    assert 'Current case: WORK exercise type, 0 record reps' in (
+        invalid['errors'][0]['message']
+    )
+    assert Record.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_append_records_to_unknown_session():
+    with pytest.raises(Exception, match='Session with ID 9999 does not exist'):
+        SessionService.append_records(id=9999, records=[])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lone_appends_are_written_right_away(exercises, settings):
+    settings.RECORD_BUFFER_DELAY_MS = 10000
+    session = Session.objects.create(name='live', start=timezone.now())
+    buffer = RecordBuffer(SessionService._write_appended_records)
+
+    started = time.perf_counter()
+    buffer.append([build_record(session, exercises[0], 0)])
+
+    assert time.perf_counter() - started < 1
+    assert Record.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_appends_are_coalesced(exercises, settings):
+    settings.RECORD_BUFFER_DELAY_MS = 500
+    sessions = [
+        Session.objects.create(
+            name=f'live {i}',
+            start=timezone.now() - datetime.timedelta(hours=1),
+        )
+        for i in range(4)
+    ]
+    flushes = []
+    writing = threading.Event()
+    buffered = threading.Event()
+
+    def write(records):
+        flushes.append(len(records))
+        writing.set()
+        # The other appends arrive while the first one is written
+        buffered.wait()
+        SessionService._write_appended_records(records)
+
+    buffer = RecordBuffer(write)
+    errors = []
+
+    def append(session):
+        try:
+            buffer.append(
+                [build_record(session, exercises[0], i) for i in range(3)]
+            )
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=append, args=(session,))
+        for session in sessions
+    ]
+    threads[0].start()
+    writing.wait()
+    for thread in threads[1:]:
+        thread.start()
+    while len(buffer._appends) < 3:
+        time.sleep(0.01)
+    buffered.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # The first append was alone
+    assert flushes == [3, 9]
+    assert Record.objects.count() == 12
+
+
+@pytest.mark.django_db
+def test_failing_appends_do_not_fail_the_others(exercises):
+    session = Session.objects.create(name='live', start=timezone.now())
+    writes = []
+
+    def write(records):
+        writes.append(len(records))
+        if any(record.reps == 0 for record in records):
+            raise Exception('database is down')
+        SessionService._write_appended_records(records)
+
+    buffer = RecordBuffer(write)
+    valid = _Append([build_record(session, exercises[0], 0)])
+    failing = _Append([build_record(session, exercises[0], 1)])
+    failing.records[0].reps = 0
+    buffer._appends = [valid, failing]
+
+    buffer.flush()
+
+    assert writes == [2, 1, 1]
+    assert valid.error is None
+    assert str(failing.error) == 'database is down'
+    assert valid.flushed.is_set() and failing.flushed.is_set()
+    assert Record.objects.count() == 1
+    # The buffer is empty again
+    assert buffer._appends == []
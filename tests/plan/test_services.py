@@ -1,6 +1,22 @@
+import datetime
+import json
+import math
+from types import SimpleNamespace
+
 import pytest
+from django.db import IntegrityError, connection
+from django.utils import timezone
+from prometheus_client import REGISTRY
 
-from src.plan.services import validate_indexes
+from src.plan.models import Goal, Plan, Record, Session
+from src.plan.services import (
+    RECORDS_BATCH_SIZE,
+    PlanService,
+    RecordService,
+    SessionService,
+    SyncStatus,
+    validate_indexes,
+)
 
 PARENT_CLASSNAME = 'Parent'
 CHILD_CLASSNAME = 'Child'
@@ -38,3 +54,283 @@ def test_validate_indexes_are_not_duplicated():
         exception._excinfo[1].args[0]
         == 'Duplicated Child found in Parent: Child index 2 was found 2 times, Child index 4 was found 2 times'
     )
+
+
+def build_loops_data(exercises, loops, goals_per_loop):
+    return [
+        SimpleNamespace(
+            rounds=2,
+            loop_index=loop_index,
+            description=f'loop {loop_index}',
+            goals=[
+                SimpleNamespace(
+                    goal_index=goal_index,
+                    exercise_id=exercises[goal_index % len(exercises)].id,
+                    duration=30,
+                    repetitions=10,
+                    pause=False,
+                )
+                for goal_index in range(goals_per_loop)
+            ],
+        )
+        for loop_index in range(loops)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('loops,goals_per_loop', ((1, 1), (10, 15)))
+def test_plan_creation_queries_do_not_depend_on_plan_size(
+    exercises, django_assert_max_num_queries, loops, goals_per_loop
+):
+    loops_data = build_loops_data(exercises, loops, goals_per_loop)
+
+    with django_assert_max_num_queries(8):
+        plan = PlanService.create(
+            name='plan',
+            description='',
+            created=timezone.now(),
+            loops=loops_data,
+        )
+
+    assert plan.loops.count() == loops
+    assert (
+        Goal.objects.filter(loop__plan=plan).count() == loops * goals_per_loop
+    )
+
+
+@pytest.mark.django_db
+def test_plan_creation_fails_if_exercise_does_not_exist(exercises):
+    loops_data = build_loops_data(exercises, 2, 2)
+    loops_data[1].goals[1].exercise_id = 9999
+
+    with pytest.raises(Exception) as exception:
+        PlanService.create(
+            name='plan',
+            description='',
+            created=timezone.now(),
+            loops=loops_data,
+        )
+    assert (
+        exception._excinfo[1].args[0]
+        == 'It was not possible to create Goal because there is no Exercise with ID 9999. Loop 1, Goal 1'
+    )
+    assert not Plan.objects.exists()
+
+
+def build_records_data(exercise, amount):
+    start = timezone.now() - datetime.timedelta(hours=1)
+    return [
+        SimpleNamespace(
+            exercise_id=str(exercise.id),
+            start=start + datetime.timedelta(seconds=i),
+            end=start + datetime.timedelta(seconds=i + 1),
+            reps=10,
+        )
+        for i in range(amount)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('amount', (1, 1500))
+def test_session_creation_inserts_records_in_bulk(
+    exercises, django_assert_max_num_queries, amount
+):
+    records_data = build_records_data(exercises[0], amount)
+
+    # exercises, savepoint, session, records (one per batch), lock of the
+    # change feed (PostgreSQL), change event and release
+    max_queries = 6 + math.ceil(amount / RECORDS_BATCH_SIZE)
+    with django_assert_max_num_queries(max_queries):
+        session = SessionService.create(
+            name='session', start=records_data[0].start, records=records_data
+        )
+
+    assert session.records.count() == amount
+
+
+@pytest.mark.django_db
+def test_session_creation_validates_exercise_type_and_reps(exercises):
+    records_data = build_records_data(exercises[0], 3)
+    records_data[2].reps = 0
+
+    with pytest.raises(Exception) as exception:
+        SessionService.create(
+            name='session', start=records_data[0].start, records=records_data
+        )
+    assert 'Current case: WORK exercise type, 0 record reps' in str(
+        exception._excinfo[1]
+    )
+    assert not Session.objects.exists()
+
+
+def build_sync_data(exercise, key, records=3):
+    records_data = build_records_data(exercise, records)
+    return {
+        'idempotency_key': key,
+        'name': f'session {key}',
+        'start': records_data[0].start,
+        'records': records_data,
+    }
+
+
+@pytest.mark.django_db
+def test_sync_sessions_in_bulk(exercises, django_assert_max_num_queries):
+    sessions_data = [
+        build_sync_data(exercises[0], str(key)) for key in range(20)
+    ]
+
+    # synced keys, exercises, savepoint, sessions, records, lock of the change
+    # feed (PostgreSQL), change events and release; sessions are inserted one
+    # by one without RETURNING
+    inserts = 1 if connection.features.can_return_rows_from_bulk_insert else 20
+    with django_assert_max_num_queries(7 + inserts):
+        results = SessionService.sync(sessions_data)
+
+    assert [result.status for result in results] == [SyncStatus.CREATED] * 20
+    assert Session.objects.count() == 20
+    assert Record.objects.filter(session=results[3].session).count() == 3
+
+
+@pytest.mark.django_db
+def test_sync_sessions_skips_replays(exercises, settings):
+    settings.SYNC_BATCH_SIZE = 2
+    first = build_sync_data(exercises[0], 'a')
+    session = SessionService.sync([first])[0].session
+
+    results = SessionService.sync(
+        [first, build_sync_data(exercises[0], 'b'), first]
+    )
+
+    assert [result.status for result in results] == [
+        SyncStatus.DUPLICATE,
+        SyncStatus.CREATED,
+        SyncStatus.DUPLICATE,
+    ]
+    assert results[0].session == results[2].session == session
+    assert Session.objects.count() == 2
+    assert Record.objects.count() == 6
+
+
+# Ingested records are counted once the transaction commits
+@pytest.mark.django_db(transaction=True)
+def test_sync_sessions_retries_idempotency_key_conflicts(
+    exercises, monkeypatch
+):
+    bulk_create = RecordService.bulk_create
+    errors = [
+        IntegrityError(
+            'UNIQUE constraint failed: plan_session.idempotency_key'
+        )
+    ]
+
+    def conflicting_bulk_create(records):
+        if errors:
+            raise errors.pop()
+        return bulk_create(records)
+
+    monkeypatch.setattr(RecordService, 'bulk_create', conflicting_bulk_create)
+    ingested = REGISTRY.get_sample_value(
+        'records_ingested_total', {'source': 'sync_sessions'}
+    )
+
+    results = SessionService.sync([build_sync_data(exercises[0], 'a')])
+
+    assert results[0].status == SyncStatus.CREATED
+    assert (
+        REGISTRY.get_sample_value(
+            'records_ingested_total', {'source': 'sync_sessions'}
+        )
+        == (ingested or 0) + 3
+    )
+
+
+@pytest.mark.django_db
+def test_sync_sessions_raises_other_integrity_errors(exercises, monkeypatch):
+    calls = []
+
+    def failing_bulk_create(records):
+        calls.append(records)
+        raise IntegrityError('CHECK constraint failed: record_end_after_start')
+
+    monkeypatch.setattr(RecordService, 'bulk_create', failing_bulk_create)
+
+    with pytest.raises(IntegrityError):
+        SessionService.sync([build_sync_data(exercises[0], 'a')])
+    assert len(calls) == 1
+
+
+@pytest.mark.django_db
+def test_sync_sessions_reports_invalid_sessions(exercises):
+    future = build_sync_data(exercises[0], 'future')
+    future['start'] = timezone.now() + datetime.timedelta(days=1)
+    unknown_exercise = build_sync_data(exercises[0], 'unknown exercise')
+    unknown_exercise['records'][1].exercise_id = '9999'
+    no_reps = build_sync_data(exercises[0], 'no reps')
+    no_reps['records'][2].reps = 0
+    valid = build_sync_data(exercises[0], 'valid')
+
+    results = SessionService.sync(
+        [future, unknown_exercise, no_reps, valid, no_reps]
+    )
+
+    assert [result.status for result in results] == [
+        SyncStatus.INVALID,
+        SyncStatus.INVALID,
+        SyncStatus.INVALID,
+        SyncStatus.CREATED,
+        SyncStatus.INVALID,
+    ]
+    assert results[0].errors[0].startswith('start: ')
+    assert results[1].errors == [
+        'records[1]: The Exercise with ID 9999 does not exist'
+    ]
+    assert results[2].errors[0].startswith('records[2]: ')
+    assert results[4].errors == results[2].errors
+    assert list(Session.objects.values_list('idempotency_key', flat=True)) == [
+        'valid'
+    ]
+    assert Record.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_sync_sessions_mutation(client, exercises):
+    start = timezone.now() - datetime.timedelta(hours=1)
+    sessions = [
+        {
+            'idempotencyKey': key,
+            'name': 'session',
+            'start': start.isoformat(),
+            'records': [
+                {
+                    'exerciseId': str(exercises[0].id),
+                    'start': start.isoformat(),
+                    'end': (start + datetime.timedelta(minutes=1)).isoformat(),
+                    'reps': reps,
+                }
+            ],
+        }
+        for key, reps in (('a', 10), ('b', 0), ('a', 10))
+    ]
+    query = """
+    mutation Sync($sessions: [SessionSyncInput!]!) {
+      syncSessions(sessions: $sessions) {
+        results { idempotencyKey status session { id } errors }
+      }
+    }
+    """
+
+    response = client.post(
+        '/graphql',
+        json.dumps({'query': query, 'variables': {'sessions': sessions}}),
+        content_type='application/json',
+    )
+
+    results = response.json()['data']['syncSessions']['results']
+    assert [result['status'] for result in results] == [
+        'CREATED',
+        'INVALID',
+        'DUPLICATE',
+    ]
+    assert results[0]['session'] == results[2]['session']
+    assert results[1]['session'] is None
+    assert len(results[1]['errors']) == 1
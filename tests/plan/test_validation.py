@@ -0,0 +1,118 @@
+import datetime
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from src.plan.models import Exercise, ExerciseType, Goal, Record, Session
+from src.plan.validation import (
+    BatchValidationError,
+    validate_instance,
+    validate_instances,
+)
+
+
+@pytest.fixture
+def session(db) -> Session:
+    start = timezone.now() - datetime.timedelta(hours=1)
+    return Session.objects.create(name='session', start=start)
+
+
+def build_record(session, exercise, **kwargs) -> Record:
+    start = session.start + datetime.timedelta(minutes=1)
+    data = dict(
+        session=session,
+        exercise=exercise,
+        start=start,
+        end=start + datetime.timedelta(seconds=30),
+        reps=10,
+    )
+    data.update(kwargs)
+    return Record(**data)
+
+
+@pytest.mark.django_db
+def test_loaded_foreign_keys_are_not_queried(
+    session, exercises, django_assert_num_queries
+):
+    records = [build_record(session, exercise) for exercise in exercises]
+
+    with django_assert_num_queries(0):
+        validate_instances(records)
+
+
+@pytest.mark.django_db
+def test_foreign_keys_are_checked_with_one_query_per_model(
+    session, exercises, django_assert_num_queries
+):
+    records = [
+        Record(
+            session_id=session.id,
+            exercise_id=exercise.id,
+            start=session.start,
+            end=session.start,
+        )
+        for exercise in exercises
+    ]
+    records.append(
+        Record(
+            session_id=session.id,
+            exercise_id=9999,
+            start=session.start,
+            end=session.start,
+        )
+    )
+
+    with django_assert_num_queries(2):
+        with pytest.raises(BatchValidationError) as exception:
+            validate_instances(records)
+
+    assert exception.value.item_errors == {
+        3: {'exercise': ['exercise instance with id 9999 does not exist.']}
+    }
+
+
+@pytest.mark.django_db
+def test_field_errors_are_reported_per_item(session, exercises):
+    future = timezone.now() + datetime.timedelta(hours=1)
+    records = [
+        build_record(session, exercises[0]),
+        build_record(session, exercises[0], reps=-1),
+        build_record(session, exercises[0], end=future),
+    ]
+
+    with pytest.raises(BatchValidationError) as exception:
+        validate_instances(records)
+
+    errors = exception.value.item_errors
+    assert sorted(errors) == [1, 2]
+    assert list(errors[1]) == ['reps']
+    assert list(errors[2]) == ['end']
+    assert 'record[1].reps' in exception.value.message_dict
+
+
+def test_validate_instance_raises_same_error_as_full_clean():
+    exercise = Exercise(name='', exercise_type='UNKNOWN')
+
+    with pytest.raises(ValidationError) as full_clean_exception:
+        exercise.full_clean()
+    with pytest.raises(ValidationError) as exception:
+        validate_instance(exercise)
+
+    assert (
+        exception.value.message_dict == full_clean_exception.value.message_dict
+    )
+
+
+def test_excluded_fields_are_not_validated():
+    goal = Goal(
+        exercise=Exercise(id=1, exercise_type=ExerciseType.WORK),
+        goal_index=0,
+        duration=10,
+        repetitions=3,
+    )
+
+    with pytest.raises(ValidationError) as exception:
+        validate_instance(goal, exclude=['exercise'])
+
+    assert list(exception.value.message_dict) == ['loop']
@@ -0,0 +1,142 @@
+import datetime
+import json
+
+import pytest
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from src.api.models import PersistedQuery, get_document_hash
+from src.plan.models import Record
+from src.plan.services import SessionService
+
+QUERY = 'query Exercises { exercises { name } }'
+
+
+def get_sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def post(client, payload):
+    return client.post(
+        '/graphql', json.dumps(payload), content_type='application/json'
+    )
+
+
+@pytest.mark.django_db
+def test_graphql_metrics(client, settings, exercises):
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 300
+    PersistedQuery.objects.create(
+        sha256=get_document_hash(QUERY), document=QUERY
+    )
+    persisted_query = {
+        'extensions': {
+            'persistedQuery': {
+                'version': 1,
+                'sha256Hash': get_document_hash(QUERY),
+            }
+        }
+    }
+    labels = {'operation_name': 'Exercises', 'operation_type': 'query'}
+    operations = get_sample(
+        'graphql_operations_total', status='success', **labels
+    )
+    hits = get_sample(
+        'cache_requests_total', cache='graphql_response', result='hit'
+    )
+    queries = get_sample('db_queries_total', database='default')
+
+    post(client, persisted_query)
+    post(client, persisted_query)
+    post(client, {'query': '{ exercise }'})
+
+    assert (
+        get_sample('graphql_operations_total', status='success', **labels)
+        == operations + 2
+    )
+    assert get_sample(
+        'graphql_operation_duration_seconds_count', **labels
+    ) >= (operations + 2)
+    assert get_sample(
+        'cache_requests_total', cache='graphql_response', result='hit'
+    ) == (hits + 1)
+    assert get_sample('db_queries_total', database='default') > queries
+    assert (
+        get_sample(
+            'graphql_operations_total',
+            operation_name='<anonymous>',
+            operation_type='invalid',
+            status='error',
+        )
+        >= 1
+    )
+
+
+@pytest.mark.django_db
+def test_only_persisted_operation_names_are_labels(client, exercises):
+    unregistered = get_sample(
+        'graphql_operations_total',
+        operation_name='<unregistered>',
+        operation_type='query',
+        status='success',
+    )
+    invalid = get_sample(
+        'graphql_operations_total',
+        operation_name='<anonymous>',
+        operation_type='invalid',
+        status='error',
+    )
+
+    post(client, {'query': 'query Random1 { exercises { name } }'})
+    post(client, {'query': 'query Random2 { exercises { unknown } }'})
+    post(client, {'query': 'query Random3 {', 'operationName': 'Random3'})
+
+    assert not get_sample(
+        'graphql_operations_total',
+        operation_name='Random1',
+        operation_type='query',
+        status='success',
+    )
+    assert (
+        get_sample(
+            'graphql_operations_total',
+            operation_name='<unregistered>',
+            operation_type='query',
+            status='success',
+        )
+        == unregistered + 1
+    )
+    assert (
+        get_sample(
+            'graphql_operations_total',
+            operation_name='<anonymous>',
+            operation_type='invalid',
+            status='error',
+        )
+        == invalid + 2
+    )
+
+
+@pytest.mark.django_db
+def test_records_ingested_metric(client, exercises):
+    ingested = get_sample('records_ingested_total', source='create_session')
+    start = timezone.now() - datetime.timedelta(hours=1)
+    records = [
+        Record(
+            exercise_id=exercise.id,
+            start=start,
+            end=start + datetime.timedelta(seconds=30),
+            reps=10,
+        )
+        for exercise in exercises
+    ]
+
+    SessionService.create(name='session', start=start, records=records)
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert b'records_ingested_total{source="create_session"}' in (
+        response.content
+    )
+    assert get_sample(
+        'records_ingested_total', source='create_session'
+    ) == ingested + len(records)
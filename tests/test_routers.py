@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from src import routers
+from src.plan.models import Exercise, ExerciseType
+from src.plan.services import ExerciseService
+from src.routers import ReplicaRouter, routing
+
+REPLICAS = ['replica_0', 'replica_1']
+
+router = ReplicaRouter()
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = REPLICAS
+    return REPLICAS
+
+
+def test_reads_go_to_a_replica_until_a_write(replicas):
+    with routing():
+        replica = router.db_for_read(Exercise)
+        assert replica in replicas
+        assert router.db_for_read(Exercise) == replica
+
+        assert router.db_for_write(Exercise) == 'default'
+        assert router.db_for_read(Exercise) == 'default'
+
+    with routing(primary=True):
+        assert router.db_for_read(Exercise) == 'default'
+
+
+def test_reads_outside_requests_go_to_the_primary(replicas):
+    assert router.db_for_read(Exercise) == 'default'
+
+
+def test_replica_selection(replicas, settings):
+    settings.DATABASE_REPLICA_SELECTION = 'round_robin'
+    chosen = []
+    for _ in range(4):
+        with routing():
+            chosen.append(router.db_for_read(Exercise))
+
+    assert sorted(chosen) == sorted(replicas * 2)
+    assert chosen[0] != chosen[1]
+    assert not router.allow_migrate('replica_0', 'plan')
+
+
+@pytest.mark.django_db
+def test_mutations_read_from_the_primary(client, monkeypatch, exercises):
+    # Reads are only routed to replicas when one is chosen, the default
+    # database stands for it
+    chosen = []
+
+    def choose_replica():
+        chosen.append('default')
+        return 'default'
+
+    monkeypatch.setattr(routers, 'choose_replica', choose_replica)
+    monkeypatch.setattr('django.conf.settings.DATABASE_REPLICAS', ['default'])
+    monkeypatch.setattr(
+        'django.conf.settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT', 0
+    )
+    query = {'query': '{ exercises { name } }'}
+    mutation = {
+        'query': (
+            'mutation { createExercise(name: "squat", description: "", '
+            'exerciseType: WORK) { exercise { id } } }'
+        )
+    }
+
+    def post(payload):
+        response = client.post(
+            '/graphql', json.dumps(payload), content_type='application/json'
+        )
+        assert response.status_code == 200, response.content
+        chosen_replicas = len(chosen)
+        chosen.clear()
+        return chosen_replicas
+
+    assert post(query) == 1
+    assert post(mutation) == 0
+    # Reads following a write stick to the primary
+    assert post([mutation, query]) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fresh_writes_are_not_cached_from_replicas(
+    client, monkeypatch, settings, exercises
+):
+    chosen = []
+
+    def choose_replica():
+        chosen.append('default')
+        return 'default'
+
+    monkeypatch.setattr(routers, 'choose_replica', choose_replica)
+    settings.DATABASE_REPLICAS = ['default']
+    settings.DATABASE_REPLICA_MAX_LAG = 60
+    settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT = 300
+    ExerciseService.create(
+        name='squat', description='', exercise_type=ExerciseType.WORK
+    )
+
+    def post(query):
+        response = client.post(
+            '/graphql',
+            json.dumps({'query': query}),
+            content_type='application/json',
+        )
+        assert response.status_code == 200, response.content
+        chosen_replicas = len(chosen)
+        chosen.clear()
+        return chosen_replicas
+
+    # Replicas may not have replayed the new exercise yet
+    assert post('{ exercises { name } }') == 0
+    # Plans were not written
+    assert post('{ plans { name } }') == 1